@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HairbnbConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hairbnb'
+
+    def ready(self):
+        # Branche les signaux (invalidation des caches liés aux utilisateurs)
+        from hairbnb import signals  # noqa: F401
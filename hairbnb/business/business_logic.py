@@ -1,6 +1,8 @@
 from django.utils.timezone import now
 
-from hairbnb.models import TblClient, TblCoiffeuse
+from hairbnb.models import TblCart, TblService, TblUser
+from hairbnb.services.thumbnail_service import ThumbnailService
+from hairbnb.utils import first_related
 
 
 class CoiffeuseData:
@@ -61,6 +63,8 @@ class SalonData:
     def __init__(self, salon):
         self.idTblSalon = salon.idTblSalon
         self.coiffeuse_id = salon.coiffeuse.idTblUser.idTblUser
+        self.logo_salon = salon.logo_salon.url if salon.logo_salon else None
+        self.logo_salon_urls = ThumbnailService.urls(salon.logo_salon)  # Miniatures thumb / card / full
         self.services = [ServiceData(service.service).to_dict() for service in salon.salon_service.all()]
 
     def to_dict(self):
@@ -124,6 +128,9 @@ class ClientData:
 
 class CurrentUserData:
     def __init__(self, user):
+        if not user.profile_loaded():
+            user = TblUser.objects.with_profile().get(pk=user.pk)  # Adresse + rôle en 1 à 2 requêtes
+
         self.idTblUser = user.idTblUser
         self.uuid = user.uuid
         self.nom = user.nom
@@ -136,27 +143,19 @@ class CurrentUserData:
         self.photo_profil = user.photo_profil.url if user.photo_profil else None
         self.type = user.type  # Peut être "coiffeuse" ou "client"
 
-        # Vérifier si c'est une coiffeuse ou un client et récupérer les données associées
+        # Vérifier si c'est une coiffeuse ou un client et récupérer les données associées (déjà chargées)
         if user.type == "coiffeuse":
-            try:
-                coiffeuse = TblCoiffeuse.objects.get(idTblUser=user)
-                self.extra_data = CoiffeuseData(coiffeuse).to_dict()  # Ajoute les infos de la coiffeuse
-            except TblCoiffeuse.DoesNotExist:
-                self.extra_data = None
+            coiffeuse = getattr(user, 'coiffeuse', None)
+            self.extra_data = CoiffeuseData(coiffeuse).to_dict() if coiffeuse else None  # Infos de la coiffeuse
         elif user.type == "client":
-            try:
-                client = TblClient.objects.get(idTblUser=user)
-                self.extra_data = ClientData(client).to_dict()  # Ajoute les infos du client
-            except TblClient.DoesNotExist:
-                self.extra_data = None
+            client = next(iter(user.clients.all()), None)
+            self.extra_data = ClientData(client).to_dict() if client else None  # Infos du client
         else:
             self.extra_data = None  # Aucune donnée complémentaire
 
     def to_dict(self):
         return self.__dict__
 
-from hairbnb.models import TblCoiffeuse
-
 class MinimalCoiffeuseData:
     def __init__(self, coiffeuse):
         user = coiffeuse.idTblUser  # Récupération de l'utilisateur associé à la coiffeuse
@@ -165,6 +164,7 @@ class MinimalCoiffeuseData:
         self.nom = user.nom
         self.prenom = user.prenom
         self.photo_profil = user.photo_profil.url if user.photo_profil else None  # Vérification de la photo
+        self.photo_profil_urls = ThumbnailService.urls(user.photo_profil)  # Miniatures thumb / card / full
         self.position = coiffeuse.position
 
     def to_dict(self):
@@ -196,14 +196,62 @@ class CartItemData:
 class CartData:
     def __init__(self, cart):
         self.idTblCart = cart.idTblCart
-        self.user = CurrentUserData(cart.user).to_dict()  # Réutilise CurrentUserData
-        self.items = [CartItemData(item).to_dict() for item in cart.items.all()]
-        self.total_price = cart.total_price()  # Méthode qui calcule le total
+        # Réutilise CurrentUserData (profil chargé en une fois si cart.user ne l'est pas déjà)
+        user = cart.user if TblCart.user.is_cached(cart) else TblUser.objects.with_profile().get(pk=cart.user_id)
+        self.user = CurrentUserData(user).to_dict()
+
+        # Articles, prix, temps et promotions chargés en un nombre constant de requêtes
+        items = list(cart.items.with_details())
+        self.items = [CartItemData(item).to_dict() for item in items]
+        self.total_price = sum(item.total_price() for item in items)  # Aucun accès base : tout est préchargé
+        self.version = cart.version  # Permet au client de savoir si son panier local est à jour
 
     def to_dict(self):
         return self.__dict__
 
-from django.utils.timezone import now
+
+class TokenCartData:
+    """
+    Même format que CartData pour un panier stocké dans un jeton signé
+    (voir CartTokenService) : aucune lecture ni écriture de TblCart / TblCartItem.
+    """
+    def __init__(self, items, version=0):
+        self.idTblCart = None  # Pas encore de panier en base
+        self.user = None
+
+        services = TblService.objects.with_details().in_bulk(list(items))
+        self.items = []
+        self.total_price = 0
+        for service_id, quantity in items.items():
+            service = services.get(service_id)
+            if service is None:  # Service supprimé depuis la création du jeton
+                continue
+            service_data = ServiceData(service).to_dict()
+            self.items.append({"id": None, "service": service_data, "quantity": quantity})
+            if service_data["prix"] is not None:
+                self.total_price += quantity * service_data["prix"]
+        self.version = version
+
+    def to_dict(self):
+        return self.__dict__
+
+
+class CartDeltaData:
+    """
+    Réponse allégée après une modification du panier : uniquement la ligne
+    modifiée, le nombre d'articles, le nouveau total et la version du panier.
+    Le client recharge le panier complet (get_cart) seulement si la version
+    reçue ne suit pas celle qu'il connaît.
+    """
+    def __init__(self, cart, service_id=None, cart_item=None):
+        self.idTblCart = cart.idTblCart
+        self.version = cart.version
+        self.service_id = service_id
+        self.item = CartItemData(cart_item).to_dict() if cart_item else None  # None = ligne supprimée
+        self.item_count, self.total_price = cart.totals()
+
+    def to_dict(self):
+        return self.__dict__
 
 class ServiceData:
     def __init__(self, service):
@@ -211,21 +259,25 @@ class ServiceData:
         self.intitule_service = service.intitule_service
         self.description = service.description
 
-        # 🔍 Récupération du temps
-        service_temps = service.service_temps.first()
+        # 🔍 Récupération du temps (lit le prefetch s'il existe)
+        service_temps = first_related(service, 'service_temps')
         self.temps_minutes = service_temps.temps.minutes if service_temps else None
 
         # 🔍 Récupération du prix
-        service_prix = service.service_prix.first()
+        service_prix = first_related(service, 'service_prix')
         self.prix = service_prix.prix.prix if service_prix else None
 
-        # 🔍 Vérifie s'il y a une promotion active
-        active_promo = service.promotions.filter(start_date__lte=now(), end_date__gte=now()).first()
+        # 🔍 Vérifie s'il y a une promotion active (préchargée via TblCartItemQuerySet.with_details)
+        promotions_actives = getattr(service, 'promotions_actives', None)
+        if promotions_actives is not None:
+            active_promo = promotions_actives[0] if promotions_actives else None
+        else:
+            active_promo = service.promotions.filter(start_date__lte=now(), end_date__gte=now()).first()
 
         if active_promo:
             self.promotion = {
                 "idPromotion": active_promo.idPromotion,
-                "service_id": active_promo.service.idTblService,
+                "service_id": active_promo.service_id,
                 "discount_percentage": active_promo.discount_percentage,
                 "start_date": active_promo.start_date.isoformat(),
                 "end_date": active_promo.end_date.isoformat(),
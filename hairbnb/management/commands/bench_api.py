@@ -0,0 +1,226 @@
+import json
+import platform
+import random
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils.timezone import now
+
+from hairbnb.middleware import QueryStats
+from hairbnb.models import TblService, TblUser
+from hairbnb.services.address_resolver import AddressResolver
+from hairbnb.services.dataset_seeder import DatasetSeeder
+from hairbnb.services.user_resolver import UserResolver
+
+ENDPOINTS = ('coiffeuses_proches', 'get_services_by_coiffeuse', 'get_cart', 'add_to_cart', 'get_current_user',
+             'list_coiffeuses', 'get_coiffeuses_info')
+DISTANCE_KM = 10  # Rayon de recherche de coiffeuses_proches
+
+
+def percentile(values, p):
+    """ Percentile (rang le plus proche) d'une liste déjà triée. """
+    if not values:
+        return None
+    rank = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries_per_request': {'mean': round(sum(queries) / len(queries), 2), 'max': max(queries)},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les endpoints les plus sollicités (débit, latences p50/p95/p99, requêtes SQL par appel) "
+        "via le client de test Django, sur un jeu de données généré par DatasetSeeder (échelle small, medium ou large). "
+        "Chaque échelle tourne dans une base de test créée puis détruite (jamais la base configurée) "
+        "avec un cache local au processus. Résultats en JSON (--output), comparables avec --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', choices=list(DatasetSeeder.SCALES),
+                            help="Échelle(s) du jeu de données (répétable, small par défaut).")
+        parser.add_argument('--endpoint', action='append', choices=ENDPOINTS,
+                            help="Endpoint(s) mesuré(s) (répétable, tous par défaut).")
+        parser.add_argument('--requests', type=int, default=500, help="Appels mesurés par endpoint.")
+        parser.add_argument('--warmup', type=int, default=50,
+                            help="Appels de chauffe par endpoint, non mesurés (caches remplis).")
+        parser.add_argument('--cold', action='store_true', help="Vide les caches avant chaque appel mesuré.")
+        parser.add_argument('--seed', type=int, default=42, help="Graine du jeu de données et des paramètres d'appel.")
+        parser.add_argument('--output', help="Fichier JSON des résultats (sortie standard sinon).")
+        parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'),
+                            help="Compare deux fichiers de résultats au lieu de lancer une mesure.")
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'])
+        if options['requests'] < 1:
+            raise CommandError(f"--requests doit être au moins 1 (reçu : {options['requests']})")
+        if options['warmup'] < 0:
+            raise CommandError(f"--warmup ne peut pas être négatif (reçu : {options['warmup']})")
+
+        results = {
+            'meta': {
+                'started_at': now().isoformat(), 'python': platform.python_version(), 'django': django.get_version(),
+                'database': connection.vendor, 'requests': options['requests'], 'warmup': options['warmup'],
+                'cold': options['cold'], 'seed': options['seed'],
+            },
+            'scales': {},
+        }
+        bench_settings = override_settings(
+            DEBUG=False,  # Sinon chaque requête SQL est conservée dans connection.queries
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'LOCATION': 'hairbnb-bench', 'OPTIONS': {'MAX_ENTRIES': 1000000}}},
+        )
+        with bench_settings:
+            for scale in options['scale'] or ['small']:
+                results['scales'][scale] = self.run_scale(scale, options)
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"✅ Résultats écrits dans {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_scale(self, scale, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.monotonic()
+            report = DatasetSeeder(options['seed']).run(**DatasetSeeder.SCALES[scale])
+            dataset = self.load_dataset(report)
+            self.stderr.write(f"📦 {scale} : jeu de données créé en {time.monotonic() - started:.1f} s "
+                              f"({', '.join(f'{key}={value}' for key, value in dataset['counts'].items())})")
+            endpoints = {}
+            for name in options['endpoint'] or ENDPOINTS:
+                endpoints[name] = self.run_endpoint(name, dataset, options)
+                latency = endpoints[name]['latency_ms']
+                self.stderr.write(f"  {name:<26} {endpoints[name]['throughput_rps']:>8} req/s  "
+                                  f"p50 {latency['p50']:.2f} ms  p99 {latency['p99']:.2f} ms  "
+                                  f"{endpoints[name]['queries_per_request']['mean']} requêtes")
+            return {'dataset': dataset['counts'], 'endpoints': endpoints}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_endpoint(self, name, dataset, options):
+        client = Client()
+        rng = random.Random(f"{options['seed']}-{name}")  # Mêmes paramètres d'appel d'une exécution à l'autre
+        call = getattr(self, f'call_{name}')
+        self.reset_caches()
+        for _ in range(options['warmup']):
+            call(client, dataset, rng)
+
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            if options['cold']:
+                self.reset_caches()
+            stats = QueryStats()
+            with connection.execute_wrapper(stats):
+                request_started = time.perf_counter()
+                response = call(client, dataset, rng)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            queries.append(stats.count)
+            errors += response.status_code >= 400
+        return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+    @staticmethod
+    def reset_caches():
+        cache.clear()
+        UserResolver.clear()
+        AddressResolver.clear()
+
+    # Un appel par endpoint, paramètres tirés au hasard (graine fixe) dans le jeu de données
+
+    def call_coiffeuses_proches(self, client, dataset, rng):
+        latitude, longitude = DatasetSeeder.random_position(rng)  # Mêmes zones que les coiffeuses générées
+        return client.get('/api/coiffeuses_proches/', {
+            'lat': latitude, 'lon': longitude, 'distance': DISTANCE_KM})
+
+    def call_get_services_by_coiffeuse(self, client, dataset, rng):
+        return client.get(f"/api/get_services_by_coiffeuse/{rng.choice(dataset['coiffeuse_ids'])}/")
+
+    def call_get_cart(self, client, dataset, rng):
+        return client.get(f"/api/get_cart/{rng.choice(dataset['client_ids'])}/")
+
+    def call_add_to_cart(self, client, dataset, rng):
+        body = {'user_id': rng.choice(dataset['client_ids']), 'service_id': rng.choice(dataset['service_ids'])}
+        return client.post('/api/add_to_cart/', json.dumps(body), content_type='application/json')
+
+    def call_get_current_user(self, client, dataset, rng):
+        return client.get(f"/api/get_current_user/{rng.choice(dataset['uuids'])}/")
+
+    def call_list_coiffeuses(self, client, dataset, rng):
+        return client.get('/api/list_coiffeuses/')
+
+    def call_get_coiffeuses_info(self, client, dataset, rng):
+        uuids = rng.sample(dataset['coiffeuse_uuids'], min(20, len(dataset['coiffeuse_uuids'])))
+        return client.post('/api/get_coiffeuses_info/', json.dumps({'uuids': uuids}), content_type='application/json')
+
+    @staticmethod
+    def load_dataset(report):
+        """ Identifiants tirés au hasard par les appels, relus une fois le jeu de données inséré. """
+        users = TblUser.objects.filter(uuid__startswith=DatasetSeeder.UUID_PREFIX).order_by('pk')
+        coiffeuses = list(users.filter(type='coiffeuse').values_list('idTblUser', 'uuid'))
+        return {
+            'counts': report,
+            'coiffeuse_ids': [user_id for user_id, _ in coiffeuses],
+            'coiffeuse_uuids': [uuid for _, uuid in coiffeuses],
+            'client_ids': list(users.filter(type='client').values_list('idTblUser', flat=True)),
+            'uuids': list(users.values_list('uuid', flat=True)),
+            'service_ids': list(TblService.objects.order_by('pk').values_list('idTblService', flat=True)),
+        }
+
+    def compare(self, before_path, after_path):
+        """ Écarts (en %) de débit, p50, p95, p99 et requêtes par appel, pour chaque échelle et endpoint communs. """
+        try:
+            with open(before_path) as f:
+                before = json.load(f)
+            with open(after_path) as f:
+                after = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Lecture des résultats impossible : {e}")
+
+        def delta(old, new):
+            return f"{(new - old) / old * 100:+.1f}%" if old and new is not None else 'n/a'
+
+        def cell(old, new):
+            # None : mesure absente (ex: débit d'une exécution trop courte)
+            old_text = 'n/a' if old is None else f"{old:.2f}"
+            new_text = 'n/a' if new is None else f"{new:.2f}"
+            return f"{old_text:>9} → {new_text:<9}{delta(old, new):>8}"
+
+        headers = ('req/s', 'p50 ms', 'p95 ms', 'p99 ms')
+        self.stdout.write(f"{'échelle / endpoint':<38}" + ''.join(f"{header:^30}" for header in headers) + 'requêtes')
+        for scale, scale_after in after['scales'].items():
+            scale_before = before['scales'].get(scale)
+            if scale_before is None:
+                continue
+            for name, new in scale_after['endpoints'].items():
+                old = scale_before['endpoints'].get(name)
+                if old is None:
+                    continue
+                cells = [cell(old['throughput_rps'], new['throughput_rps'])]
+                cells += [cell(old['latency_ms'][p], new['latency_ms'][p]) for p in ('p50', 'p95', 'p99')]
+                cells.append(f"{old['queries_per_request']['mean']:g} → {new['queries_per_request']['mean']:g}")
+                self.stdout.write(f"{scale + ' / ' + name:<38}" + '  '.join(cells))
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hairbnb.models import TblLocalite, TblUser
+from hairbnb.services.user_import_service import UserImportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de UserImportService (utilisateurs/s) sur des lignes générées "
+        "(100 000 par défaut), puis supprime les données créées sauf avec --keep. "
+        "À lancer sur une base de test, jamais en production."
+    )
+    UUID_PREFIX = 'bench-import-'
+    COMMUNE_PREFIX = 'Bench '
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Nombre d'utilisateurs générés.")
+        parser.add_argument('--chunk-size', type=int, default=UserImportService.CHUNK_SIZE,
+                            help="Nombre d'utilisateurs insérés par transaction.")
+        parser.add_argument('--communes', type=int, default=500, help="Nombre de communes différentes.")
+        parser.add_argument('--streets', type=int, default=40, help="Nombre de rues par commune.")
+        parser.add_argument('--keep', action='store_true', help="Conserve les utilisateurs importés.")
+
+    def rows(self, count, communes, streets):
+        for i in range(count):
+            commune = i % communes
+            yield i + 1, {
+                'userUuid': f'{self.UUID_PREFIX}{i}', 'nom': f'Nom{i}', 'prenom': 'Prénom',
+                'email': f'{self.UUID_PREFIX}{i}@example.com', 'role': 'coiffeuse' if i % 5 == 0 else 'client',
+                'sexe': 'femme', 'telephone': '0400000000', 'code_postal': str(1000 + commune),
+                'commune': f'{self.COMMUNE_PREFIX}{commune}', 'rue': f'Rue {(i // communes) % streets}',
+                'numero': str(i % 200 + 1), 'date_naissance': '01-01-1990',
+            }
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        started = time.monotonic()
+        last = [started, 0]
+
+        def progress(report):
+            now = time.monotonic()
+            if now - last[0] >= 5:
+                rate = (report['imported'] - last[1]) / (now - last[0])
+                self.stdout.write(f"  {report['imported']} importés ({rate:.0f} utilisateurs/s sur les 5 dernières s)")
+                last[0], last[1] = now, report['imported']
+
+        report = UserImportService.import_rows(
+            self.rows(options['rows'], options['communes'], options['streets']),
+            options['chunk_size'], on_chunk=progress
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {report['imported']} utilisateurs importés en {elapsed:.2f} s : "
+            f"{report['imported'] / elapsed:.0f} utilisateurs/s (lots de {options['chunk_size']}, "
+            f"{len(report['errors'])} erreurs)"
+        ))
+        if not options['keep']:
+            self.cleanup()
+
+    def cleanup(self):
+        # Suppression par lots : les localités entraînent rues et adresses (CASCADE)
+        users = TblUser.objects.filter(uuid__startswith=self.UUID_PREFIX)
+        while True:
+            ids = list(users.values_list('idTblUser', flat=True)[:5000])
+            if not ids:
+                break
+            TblUser.objects.filter(idTblUser__in=ids).delete()
+        TblLocalite.objects.filter(commune__startswith=self.COMMUNE_PREFIX).delete()
@@ -0,0 +1,92 @@
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from hairbnb.models import TblMediaBlob, TblUser
+from hairbnb.services.media_storage import media_storage
+from hairbnb.signals import MEDIA_FIELDS, profile_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Range les images existantes dans le stockage par contenu (un fichier par contenu identique), "
+        "recalcule le nombre de références de chaque fichier et supprime ceux qui ne sont plus utilisés. "
+        "À lancer hors trafic : les compteurs sont réécrits à partir d'un comptage des tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-legacy', action='store_true',
+                            help="Supprime les anciens fichiers une fois remplacés par leur blob.")
+        parser.add_argument('--orphan-age', type=int, default=3600,
+                            help="Âge minimum (secondes) d'un fichier de blobs/ sans ligne TblMediaBlob avant suppression.")
+
+    def handle(self, *args, **options):
+        blob_prefix = f"{media_storage.BLOB_DIR}/"
+
+        # 1. Anciens fichiers (photos/profils/profile_photo_XXXX.png...) : hachés et remplacés par leur blob
+        migrated = missing = 0
+        legacy = set()
+        for model, field in MEDIA_FIELDS.items():
+            names = (
+                model.objects.exclude(**{f'{field}__startswith': blob_prefix})
+                .exclude(**{f'{field}__startswith': 'photos/defaults/'})
+                .exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True).distinct()
+            )
+            for name in names:
+                if not media_storage.exists(name):
+                    missing += 1
+                    continue
+                with media_storage.open(name, 'rb') as source:
+                    blob = media_storage.save(name, source)
+                rows = model.objects.filter(**{field: name})
+                if model is TblUser:
+                    # update() n'envoie pas de signal : les profils en cache contiennent l'ancienne URL
+                    for user_id, uuid in rows.values_list('idTblUser', 'uuid'):
+                        profile_changed(user_id, uuid)
+                rows.update(**{field: blob})
+                legacy.add(name)
+                migrated += 1
+
+        # 2. Références recomptées à partir des tables
+        counts = Counter()
+        for model, field in MEDIA_FIELDS.items():
+            for name, count in model.objects.filter(**{f'{field}__startswith': blob_prefix}) \
+                    .values_list(field).annotate(count=Count('pk')).order_by():
+                counts[name] += count
+
+        fixed = released = 0
+        for blob in TblMediaBlob.objects.iterator():
+            refcount = counts.get(blob.name, 0)
+            if refcount == 0:
+                # Une seule référence restante, libérée : supprime la ligne, le fichier et ses miniatures
+                TblMediaBlob.objects.filter(pk=blob.pk).update(refcount=1)
+                media_storage.release(blob.name)
+                released += 1
+            elif refcount != blob.refcount:
+                TblMediaBlob.objects.filter(pk=blob.pk).update(refcount=refcount)
+                fixed += 1
+
+        # 3. Fichiers de blobs/ sans ligne (transaction annulée après l'écriture, copie temporaire interrompue)
+        known = set(TblMediaBlob.objects.values_list('name', flat=True))
+        orphans = 0
+        root = media_storage.path(media_storage.BLOB_DIR)
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, media_storage.location).replace(os.sep, '/')
+                if name not in known and time.time() - os.path.getmtime(path) > options['orphan_age']:
+                    os.remove(path)
+                    orphans += 1
+
+        if options['delete_legacy']:
+            for name in legacy:
+                os.remove(media_storage.path(name))  # delete() du stockage ne supprime rien (références gérées par les signaux)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {migrated} fichiers rangés par contenu ({missing} introuvables), {fixed} compteurs corrigés, "
+            f"{released} blobs inutilisés et {orphans} fichiers orphelins supprimés"
+        ))
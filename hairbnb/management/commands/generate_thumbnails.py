@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+
+from hairbnb.models import TblImageSalon, TblSalon, TblUser
+from hairbnb.services.thumbnail_service import ThumbnailService, image_metadata
+from hairbnb.signals import thumbnails_generated
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les miniatures (thumb, card, full) des photos de profil, des logos et des galeries de salon "
+        "déjà en base (images envoyées avant la mise en place du pipeline, images par défaut), "
+        "et complète les métadonnées (dimensions, taille, placeholder) des images de galerie."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Régénère aussi les miniatures existantes.")
+
+    def handle(self, *args, **options):
+        # Plusieurs lignes partagent souvent le même fichier (avatar / logo par défaut) : un seul passage par fichier
+        photos = set(
+            TblUser.objects.exclude(photo_profil='').exclude(photo_profil__isnull=True)
+            .values_list('photo_profil', flat=True).distinct()
+        )
+        logos = set(
+            TblSalon.objects.exclude(logo_salon='').exclude(logo_salon__isnull=True)
+            .values_list('logo_salon', flat=True).distinct()
+        )
+        gallery = set(TblImageSalon.objects.values_list('urlImages', flat=True).distinct())
+
+        generated = skipped = failed = 0
+        for name in sorted(photos | logos | gallery):
+            try:
+                if ThumbnailService.generate(name, force=options['force']):
+                    generated += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"❌ {name} : {e}")
+                continue
+            # Lignes qui n'affichaient pas encore les miniatures (thumbnails_ready), profils en cache invalidés
+            thumbnails_generated(name)
+
+        # Images de galerie ajoutées sans passer par l'endpoint d'upload (admin, données existantes)
+        completed = 0
+        for name in TblImageSalon.objects.filter(width__isnull=True).values_list('urlImages', flat=True).distinct():
+            try:
+                with TblImageSalon._meta.get_field('urlImages').storage.open(name, 'rb') as source:
+                    metadata = image_metadata(source)
+                    metadata['size'] = source.size
+            except Exception as e:
+                self.stderr.write(f"❌ {name} : {e}")
+                continue
+            completed += TblImageSalon.objects.filter(urlImages=name, width__isnull=True).update(**metadata)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {generated} images traitées, {skipped} déjà à jour, {failed} en erreur, "
+            f"{completed} images de galerie complétées"
+        ))
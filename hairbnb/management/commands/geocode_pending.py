@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hairbnb.models import TblCoiffeuse
+from hairbnb.services.geolocation_service import GeolocationService
+from hairbnb.signals import profile_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Géocode les coiffeuses sans position (import en masse, géocodage échoué à l'inscription). "
+        "Nominatim n'accepte qu'une requête par seconde : --delay le respecte par défaut."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=0, help="Nombre maximum de coiffeuses traitées (0 = toutes).")
+        parser.add_argument('--delay', type=float, default=1.0, help="Pause (secondes) entre deux appels au géocodeur.")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Nombre de coiffeuses lues par requête.")
+
+    def handle(self, *args, **options):
+        last_id = 0
+        geocoded = failed = 0
+        while not options['limit'] or geocoded + failed < options['limit']:
+            # Keyset sur l'ID : une adresse introuvable n'est pas relue en boucle pendant ce passage
+            coiffeuses = list(
+                TblCoiffeuse.objects.select_related('idTblUser__adresse__rue__localite')
+                .filter(position__isnull=True, id__gt=last_id, idTblUser__adresse__isnull=False)
+                .order_by('id')[:options['chunk_size']]
+            )
+            if not coiffeuses:
+                break
+            for coiffeuse in coiffeuses:
+                last_id = coiffeuse.id
+                adresse = coiffeuse.idTblUser.adresse
+                adresse_complete = (
+                    f"{adresse.numero}, {adresse.rue.nom_rue}, {adresse.rue.localite.commune}, "
+                    f"{adresse.rue.localite.code_postal}"
+                )
+                latitude, longitude = GeolocationService.geocode_address(adresse_complete)
+                if latitude and longitude:
+                    # update() ciblé : ne réécrit pas une position saisie entre-temps par la coiffeuse
+                    if TblCoiffeuse.objects.filter(id=coiffeuse.id, position__isnull=True) \
+                            .update(position=f"{latitude}, {longitude}"):
+                        # update() ne déclenche pas post_save : on invalide les caches de profil nous-mêmes
+                        profile_changed(coiffeuse.idTblUser_id, coiffeuse.idTblUser.uuid)
+                    geocoded += 1
+                else:
+                    failed += 1
+                if options['limit'] and geocoded + failed >= options['limit']:
+                    break
+                time.sleep(options['delay'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {geocoded} coiffeuses géocodées, {failed} adresses introuvables"))
@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hairbnb.services.user_import_service import UserImportError, UserImportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des utilisateurs depuis un fichier CSV (avec en-tête) ou JSON lines, avec les champs "
+        "de create_user_profile. Les coiffeuses importées sont géocodées ensuite par geocode_pending."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv ou .jsonl à importer.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Format du fichier (déduit de l'extension par défaut).")
+        parser.add_argument('--chunk-size', type=int, default=UserImportService.CHUNK_SIZE,
+                            help="Nombre d'utilisateurs insérés par transaction.")
+        parser.add_argument('--max-errors', type=int, default=20, help="Nombre d'erreurs détaillées affichées.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format == 'json':
+            file_format = 'jsonl'
+
+        started = time.monotonic()
+
+        def progress(report):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {report['imported']} importés, {report['skipped']} ignorés "
+                f"({report['imported'] / elapsed if elapsed else 0:.0f} utilisateurs/s)"
+            )
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                report = UserImportService.import_rows(
+                    UserImportService.read_rows(stream, file_format), options['chunk_size'], on_chunk=progress
+                )
+        except (OSError, UserImportError) as e:
+            raise CommandError(str(e))
+
+        for line_number, message in report['errors'][:options['max_errors']]:
+            self.stderr.write(f"  Ligne {line_number} : {message}")
+        if len(report['errors']) > options['max_errors']:
+            self.stderr.write(f"  ... et {len(report['errors']) - options['max_errors']} autres erreurs")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {report['imported']} utilisateurs importés, {report['skipped']} ignorés en {elapsed:.2f} s "
+            f"({report['imported'] / elapsed if elapsed else 0:.0f} utilisateurs/s). "
+            f"{report['to_geocode']} coiffeuses à géocoder : lancer geocode_pending."
+        ))
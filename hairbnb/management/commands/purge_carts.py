@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from hairbnb.models import TblCart, TblCartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les paniers inactifs depuis plus de --ttl-days jours, par lots (keyset sur idTblCart) "
+        "pour ne jamais garder de verrou longtemps. À lancer depuis un cron, ou avec --interval "
+        "pour tourner en continu. Un panier consulté (get_cart) compte comme actif."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-days', type=int, default=getattr(settings, 'HAIRBNB_CART_TTL_DAYS', 30),
+                            help="Âge d'inactivité (updated_at) au-delà duquel un panier est supprimé.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Nombre de paniers supprimés par lot.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Pause (secondes) entre deux lots.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Si > 0, relance une purge toutes les N secondes (job planifié).")
+        parser.add_argument('--empty-only', action='store_true',
+                            help="Ne supprime que les paniers vides (garde les paniers abandonnés avec articles).")
+        parser.add_argument('--dry-run', action='store_true', help="Compte sans rien supprimer.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options['ttl_days'], options['chunk_size'], options['pause'], options['dry_run'],
+                       options['empty_only'])
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
+
+    def purge(self, ttl_days, chunk_size, pause, dry_run, empty_only=False):
+        cutoff = now() - timedelta(days=ttl_days)
+        idle = TblCart.objects.filter(updated_at__lt=cutoff)
+        if empty_only:
+            idle = idle.filter(items__isnull=True)
+        self.stdout.write(f"🧹 Purge des paniers inactifs depuis le {cutoff:%Y-%m-%d %H:%M} (lots de {chunk_size})")
+
+        last_id = 0
+        chunk = 0
+        total_carts = 0
+        total_items = 0
+        started = time.monotonic()
+        while True:
+            # Keyset : on repart du dernier ID vu, jamais d'OFFSET ni de scan depuis le début
+            ids = list(
+                idle.filter(idTblCart__gt=last_id)
+                .order_by('idTblCart')
+                .values_list('idTblCart', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            chunk += 1
+
+            chunk_started = time.monotonic()
+            if dry_run:
+                carts, items = len(ids), TblCartItem.objects.filter(cart_id__in=ids).count()
+            else:
+                # On revérifie les critères : un panier modifié entre-temps n'est pas supprimé
+                _, deleted = idle.filter(idTblCart__in=ids).delete()
+                carts = deleted.get(TblCart._meta.label, 0)
+                items = deleted.get(TblCartItem._meta.label, 0)
+            elapsed_ms = (time.monotonic() - chunk_started) * 1000
+
+            total_carts += carts
+            total_items += items
+            self.stdout.write(f"  Lot {chunk} : {carts} paniers, {items} articles supprimés en {elapsed_ms:.1f} ms")
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total_carts} paniers et {total_items} articles supprimés en {chunk} lots "
+            f"({time.monotonic() - started:.2f} s){' [dry-run]' if dry_run else ''}"
+        ))
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hairbnb.services.dataset_seeder import DatasetSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique pour les tests de charge (localités, rues, adresses, "
+        "utilisateurs, coiffeuses positionnées, salons, services avec prix et durées, promotions, paniers). "
+        "Reproductible avec --seed. --clear supprime d'abord les données générées précédemment. "
+        "À lancer sur une base de test, jamais en production."
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSeeder.DEFAULTS
+        parser.add_argument('--scale', choices=list(DatasetSeeder.SCALES),
+                            help="Taille prédéfinie (les options explicites la complètent).")
+        parser.add_argument('--localites', type=int, help=f"Nombre de localités ({defaults['localites']}).")
+        parser.add_argument('--streets', type=int, help=f"Nombre de rues par localité ({defaults['streets']}).")
+        parser.add_argument('--users', type=int, help=f"Nombre d'utilisateurs ({defaults['users']}).")
+        parser.add_argument('--coiffeuse-ratio', type=float,
+                            help=f"Part de coiffeuses parmi les utilisateurs ({defaults['coiffeuse_ratio']}).")
+        parser.add_argument('--services-per-salon', type=int,
+                            help=f"Nombre de services par salon ({defaults['services_per_salon']}).")
+        parser.add_argument('--promotion-ratio', type=float,
+                            help=f"Part des services en promotion ({defaults['promotion_ratio']}).")
+        parser.add_argument('--cart-ratio', type=float,
+                            help=f"Part des clients ayant un panier ({defaults['cart_ratio']}).")
+        parser.add_argument('--cart-items', type=int,
+                            help=f"Nombre maximal d'articles par panier ({defaults['cart_items']}).")
+        parser.add_argument('--seed', type=int, default=42, help="Graine du générateur aléatoire.")
+        parser.add_argument('--chunk-size', type=int, default=DatasetSeeder.CHUNK_SIZE,
+                            help="Nombre d'utilisateurs (et de lignes dépendantes) insérés par transaction.")
+        parser.add_argument('--clear', action='store_true', help="Supprime d'abord les données déjà générées.")
+
+    def handle(self, *args, **options):
+        seed_options = dict(DatasetSeeder.SCALES.get(options['scale'], {}))
+        for key in DatasetSeeder.DEFAULTS:
+            if options[key] is not None:
+                seed_options[key] = options[key]
+        self.validate({**DatasetSeeder.DEFAULTS, **seed_options}, options['chunk_size'])
+
+        if options['clear']:
+            started = time.monotonic()
+            DatasetSeeder.clear(options['chunk_size'])
+            self.stdout.write(f"🗑️ Données générées précédemment supprimées en {time.monotonic() - started:.2f} s")
+        elif DatasetSeeder.exists():
+            raise CommandError("Des données générées existent déjà : relancer avec --clear pour les remplacer.")
+
+        started = time.monotonic()
+
+        def progress(report):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {report['users']} utilisateurs, {report['services']} services, {report['carts']} paniers "
+                f"({sum(report.values()) / elapsed if elapsed else 0:.0f} lignes/s)"
+            )
+
+        report = DatasetSeeder(options['seed'], options['chunk_size'], on_chunk=progress).run(**seed_options)
+
+        elapsed = time.monotonic() - started
+        rows = sum(report.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {rows} lignes générées en {elapsed:.2f} s ({rows / elapsed if elapsed else 0:.0f} lignes/s) : "
+            + ', '.join(f"{count} {key}" for key, count in report.items())
+        ))
+
+    @staticmethod
+    def validate(values, chunk_size):
+        """ Refuse les combinaisons que le générateur ne peut pas produire (valeurs effectives, défauts compris). """
+        for key, value in values.items():
+            if value < 0 or (key.endswith('_ratio') and value > 1):
+                raise CommandError(f"Valeur invalide pour --{key.replace('_', '-')} : {value}")
+        if chunk_size < 1:
+            raise CommandError(f"--chunk-size doit être au moins 1 (reçu : {chunk_size})")
+        if values['users'] > 0:
+            # Chaque utilisateur reçoit une adresse dans une rue existante
+            for key in ('localites', 'streets'):
+                if values[key] < 1:
+                    raise CommandError(
+                        f"--{key} doit être au moins 1 pour générer des utilisateurs (reçu : {values[key]})"
+                    )
+        if values['cart_ratio'] > 0 and values['cart_items'] < 1:
+            raise CommandError(
+                f"--cart-items doit être au moins 1 quand --cart-ratio est positif (reçu : {values['cart_items']})"
+            )
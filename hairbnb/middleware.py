@@ -0,0 +1,181 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+
+from hairbnb.models import TblUser
+from hairbnb.services.firebase_auth import FirebaseAuthError, verify_id_token
+from hairbnb.services.metrics import Metrics
+from hairbnb.services.user_resolver import UserResolver
+
+logger = logging.getLogger('hairbnb.requests')
+budget_logger = logging.getLogger('hairbnb.query_budget')
+
+# Normalisation du SQL pour reconnaître une même requête répétée (N+1) quels que soient ses paramètres
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?![\w."])')
+
+
+def get_tbluser(firebase_uid):
+    """ TblUser correspondant à un uid Firebase (uuid -> idTblUser via UserResolver), ou None. """
+    resolved = UserResolver.resolve(firebase_uid)
+    if resolved is None:
+        return None
+    return TblUser.objects.filter(pk=resolved[0]).first()
+
+
+class FirebaseAuthenticationMiddleware:
+    """
+    Authentifie les requêtes portant un en-tête "Authorization: Bearer <ID token Firebase>".
+
+    Le jeton est vérifié localement (FirebaseKeyStore, aucun appel à Firebase par requête), puis :
+    - request.firebase_uid : l'uid Firebase (= TblUser.uuid), ou None sans jeton ;
+    - request.tbluser : le TblUser correspondant, chargé seulement au premier accès.
+      Il vaut None sans jeton, et est évalué à False si l'utilisateur n'a pas encore créé
+      son profil : le tester avec `if request.tbluser`, pas avec `is None`.
+
+    Un jeton présent mais invalide donne une réponse 401. Les requêtes sans jeton passent
+    (les routes publiques et celles qui reçoivent encore un uuid dans l'URL continuent de fonctionner).
+
+    À ajouter après CommonMiddleware dans settings.MIDDLEWARE :
+        'hairbnb.middleware.FirebaseAuthenticationMiddleware'
+    et à configurer avec HAIRBNB_FIREBASE_PROJECT_ID (sinon le middleware se désactive).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'HAIRBNB_FIREBASE_PROJECT_ID', None):
+            raise MiddlewareNotUsed("HAIRBNB_FIREBASE_PROJECT_ID n'est pas configuré")
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.firebase_uid = None
+        request.tbluser = None
+
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if authorization.startswith('Bearer '):
+            try:
+                claims = verify_id_token(authorization[len('Bearer '):].strip())
+            except FirebaseAuthError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=401)
+
+            uid = claims['sub']
+            request.firebase_uid = uid
+            request.tbluser = SimpleLazyObject(lambda: get_tbluser(uid))
+
+        return self.get_response(request)
+
+
+def normalize_sql(sql):
+    """ Signature d'une requête : paramètres, littéraux et listes IN (...) de longueur variable remplacés. """
+    sql = IN_LIST.sub('(%s...)', sql)
+    sql = STRING_LITERAL.sub('?', sql)
+    return NUMBER_LITERAL.sub('?', sql)
+
+
+class QueryStats:
+    """ Requêtes SQL d'une requête HTTP, relevées par connection.execute_wrapper(). """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.signatures[normalize_sql(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """ Exécutions en trop : une même signature lancée plusieurs fois (typiquement une boucle N+1). """
+        return sum(count - 1 for count in self.signatures.values() if count > 1)
+
+    def most_repeated(self):
+        signature, count = self.signatures.most_common(1)[0] if self.signatures else ('', 0)
+        return (signature, count) if count > 1 else (None, 0)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mesure chaque requête HTTP : vue, nombre de requêtes SQL, temps passé en base,
+    requêtes répétées (même SQL normalisé) et durée totale.
+
+    - En-tête Server-Timing (visible dans les outils de développement du navigateur) :
+        Server-Timing: db;dur=12.4;desc="7 queries, 4 dup", total;dur=31.0
+    - Une ligne de log JSON par requête (logger "hairbnb.requests", niveau INFO).
+    - Un avertissement (logger "hairbnb.query_budget", niveau WARNING) quand une vue dépasse son
+      budget de requêtes : HAIRBNB_QUERY_BUDGETS = {"nom_de_vue": 5, ...}, sinon
+      HAIRBNB_DEFAULT_QUERY_BUDGET (None = pas de limite par défaut).
+    - Les métriques Prometheus par route (hairbnb.services.metrics, vue /metrics) : compteur de requêtes,
+      histogrammes de durée, de nombre de requêtes SQL et de temps en base.
+
+    À placer en tête de settings.MIDDLEWARE pour compter aussi les requêtes des autres middlewares :
+        'hairbnb.middleware.QueryInstrumentationMiddleware'
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        Metrics.register_exit_flush()
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+
+        duplicates = stats.duplicates
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{stats.count} queries, {duplicates} dup", total;dur={wall_ms:.1f}'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        entry = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(db_ms, 2),
+            'duplicates': duplicates,
+            'wall_ms': round(wall_ms, 2),
+        }
+        if duplicates:
+            entry['most_repeated'], entry['most_repeated_count'] = stats.most_repeated()
+        logger.info(json.dumps(entry))
+
+        # Nom de route plutôt que chemin : nombre de séries borné (les 404 hors routes sont regroupées)
+        route = (('route', view or 'unmatched'),)
+        Metrics.inc('hairbnb_http_requests_total',
+                    (*route, ('method', request.method), ('status', str(response.status_code))))
+        Metrics.observe('hairbnb_http_request_duration_seconds', wall_ms / 1000, route)
+        Metrics.observe('hairbnb_http_request_db_queries', stats.count, route)
+        Metrics.observe('hairbnb_http_request_db_seconds', stats.duration, route)
+        Metrics.maybe_flush()
+
+        budget = getattr(settings, 'HAIRBNB_QUERY_BUDGETS', {}).get(
+            view, getattr(settings, 'HAIRBNB_DEFAULT_QUERY_BUDGET', None)
+        )
+        if budget is not None and stats.count > budget:
+            budget_logger.warning(
+                f"⚠️ {view} : {stats.count} requêtes SQL pour un budget de {budget} ({request.method} {request.path})",
+                extra={'request_measure': entry},
+            )
+        return response
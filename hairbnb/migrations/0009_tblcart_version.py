@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0008_alter_tblpromotion_start_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tblcart',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0009_tblcart_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tblcart',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
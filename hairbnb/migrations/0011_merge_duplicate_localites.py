@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_localites(apps, schema_editor):
+    """
+    Fusionne les localités en double (même commune et même code postal) avant d'ajouter
+    la contrainte unique : la plus ancienne est conservée, les rues et adresses y sont rattachées.
+    """
+    TblLocalite = apps.get_model('hairbnb', 'TblLocalite')
+    TblRue = apps.get_model('hairbnb', 'TblRue')
+    TblAdresse = apps.get_model('hairbnb', 'TblAdresse')
+
+    duplicates = (
+        TblLocalite.objects.values('commune', 'code_postal')
+        .annotate(total=Count('idTblLocalite'), keep=Min('idTblLocalite'))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        others = TblLocalite.objects.filter(
+            commune=group['commune'], code_postal=group['code_postal']
+        ).exclude(idTblLocalite=group['keep'])
+        for rue in TblRue.objects.filter(localite__in=others):
+            existing = TblRue.objects.filter(localite_id=group['keep'], nom_rue=rue.nom_rue).first()
+            if existing:
+                # La rue existe déjà dans la localité conservée : on y déplace les adresses
+                TblAdresse.objects.filter(rue=rue).update(rue=existing)
+                rue.delete()
+            else:
+                rue.localite_id = group['keep']
+                rue.save(update_fields=['localite'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0010_tblcart_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_localites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Migration séparée de la fusion : PostgreSQL refuse un ALTER TABLE dans la même
+    # transaction que des modifications avec contraintes de clé étrangère en attente
+
+    dependencies = [
+        ('hairbnb', '0011_merge_duplicate_localites'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='tbllocalite',
+            unique_together={('commune', 'code_postal')},
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:18
+
+import hairbnb.services.media_storage
+import hairbnb.services.upload_services
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0012_alter_tbllocalite_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TblMediaBlob',
+            fields=[
+                ('idTblMediaBlob', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='tblimagesalon',
+            name='urlImages',
+            field=models.ImageField(storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to=hairbnb.services.upload_services.salon_image_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='tblsalon',
+            name='logo_salon',
+            field=models.ImageField(blank=True, default='photos/defaults/logo_default.png', null=True, storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to='photos/logos/'),
+        ),
+        migrations.AlterField(
+            model_name='tbluser',
+            name='photo_profil',
+            field=models.ImageField(blank=True, default='photos/defaults/avatar.png', null=True, storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to='photos/profils/'),
+        ),
+    ]
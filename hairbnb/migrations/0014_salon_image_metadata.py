@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0013_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tblimagesalon',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tblimagesalon',
+            name='placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='tblimagesalon',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tblimagesalon',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tblimagesalon',
+            index=models.Index(fields=['salon', 'idTblImageSalon'], name='imagesalon_salon_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0014_salon_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TblCartTokenCommit',
+            fields=[
+                ('idTblCartTokenCommit', models.AutoField(primary_key=True, serialize=False)),
+                ('nonce', models.CharField(max_length=32, unique=True)),
+                ('committed_at', models.DateTimeField(auto_now_add=True)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_commits', to='hairbnb.tblcart')),
+            ],
+        ),
+    ]
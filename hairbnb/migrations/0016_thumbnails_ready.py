@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:59
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Champ image de chaque table
+IMAGE_FIELDS = {'TblUser': 'photo_profil', 'TblSalon': 'logo_salon', 'TblImageSalon': 'urlImages'}
+
+
+def full_derivative_exists(name):
+    # Copie figée de ThumbnailService.derivative_name(name, 'full') : la migration ne dépend pas du code courant
+    base, _ = os.path.splitext(name)
+    return any(os.path.exists(os.path.join(settings.MEDIA_ROOT, 'derivees', base, f'full{extension}'))
+               for extension in ('.webp', '.jpg'))
+
+
+def mark_existing_thumbnails(apps, schema_editor):
+    """ Les images dont les miniatures existent déjà dans le stockage les servent dès la migration. """
+    for model_name, field in IMAGE_FIELDS.items():
+        model = apps.get_model('hairbnb', model_name)
+        names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}) \
+            .values_list(field, flat=True).distinct()
+        for name in names.iterator():
+            if full_derivative_exists(name):
+                model.objects.filter(**{field: name}).update(thumbnails_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0015_tblcarttokencommit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tblimagesalon',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='tblsalon',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='tbluser',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_thumbnails, migrations.RunPython.noop),
+    ]
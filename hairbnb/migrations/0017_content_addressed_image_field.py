@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+import hairbnb.services.media_storage
+import hairbnb.services.upload_services
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0016_thumbnails_ready'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tblimagesalon',
+            name='urlImages',
+            field=hairbnb.services.media_storage.ContentAddressedImageField(storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to=hairbnb.services.upload_services.salon_image_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='tblsalon',
+            name='logo_salon',
+            field=hairbnb.services.media_storage.ContentAddressedImageField(blank=True, default='photos/defaults/logo_default.png', null=True, storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to='photos/logos/'),
+        ),
+        migrations.AlterField(
+            model_name='tbluser',
+            name='photo_profil',
+            field=hairbnb.services.media_storage.ContentAddressedImageField(blank=True, default='photos/defaults/avatar.png', null=True, storage=hairbnb.services.media_storage.ContentAddressedStorage(), upload_to='photos/profils/'),
+        ),
+    ]
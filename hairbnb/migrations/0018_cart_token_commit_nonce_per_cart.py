@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hairbnb', '0017_content_addressed_image_field'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tblcarttokencommit',
+            name='nonce',
+            field=models.CharField(max_length=32),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tblcarttokencommit',
+            unique_together={('cart', 'nonce')},
+        ),
+    ]
@@ -1,8 +1,11 @@
 from _pydecimal import Decimal
 
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum
 from django.utils.timezone import now
+from hairbnb.services.media_storage import ContentAddressedImageField, media_storage
 from hairbnb.services.upload_services import salon_image_upload_to
+from hairbnb.utils import first_related
 
 
 # Table pour gérer les localités
@@ -11,6 +14,9 @@ class TblLocalite(models.Model):
     commune = models.CharField(max_length=255)
     code_postal = models.CharField(max_length=10)
 
+    class Meta:
+        unique_together = ('commune', 'code_postal')  # Permet les insertions concurrentes sans doublon
+
     def __str__(self):
         return f"{self.commune} ({self.code_postal})"
 
@@ -43,6 +49,16 @@ class TblAdresse(models.Model):
         return f"{self.numero}, {self.boite_postale or ''}, {self.rue.nom_rue}, {self.rue.localite.commune}"
 
 
+class TblUserQuerySet(models.QuerySet):
+    def with_profile(self):
+        """
+        Charge le profil complet d'un utilisateur : adresse (rue, localité) et ligne coiffeuse
+        en une seule requête (JOIN), la ligne client en une seconde requête (prefetch).
+        Utilisé par CurrentUserData, CurrentUserSerializer et get_user_profile.
+        """
+        return self.select_related('adresse__rue__localite', 'coiffeuse').prefetch_related('clients')
+
+
 # Table utilisateur de base
 class TblUser(models.Model):
     idTblUser = models.AutoField(primary_key=True)
@@ -64,12 +80,20 @@ class TblUser(models.Model):
     adresse = models.ForeignKey(
         'TblAdresse', on_delete=models.SET_NULL, null=True, related_name='utilisateurs'
     )
-    photo_profil = models.ImageField(
+    photo_profil = ContentAddressedImageField(
         upload_to='photos/profils/',
+        storage=media_storage,  # Stockage par contenu (un seul fichier par image identique)
         null=True,
         blank=True,
         default='photos/defaults/avatar.png'  # Avatar par défaut
     )
+    thumbnails_ready = models.BooleanField(default=False)  # Miniatures de photo_profil générées (ThumbnailService.urls)
+
+    objects = TblUserQuerySet.as_manager()
+
+    def profile_loaded(self):
+        """ Vrai si l'instance vient de TblUser.objects.with_profile() (aucune requête supplémentaire à prévoir). """
+        return 'clients' in getattr(self, '_prefetched_objects_cache', {})
 
     def __str__(self):
         return f"{self.nom} {self.prenom} ({self.type})"
@@ -130,16 +154,54 @@ class TblPrix(models.Model):
 #         return f"{self.prix} €"
 
 
+def service_detail_prefetches(prefix=''):
+    """
+    Prefetch du temps, du prix et des promotions actives d'un service (utilisés par ServiceData).
+    `prefix` permet de les appliquer depuis un autre modèle, ex: 'service__' pour TblCartItem.
+    """
+    maintenant = now()
+    return [
+        Prefetch(f'{prefix}service_temps',
+                 queryset=TblServiceTemps.objects.select_related('temps').order_by('pk')),
+        Prefetch(f'{prefix}service_prix',
+                 queryset=TblServicePrix.objects.select_related('prix').order_by('pk')),
+        Prefetch(f'{prefix}promotions',
+                 queryset=TblPromotion.objects.filter(start_date__lte=maintenant, end_date__gte=maintenant)
+                 .order_by('pk'),
+                 to_attr='promotions_actives'),
+    ]
+
+
+class TblServiceQuerySet(models.QuerySet):
+    def with_details(self):
+        """ Services avec temps, prix et promotions actives préchargés (nombre de requêtes constant). """
+        return self.prefetch_related(*service_detail_prefetches())
+
+
 # Table pour gérer les services
 class TblService(models.Model):
     idTblService = models.AutoField(primary_key=True)
     intitule_service = models.CharField(max_length=255)
     description = models.TextField()
 
+    objects = TblServiceQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.intitule_service} €"
 
 
+class TblSalonQuerySet(models.QuerySet):
+    def with_services(self):
+        """
+        Salons avec coiffeuse et services (temps, prix, promotions actives) préchargés pour SalonData :
+        nombre de requêtes constant, quel que soit le nombre de services du salon.
+        """
+        return self.select_related('coiffeuse__idTblUser').prefetch_related(
+            Prefetch('salon_service', queryset=TblSalonService.objects.select_related('service').order_by('pk')),
+            *service_detail_prefetches('salon_service__service__')
+        )
+
+
 # Table pour gérer les salons
 class TblSalon(models.Model):
     idTblSalon = models.AutoField(primary_key=True)
@@ -147,15 +209,20 @@ class TblSalon(models.Model):
         'TblCoiffeuse', on_delete=models.CASCADE, related_name='salon'
     )
     slogan = models.CharField(max_length=255, blank=True, null=True)
-    logo_salon = models.ImageField(
+    logo_salon = ContentAddressedImageField(
         upload_to='photos/logos/',
+        storage=media_storage,
         null=True,
         blank=True,
         default='photos/defaults/logo_default.png'  # Logo par défaut
     )
+    thumbnails_ready = models.BooleanField(default=False)  # Miniatures de logo_salon générées
     services = models.ManyToManyField(
         TblService, related_name='salons', through='TblSalonService'
     )
+
+    objects = TblSalonQuerySet.as_manager()
+
     def __str__(self):
         return f"Salon de {self.coiffeuse.idTblUser.nom} {self.coiffeuse.idTblUser.prenom}"
 
@@ -176,16 +243,39 @@ class TblSalonService(models.Model):
 # Table pour gérer les images de salon
 class TblImageSalon(models.Model):
     idTblImageSalon = models.AutoField(primary_key=True)
-    urlImages = models.ImageField(upload_to=salon_image_upload_to)  # Appel de la méthode externe
+    urlImages = ContentAddressedImageField(upload_to=salon_image_upload_to, storage=media_storage)  # Appel de la méthode externe
     salon = models.ForeignKey(
         TblSalon,
         on_delete=models.CASCADE,
         related_name='images'
     )
+    # Calculés une fois à l'upload : le client prépare la grille sans télécharger les images
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)  # En octets
+    placeholder = models.TextField(blank=True, default='')  # Data URI d'une miniature floue (~16 px)
+    thumbnails_ready = models.BooleanField(default=False)  # Miniatures de urlImages générées
+
+    class Meta:
+        # Pagination de la galerie par clé (salon, puis ID croissant)
+        indexes = [models.Index(fields=['salon', 'idTblImageSalon'], name='imagesalon_salon_id_idx')]
 
     def __str__(self):
         return f"Image du salon {self.salon.coiffeuse.idTblUser.nom} - {self.urlImages.name}"
 
+# Fichiers envoyés (stockage par contenu) et nombre de lignes qui les utilisent
+class TblMediaBlob(models.Model):
+    idTblMediaBlob = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, unique=True)  # blobs/ab/cd/<sha256>.<ext>
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()  # En octets
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} référence(s))"
+
+
     # Table de jonction pour relier les services et les temps
 class TblServiceTemps(models.Model):
     idServiceTemps = models.AutoField(primary_key=True)
@@ -226,15 +316,48 @@ class TblCart(models.Model):
         TblUser, on_delete=models.CASCADE, related_name="cart"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Dernière activité (utilisé par purge_carts)
+    version = models.PositiveIntegerField(default=0)  # Incrémentée à chaque modification du panier
+
+    def totals(self):
+        """
+        Retourne (nombre d'articles, total du panier) en une seule requête (SUM côté base).
+        Le nombre d'articles additionne les quantités : 2 coupes + 1 brushing = 3 articles (2 lignes).
+        """
+        prix_unitaire = Subquery(
+            TblServicePrix.objects.filter(service=OuterRef('service'))
+            .order_by('pk')
+            .values('prix__prix')[:1]
+        )
+        resultat = self.items.aggregate(
+            item_count=Sum('quantity'),
+            total=Sum(ExpressionWrapper(
+                F('quantity') * prix_unitaire,
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ))
+        )
+        return resultat['item_count'] or 0, resultat['total'] or 0
 
     def total_price(self):
         """ Calcule le total du panier """
-        return sum(item.total_price() for item in self.items.all())
+        return self.totals()[1]
 
     def __str__(self):
         return f"Panier de {self.user.nom} {self.user.prenom} - {self.items.count()} articles"
 
 
+class TblCartItemQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Précharge tout ce qu'il faut pour sérialiser les articles (service, temps,
+        prix, promotion active) en un nombre constant de requêtes, quel que soit
+        le nombre d'articles dans le panier.
+        """
+        return self.select_related('service').prefetch_related(
+            *service_detail_prefetches('service__')
+        ).order_by('pk')
+
+
 # 📌 Modèle pour les articles du panier
 class TblCartItem(models.Model):
     idTblCartItem = models.AutoField(primary_key=True)
@@ -246,9 +369,11 @@ class TblCartItem(models.Model):
     )
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = TblCartItemQuerySet.as_manager()
+
     def total_price(self):
         """ Calcule le total pour cet article """
-        prix_service = self.service.service_prix.first().prix.prix  # 🔥 Récupère le prix via la relation
+        prix_service = first_related(self.service, 'service_prix').prix.prix  # 🔥 Utilise le prefetch s'il existe
         return self.quantity * prix_service
 
     def __str__(self):
@@ -257,6 +382,17 @@ class TblCartItem(models.Model):
     class Meta:
         unique_together = ('cart', 'service')  # ✅ Un même service ne peut pas être ajouté plusieurs fois
 
+
+# 📌 Jetons de panier déjà fusionnés (commit_token_cart) : un retry avec le même jeton n'ajoute rien
+class TblCartTokenCommit(models.Model):
+    idTblCartTokenCommit = models.AutoField(primary_key=True)
+    cart = models.ForeignKey(TblCart, on_delete=models.CASCADE, related_name="token_commits")
+    nonce = models.CharField(max_length=32)  # Identifiant aléatoire du jeton (CartTokenService)
+    committed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('cart', 'nonce')  # Un jeton n'est fusionné qu'une fois par panier
+
 class TblPromotion(models.Model):
     idPromotion = models.AutoField(primary_key=True)
     service = models.ForeignKey('TblService', on_delete=models.CASCADE, related_name="promotions")
@@ -0,0 +1,9 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsFirebaseAuthenticated(BasePermission):
+    """ Requête authentifiée par un ID token Firebase valide (FirebaseAuthenticationMiddleware). """
+    message = "Authentification Firebase requise."
+
+    def has_permission(self, request, view):
+        return bool(getattr(request, 'firebase_uid', None))
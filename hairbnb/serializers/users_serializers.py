@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from hairbnb.models import TblUser, TblCoiffeuse, TblClient, TblRue, TblLocalite, TblAdresse
+from hairbnb.services.thumbnail_service import ThumbnailService
 
 
 # 🔹 Serializer pour la Localité
@@ -30,14 +31,18 @@ class AdresseSerializer(serializers.ModelSerializer):
 # 🔹 Serializer pour l'Utilisateur (User)
 class UserSerializer(serializers.ModelSerializer):
     adresse = AdresseSerializer()
+    photo_profil_urls = serializers.SerializerMethodField()  # Miniatures thumb / card / full
 
     class Meta:
         model = TblUser
         fields = [
             'uuid', 'nom', 'prenom', 'email', 'numero_telephone', 'date_naissance',
-            'sexe', 'is_active', 'photo_profil', 'type', 'adresse'
+            'sexe', 'is_active', 'photo_profil', 'photo_profil_urls', 'type', 'adresse'
         ]
 
+    def get_photo_profil_urls(self, obj):
+        return ThumbnailService.urls(obj.photo_profil)
+
 
 # 🔹 Serializer COMPLET pour la Coiffeuse
 class CoiffeuseSerializer(serializers.ModelSerializer):
@@ -65,28 +70,29 @@ class CurrentUserSerializer(serializers.ModelSerializer):
     qu'il soit Client ou Coiffeuse.
     """
     extra_data = serializers.SerializerMethodField()
+    photo_profil_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = TblUser
         fields = [
             'idTblUser','uuid', 'nom', 'prenom', 'email', 'numero_telephone', 'date_naissance',
-            'sexe', 'is_active', 'photo_profil', 'type', 'extra_data'
+            'sexe', 'is_active', 'photo_profil', 'photo_profil_urls', 'type', 'extra_data'
         ]
 
+    def get_photo_profil_urls(self, obj):
+        return ThumbnailService.urls(obj.photo_profil)
+
     def get_extra_data(self, obj):
-        """Retourne les informations spécifiques selon le type d'utilisateur (coiffeuse ou client)."""
+        """
+        Retourne les informations spécifiques selon le type d'utilisateur (coiffeuse ou client).
+        Passer un utilisateur chargé avec TblUser.objects.with_profile() : aucune requête ici.
+        """
         if obj.type == "coiffeuse":
-            try:
-                coiffeuse = TblCoiffeuse.objects.get(idTblUser=obj)
-                return CoiffeuseSerializer(coiffeuse).data
-            except TblCoiffeuse.DoesNotExist:
-                return None
+            coiffeuse = getattr(obj, 'coiffeuse', None)
+            return CoiffeuseSerializer(coiffeuse).data if coiffeuse else None
         elif obj.type == "client":
-            try:
-                client = TblClient.objects.get(idTblUser=obj)
-                return ClientSerializer(client).data
-            except TblClient.DoesNotExist:
-                return None
+            client = next(iter(obj.clients.all()), None)
+            return ClientSerializer(client).data if client else None
         return None
 
 
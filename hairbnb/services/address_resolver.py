@@ -0,0 +1,174 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from hairbnb.models import TblLocalite, TblRue
+
+
+def clean_label(value):
+    """ Valeur enregistrée en base : espaces superflus retirés, casse et accents conservés. """
+    return ' '.join(str(value).split())
+
+
+def normalize_label(value):
+    """
+    Clé de comparaison : sans accents, sans casse, tirets/apostrophes traités comme des espaces.
+    "Liège", "LIEGE " et "liege" donnent la même clé ; "Rue Saint-Gilles" == "rue saint gilles".
+    """
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    for separator in "-'’":
+        value = value.replace(separator, ' ')
+    return ' '.join(value.casefold().split())
+
+
+class AddressResolver:
+    """
+    Remplace TblLocalite.objects.get_or_create / TblRue.objects.get_or_create.
+
+    Un LRU par processus associe :
+    - (commune, code_postal) normalisés → idTblLocalite ;
+    - (nom_rue normalisé, idTblLocalite) → idTblRue.
+
+    Sur un défaut de cache, les localités d'un code postal (resp. les rues d'une localité)
+    sont chargées en une requête et toutes mémorisées : les inscriptions suivantes dans la même
+    commune ne touchent plus ces tables. La comparaison se fait sur la clé normalisée, donc
+    "Liege" réutilise la localité "Liège" existante.
+
+    Les lignes manquantes sont insérées avec bulk_create(ignore_conflicts=True) puis relues :
+    deux inscriptions simultanées dans une nouvelle commune ne lèvent pas d'IntegrityError
+    et obtiennent le même ID (contraintes uniques de TblLocalite et TblRue).
+
+    Le LRU ne reçoit que des IDs validés : dans une transaction, les lignes relues (dont celles qu'elle
+    vient d'insérer) ne sont mémorisées qu'au commit, et oubliées si elle est annulée.
+
+    Les localités et rues ne sont jamais modifiées par l'application ; une suppression (admin)
+    vide le LRU de ce processus via les signaux, les autres processus le reconstruisent au redémarrage.
+    """
+    LRU_SIZE = getattr(settings, 'HAIRBNB_ADDRESS_LRU_SIZE', 50000)
+    CHUNK_SIZE = 500
+
+    _lru = OrderedDict()
+    _lock = threading.Lock()
+    stats = {'hits': 0, 'misses': 0, 'inserted': 0}
+
+    @classmethod
+    def resolve_localite(cls, commune, code_postal):
+        """ Retourne l'ID de la localité, créée si besoin. """
+        return cls._resolve_localites([(commune, code_postal)])[0]
+
+    @classmethod
+    def resolve(cls, commune, code_postal, nom_rue):
+        """ Retourne l'ID de la rue (et de sa localité), créées si besoin. """
+        return cls.resolve_many([(commune, code_postal, nom_rue)])[0]
+
+    @classmethod
+    def resolve_many(cls, addresses):
+        """
+        Résout une liste de (commune, code_postal, nom_rue) en IDs de TblRue, dans le même ordre.
+        Le nombre de requêtes dépend du nombre de codes postaux et de localités nouvelles,
+        pas du nombre d'adresses : adapté aux imports.
+        """
+        addresses = list(addresses)
+        localite_ids = cls._resolve_localites([(commune, code_postal) for commune, code_postal, _ in addresses])
+        wanted = [(localite_id, nom_rue) for localite_id, (_, _, nom_rue) in zip(localite_ids, addresses)]
+
+        keys = [('rue', normalize_label(nom_rue), localite_id) for localite_id, nom_rue in wanted]
+        resolved = cls._lookup(keys)
+        missing = [(key, localite_id, nom_rue) for key, (localite_id, nom_rue) in zip(keys, wanted)
+                   if key not in resolved]
+        if missing:
+            loaded = cls._load_rues({localite_id for _, localite_id, _ in missing})
+            to_create = {}
+            for key, localite_id, nom_rue in missing:
+                if key not in loaded and key not in to_create:  # La première orthographe rencontrée est gardée
+                    to_create[key] = TblRue(nom_rue=clean_label(nom_rue), localite_id=localite_id)
+            if to_create:
+                cls._insert(TblRue, list(to_create.values()))
+                loaded.update(cls._load_rues({rue.localite_id for rue in to_create.values()}))
+            resolved.update({key: loaded[key] for key, _, _ in missing})
+        return [resolved[key] for key in keys]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._lru.clear()
+
+    @classmethod
+    def _resolve_localites(cls, localites):
+        keys = [('localite', normalize_label(commune), clean_label(code_postal)) for commune, code_postal in localites]
+        resolved = cls._lookup(keys)
+        missing = {}
+        for key, (commune, code_postal) in zip(keys, localites):
+            if key not in resolved and key not in missing:  # La première orthographe rencontrée est gardée
+                missing[key] = (commune, code_postal)
+        if missing:
+            loaded = cls._load_localites({key[2] for key in missing})
+            to_create = {key: TblLocalite(commune=clean_label(commune), code_postal=key[2])
+                         for key, (commune, code_postal) in missing.items() if key not in loaded}
+            if to_create:
+                cls._insert(TblLocalite, list(to_create.values()))
+                loaded.update(cls._load_localites({key[2] for key in to_create}))
+            resolved.update({key: loaded[key] for key in missing})
+        return [resolved[key] for key in keys]
+
+    @classmethod
+    def _load_localites(cls, codes_postaux):
+        """ Charge et mémorise toutes les localités de ces codes postaux ; retourne {clé: ID}. """
+        loaded = {}
+        codes_postaux = sorted(codes_postaux)
+        for start in range(0, len(codes_postaux), cls.CHUNK_SIZE):
+            rows = TblLocalite.objects.filter(code_postal__in=codes_postaux[start:start + cls.CHUNK_SIZE]) \
+                .order_by('-idTblLocalite').values_list('idTblLocalite', 'commune', 'code_postal')
+            # En cas de doublons normalisés ("Liège" / "Liege"), la plus ancienne localité l'emporte
+            loaded.update({('localite', normalize_label(commune), code_postal): pk for pk, commune, code_postal in rows})
+        cls._remember_on_commit(loaded)
+        return loaded
+
+    @classmethod
+    def _load_rues(cls, localite_ids):
+        """ Charge et mémorise toutes les rues de ces localités ; retourne {clé: ID}. """
+        loaded = {}
+        localite_ids = sorted(localite_ids)
+        for start in range(0, len(localite_ids), cls.CHUNK_SIZE):
+            rows = TblRue.objects.filter(localite_id__in=localite_ids[start:start + cls.CHUNK_SIZE]) \
+                .order_by('-idTblRue').values_list('idTblRue', 'nom_rue', 'localite_id')
+            loaded.update({('rue', normalize_label(nom_rue), localite_id): pk for pk, nom_rue, localite_id in rows})
+        cls._remember_on_commit(loaded)
+        return loaded
+
+    @classmethod
+    def _insert(cls, model, objects):
+        # Une ligne insérée entre-temps par une autre requête est ignorée ici puis relue par l'appelant
+        model.objects.bulk_create(objects, batch_size=cls.CHUNK_SIZE, ignore_conflicts=True)
+        cls.stats['inserted'] += len(objects)
+
+    @classmethod
+    def _lookup(cls, keys):
+        found = {}
+        with cls._lock:
+            for key in keys:
+                pk = cls._lru.get(key)
+                if pk is not None:
+                    cls._lru.move_to_end(key)
+                    found[key] = pk
+        cls.stats['hits'] += len(found)
+        cls.stats['misses'] += len(keys) - len(found)
+        return found
+
+    @classmethod
+    def _remember_on_commit(cls, entries):
+        # Hors transaction, on_commit() exécute immédiatement
+        transaction.on_commit(lambda: cls._remember(entries))
+
+    @classmethod
+    def _remember(cls, entries):
+        with cls._lock:
+            cls._lru.update(entries)
+            for key in entries:
+                cls._lru.move_to_end(key)
+            while len(cls._lru) > cls.LRU_SIZE:
+                cls._lru.popitem(last=False)
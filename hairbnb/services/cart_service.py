@@ -0,0 +1,204 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from hairbnb.models import TblCart, TblCartItem, TblService
+
+
+class CartOperationError(ValueError):
+    """ Opération de panier invalide (type inconnu, service inexistant, quantité invalide...). """
+
+
+class CartService:
+    @staticmethod
+    def bump_version(cart):
+        """
+        Incrémente la version du panier après une modification et met à jour updated_at.
+
+        L'incrément est fait côté base avec F() pour rester correct si plusieurs
+        requêtes modifient le même panier en parallèle, puis la nouvelle valeur
+        est relue dans l'instance. (update() ne déclenche pas auto_now, d'où le now() explicite.)
+        """
+        TblCart.objects.filter(pk=cart.pk).update(version=F('version') + 1, updated_at=now())
+        cart.refresh_from_db(fields=['version', 'updated_at'])
+        return cart.version
+
+    TOUCH_INTERVAL = timedelta(hours=1)
+
+    @staticmethod
+    def touch(cart):
+        """
+        Marque un panier consulté comme actif (updated_at), pour que purge_carts ne supprime pas
+        un panier qu'on regarde sans le modifier. Au plus une écriture par TOUCH_INTERVAL et par panier.
+        """
+        if cart.updated_at and now() - cart.updated_at < CartService.TOUCH_INTERVAL:
+            return
+        cart.updated_at = now()
+        TblCart.objects.filter(pk=cart.pk).update(updated_at=cart.updated_at)
+
+    @staticmethod
+    def lock_cart(cart_id):
+        """
+        Verrouille la ligne TblCart jusqu'à la fin de la transaction en cours : les écritures
+        d'un même panier (add_item, apply_operations) passent l'une après l'autre.
+
+        UPDATE plutôt que select_for_update() : SQLite ignore FOR UPDATE, alors qu'une écriture
+        y prend le verrou de la base. updated_at est de toute façon mis à jour par bump_version.
+        """
+        TblCart.objects.filter(pk=cart_id).update(updated_at=now())
+
+    @staticmethod
+    def add_item(cart, service_id, quantity=1):
+        """
+        Ajoute `quantity` exemplaires d'un service au panier, ou incrémente la ligne existante.
+
+        L'incrément est fait par la base (quantity = quantity + n), jamais en Python,
+        pour ne perdre aucune mise à jour quand l'application envoie plusieurs
+        requêtes en même temps (double tap, retry réseau).
+
+        Le panier est verrouillé (lock_cart) pendant l'écriture : un apply_operations en cours
+        sur le même panier ne peut pas écraser la ligne créée ici avec une quantité calculée avant.
+
+        Retourne l'ID de la ligne TblCartItem concernée.
+        """
+        with transaction.atomic(savepoint=False):  # Rien à annuler en propre : pas de savepoint dans un atomic
+            CartService.lock_cart(cart.pk)
+            return CartService._add_item(cart, service_id, quantity)
+
+    @staticmethod
+    def _add_item(cart, service_id, quantity):
+        if connection.vendor in ('postgresql', 'sqlite'):
+            return CartService._upsert_item(cart.pk, service_id, quantity)
+
+        # Autres bases : UPDATE atomique avec F(), puis INSERT si la ligne n'existe pas encore.
+        # Si une autre requête l'insère entre-temps, la contrainte unique_together('cart', 'service')
+        # lève IntegrityError et on refait l'UPDATE.
+        items = TblCartItem.objects.filter(cart_id=cart.pk, service_id=service_id)
+        if not items.update(quantity=F('quantity') + quantity):
+            try:
+                with transaction.atomic():
+                    return TblCartItem.objects.create(cart_id=cart.pk, service_id=service_id, quantity=quantity).pk
+            except IntegrityError:
+                items.update(quantity=F('quantity') + quantity)
+        return items.values_list('pk', flat=True).get()
+
+    OPERATIONS = ('add', 'set', 'remove')
+
+    @staticmethod
+    def parse_operations(operations):
+        """
+        Valide une liste d'opérations {"op": "add" | "set" | "remove", "service_id": ..., "quantity": ...}
+        et vérifie en une seule requête que tous les services existent.
+
+        Retourne une liste de tuples (op, service_id, quantity).
+        Lève CartOperationError si une opération est invalide.
+        """
+        parsed = []
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                raise CartOperationError(f"Opération n°{index + 1} invalide.")
+            op = operation.get('op')
+            if op not in CartService.OPERATIONS:
+                raise CartOperationError(f"Opération n°{index + 1} : type '{op}' inconnu (add, set ou remove).")
+            try:
+                service_id = int(operation.get('service_id'))
+                quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+            except (TypeError, ValueError):
+                raise CartOperationError(f"Opération n°{index + 1} : service_id et quantity doivent être des entiers.")
+            if quantity < 0 or (op == 'add' and quantity == 0):
+                raise CartOperationError(f"Opération n°{index + 1} : quantité invalide.")
+            parsed.append((op, service_id, quantity))
+
+        service_ids = {service_id for _, service_id, _ in parsed}
+        existing_services = set(TblService.objects.filter(pk__in=service_ids).values_list('pk', flat=True))
+        missing = sorted(service_ids - existing_services)
+        if missing:
+            raise CartOperationError(f"Services introuvables : {missing}")
+        return parsed
+
+    @staticmethod
+    def fold_operations(parsed, current):
+        """
+        Applique les opérations dans l'ordre sur les quantités actuelles ({service_id: quantité})
+        et retourne les quantités finales des services touchés (0 = ligne à supprimer).
+        """
+        final_quantities = {}
+        for op, service_id, quantity in parsed:
+            if op == 'add':
+                final_quantities[service_id] = final_quantities.get(service_id, current.get(service_id, 0)) + quantity
+            elif op == 'set':
+                final_quantities[service_id] = quantity
+            else:
+                final_quantities[service_id] = 0
+        return final_quantities
+
+    @staticmethod
+    def apply_operations(cart, operations):
+        """
+        Applique une liste d'opérations au panier dans une seule transaction.
+
+        Les opérations sont appliquées dans l'ordre, mais l'écriture est regroupée :
+        - une requête pour valider tous les services,
+        - une requête pour verrouiller le panier (lock_cart) et une pour lire les lignes existantes,
+        - un bulk upsert pour les lignes à créer/modifier et un DELETE pour les lignes à retirer.
+
+        Lève CartOperationError (sans rien écrire) si une opération est invalide.
+        """
+        parsed = CartService.parse_operations(operations)
+        service_ids = {service_id for _, service_id, _ in parsed}
+
+        with transaction.atomic():
+            # Verrou sur le panier, pas seulement sur les lignes existantes : une ligne insérée par un
+            # add_item concurrent entre la lecture et l'upsert serait sinon écrasée (quantité absolue)
+            CartService.lock_cart(cart.pk)
+            current = dict(
+                TblCartItem.objects
+                .filter(cart_id=cart.pk, service_id__in=service_ids)
+                .values_list('service_id', 'quantity')
+            )
+            final_quantities = CartService.fold_operations(parsed, current)
+
+            upserts = [
+                TblCartItem(cart_id=cart.pk, service_id=service_id, quantity=quantity)
+                for service_id, quantity in final_quantities.items()
+                if quantity > 0 and current.get(service_id) != quantity
+            ]
+            deletions = [
+                service_id for service_id, quantity in final_quantities.items()
+                if quantity == 0 and service_id in current
+            ]
+
+            if upserts:
+                TblCartItem.objects.bulk_create(
+                    upserts, update_conflicts=True,
+                    unique_fields=['cart', 'service'], update_fields=['quantity']
+                )
+            if deletions:
+                TblCartItem.objects.filter(cart_id=cart.pk, service_id__in=deletions).delete()
+            if upserts or deletions:
+                CartService.bump_version(cart)
+
+        return len(upserts), len(deletions)
+
+    @staticmethod
+    def _upsert_item(cart_id, service_id, quantity):
+        """ INSERT ... ON CONFLICT DO UPDATE : création ou incrément en un seul aller-retour. """
+        qn = connection.ops.quote_name
+        meta = TblCartItem._meta
+        table = qn(meta.db_table)
+        cart_col = qn(meta.get_field('cart').column)
+        service_col = qn(meta.get_field('service').column)
+        quantity_col = qn(meta.get_field('quantity').column)
+        pk_col = qn(meta.pk.column)
+
+        sql = (
+            f"INSERT INTO {table} ({cart_col}, {service_col}, {quantity_col}) VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({cart_col}, {service_col}) "
+            f"DO UPDATE SET {quantity_col} = {table}.{quantity_col} + EXCLUDED.{quantity_col} "
+            f"RETURNING {pk_col}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [cart_id, service_id, quantity])
+            return cursor.fetchone()[0]
@@ -0,0 +1,70 @@
+import secrets
+
+from django.conf import settings
+from django.core import signing
+
+
+class CartTokenService:
+    """
+    Panier côté client : le contenu du panier est stocké dans un jeton signé
+    (cookie ou en-tête X-Cart-Token) au lieu de TblCart / TblCartItem.
+
+    Le jeton ne contient que des paires [service_id, quantité], une version et un nonce
+    (identifiant aléatoire, renouvelé à chaque modification du panier, qui permet à commit_token_cart
+    de reconnaître un jeton déjà fusionné) ; la signature (SECRET_KEY) empêche le client de le modifier.
+    Les prix ne sont jamais stockés dans le jeton : ils sont relus en base à chaque affichage.
+    """
+    SALT = 'hairbnb.cart_token'
+    COOKIE_NAME = 'hairbnb_cart'
+    HEADER = 'HTTP_X_CART_TOKEN'
+    MAX_AGE = getattr(settings, 'HAIRBNB_CART_TOKEN_MAX_AGE', 30 * 24 * 3600)  # 30 jours
+    MAX_LINES = getattr(settings, 'HAIRBNB_CART_TOKEN_MAX_LINES', 50)
+
+    @staticmethod
+    def dumps(items, version=0, nonce=None):
+        """
+        Sérialise {service_id: quantité} en jeton signé et compressé.
+        Sans nonce (panier modifié), un nouveau nonce est tiré.
+        """
+        payload = {'i': [[service_id, quantity] for service_id, quantity in items.items() if quantity > 0],
+                   'v': version, 'n': nonce or secrets.token_hex(8)}
+        return signing.dumps(payload, salt=CartTokenService.SALT, compress=True)
+
+    @staticmethod
+    def loads(token):
+        """
+        Retourne ({service_id: quantité}, version, nonce) à partir d'un jeton.
+        Un jeton absent, expiré ou falsifié donne un panier vide (nonce None).
+        """
+        if not token:
+            return {}, 0, None
+        try:
+            payload = signing.loads(token, salt=CartTokenService.SALT, max_age=CartTokenService.MAX_AGE)
+            items = {int(service_id): int(quantity) for service_id, quantity in payload.get('i', [])}
+            return items, int(payload.get('v', 0)), payload.get('n')
+        except (signing.BadSignature, TypeError, ValueError):
+            return {}, 0, None
+
+    @staticmethod
+    def too_large(items):
+        """ Message d'erreur si le panier dépasse MAX_LINES services, None sinon. """
+        if len(items) > CartTokenService.MAX_LINES:
+            return f"Le panier est limité à {CartTokenService.MAX_LINES} services."
+        return None
+
+    @staticmethod
+    def from_request(request):
+        """ Lit le jeton dans l'en-tête X-Cart-Token, sinon dans le cookie, sinon dans le corps. """
+        token = request.META.get(CartTokenService.HEADER) or request.COOKIES.get(CartTokenService.COOKIE_NAME)
+        if not token and hasattr(request, 'data'):
+            token = request.data.get('cart_token')
+        return CartTokenService.loads(token)
+
+    @staticmethod
+    def attach(response, token):
+        """ Renvoie le jeton au client dans un cookie (navigateur) ; le corps de la réponse le contient aussi. """
+        response.set_cookie(
+            CartTokenService.COOKIE_NAME, token, max_age=CartTokenService.MAX_AGE,
+            httponly=True, samesite='Lax'
+        )
+        return response
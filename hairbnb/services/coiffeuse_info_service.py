@@ -0,0 +1,67 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from hairbnb.business.business_logic import MinimalCoiffeuseData
+from hairbnb.models import TblCoiffeuse
+
+
+class CoiffeuseInfoService:
+    """
+    Infos minimales (MinimalCoiffeuseData) d'une liste d'uuid, pour les écrans chat et favoris.
+
+    - Les uuid sont dédoublonnés et le résultat suit l'ordre de la liste reçue.
+    - Chaque coiffeuse est mise en cache individuellement (CACHE_TIMEOUT secondes) :
+      une liste déjà vue ne touche plus la base, même si elle est dans un ordre différent.
+    - Les uuid absents du cache sont lus par paquets de CHUNK_SIZE (une requête par paquet,
+      utilisateur joint, seules les colonnes utiles sont chargées).
+
+    Les signaux de hairbnb/signals.py appellent invalidate() quand un utilisateur ou une coiffeuse change.
+    """
+    CACHE_PREFIX = 'hairbnb:coiffeuse_info:'
+    CACHE_TIMEOUT = getattr(settings, 'HAIRBNB_COIFFEUSE_INFO_CACHE_TIMEOUT', 300)
+    CHUNK_SIZE = getattr(settings, 'HAIRBNB_COIFFEUSE_INFO_CHUNK_SIZE', 200)
+    MAX_UUIDS = getattr(settings, 'HAIRBNB_COIFFEUSE_INFO_MAX_UUIDS', 1000)
+
+    stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def _cache_key(uuid):
+        return CoiffeuseInfoService.CACHE_PREFIX + hashlib.sha1(uuid.encode()).hexdigest()
+
+    @staticmethod
+    def get_many(uuids):
+        """ Retourne la liste des MinimalCoiffeuseData (dict) des uuid qui correspondent à une coiffeuse. """
+        uuids = list(dict.fromkeys(uuids))  # Dédoublonne en gardant l'ordre
+        keys = {uuid: CoiffeuseInfoService._cache_key(uuid) for uuid in uuids}
+        cached = cache.get_many(keys.values())
+        found = {uuid: cached[key] for uuid, key in keys.items() if key in cached}
+
+        missing = [uuid for uuid in uuids if uuid not in found]
+        CoiffeuseInfoService.stats['hits'] += len(found)
+        CoiffeuseInfoService.stats['misses'] += len(missing)
+        fetched = {}
+        for start in range(0, len(missing), CoiffeuseInfoService.CHUNK_SIZE):
+            chunk = missing[start:start + CoiffeuseInfoService.CHUNK_SIZE]
+            coiffeuses = (
+                TblCoiffeuse.objects.select_related('idTblUser')
+                .only('position', 'idTblUser__idTblUser', 'idTblUser__uuid', 'idTblUser__nom',
+                      'idTblUser__prenom', 'idTblUser__photo_profil', 'idTblUser__thumbnails_ready')
+                .filter(idTblUser__uuid__in=chunk)
+            )
+            for coiffeuse in coiffeuses:
+                fetched[coiffeuse.idTblUser.uuid] = dict(MinimalCoiffeuseData(coiffeuse).to_dict())
+
+        if fetched:
+            cache.set_many({keys[uuid]: data for uuid, data in fetched.items()}, CoiffeuseInfoService.CACHE_TIMEOUT)
+        found.update(fetched)
+        return [found[uuid] for uuid in uuids if uuid in found]
+
+    @staticmethod
+    def invalidate(uuid):
+        # Après le commit, comme ProfileFragmentCache.bump : une lecture concurrente ne remet pas l'ancienne version
+        # en cache, et une modification annulée n'invalide rien
+        key = CoiffeuseInfoService._cache_key(uuid)
+        transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,248 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from hairbnb.models import TblAdresse, TblCart, TblCartItem, TblClient, TblCoiffeuse, TblLocalite, TblPrix, \
+    TblPromotion, TblRue, TblSalon, TblSalonService, TblService, TblServicePrix, TblServiceTemps, TblTemps, TblUser
+from hairbnb.services.uuid_bloom import KnownUuids
+
+# Centres autour desquels les coiffeuses sont placées (latitude, longitude)
+CITY_CENTRES = (
+    (50.6326, 5.5797),  # Liège
+    (50.8503, 4.3517),  # Bruxelles
+    (50.4674, 4.8720),  # Namur
+    (50.4108, 4.4446),  # Charleroi
+    (51.0543, 3.7174),  # Gand
+    (51.2194, 4.4025),  # Anvers
+)
+POSITION_SPREAD = 0.05  # Écart type en degrés (~5 km)
+STREET_NAMES = ('Rue de la Station', 'Rue de l\'Église', 'Avenue des Lilas', 'Rue du Moulin', 'Chaussée de Liège',
+                'Rue des Écoles', 'Place du Marché', 'Rue Haute', 'Boulevard de la Sauvenière', 'Rue Neuve')
+FIRST_NAMES = ('Marie', 'Sophie', 'Julie', 'Laura', 'Emma', 'Lucas', 'Thomas', 'Nicolas', 'Sarah', 'Camille')
+LAST_NAMES = ('Dupont', 'Lambert', 'Martin', 'Dubois', 'Peeters', 'Janssens', 'Simon', 'Leclercq', 'Renard')
+SERVICES = (
+    ('Coupe femme', 'Shampooing, coupe et coiffage'), ('Coupe homme', 'Coupe aux ciseaux ou à la tondeuse'),
+    ('Brushing', 'Mise en forme au sèche-cheveux'), ('Coloration', 'Coloration racines et longueurs'),
+    ('Balayage', 'Éclaircissement par mèches'), ('Lissage', 'Lissage brésilien'),
+    ('Chignon', 'Coiffure de cérémonie'), ('Tresses', 'Tresses africaines'),
+    ('Soin profond', 'Masque et massage du cuir chevelu'), ('Barbe', 'Taille et entretien de la barbe'),
+)
+PRICES = [Decimal(value) / 2 for value in range(20, 301, 5)]  # 10,00 € à 150,00 € par pas de 2,50 €
+DURATIONS = (15, 30, 45, 60, 75, 90, 120, 150, 180)
+
+
+def numbered(values, index):
+    """ values[index], puis "<valeur> 2", "<valeur> 3"... une fois la liste épuisée : noms toujours distincts. """
+    value = values[index % len(values)]
+    return value if index < len(values) else f"{value} {index // len(values) + 1}"
+
+
+def service_catalogue(rng, count):
+    """ count services (intitulé, description) d'un salon, sans doublon. """
+    if count <= len(SERVICES):
+        return rng.sample(SERVICES, count)
+    names = [name for name, _ in SERVICES]
+    return [(numbered(names, i), SERVICES[i % len(SERVICES)][1]) for i in range(count)]
+
+
+class DatasetSeeder:
+    """
+    Génère un jeu de données synthétique pour les tests de charge : localités, rues, adresses,
+    utilisateurs (coiffeuses avec position, salon et services ; clients avec panier), prix, durées et promotions.
+
+    Tout est tiré d'un random.Random(seed) : mêmes paramètres (taille de lot comprise) et même graine
+    donnent les mêmes données, hors identifiants et dates (relatives au lancement).
+    Les insertions se font par bulk_create, un lot de chunk_size utilisateurs (et tout ce qui en dépend)
+    par transaction : la mémoire reste bornée et un lot coûte un nombre fixe de requêtes.
+
+    Les utilisateurs ont un uuid commençant par UUID_PREFIX et les localités une commune commençant
+    par COMMUNE_PREFIX, ce qui permet de les supprimer (clear) sans toucher aux vraies données.
+    """
+    UUID_PREFIX = 'seed-'
+    COMMUNE_PREFIX = 'Seed '
+    CHUNK_SIZE = 5000
+    DEFAULTS = {
+        'localites': 200, 'streets': 20, 'users': 10000, 'coiffeuse_ratio': 0.1, 'services_per_salon': 10,
+        'promotion_ratio': 0.2, 'cart_ratio': 0.3, 'cart_items': 5,
+    }
+    # Tailles prédéfinies (communes à manage.py seed --scale et à bench_api)
+    SCALES = {
+        'small': {'localites': 50, 'users': 1000, 'services_per_salon': 20, 'cart_ratio': 0.5},
+        'medium': {'localites': 200, 'users': 10000, 'services_per_salon': 20, 'cart_ratio': 0.5},
+        'large': {'localites': 500, 'users': 50000, 'services_per_salon': 20, 'cart_ratio': 0.5},
+    }
+
+    def __init__(self, seed=42, chunk_size=None, on_chunk=None):
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.on_chunk = on_chunk  # on_chunk(report) après chaque lot
+        self.report = {'localites': 0, 'rues': 0, 'adresses': 0, 'users': 0, 'coiffeuses': 0, 'clients': 0,
+                       'salons': 0, 'services': 0, 'service_links': 0, 'promotions': 0, 'carts': 0, 'cart_items': 0}
+
+    @staticmethod
+    def random_position(rng):
+        """ (latitude, longitude) autour d'un des centres de CITY_CENTRES. """
+        latitude, longitude = rng.choice(CITY_CENTRES)
+        return rng.gauss(latitude, POSITION_SPREAD), rng.gauss(longitude, POSITION_SPREAD)
+
+    @classmethod
+    def exists(cls):
+        return TblUser.objects.filter(uuid__startswith=cls.UUID_PREFIX).exists()
+
+    def run(self, **options):
+        """ Génère le jeu de données (options : clés de DEFAULTS) et retourne le nombre de lignes par table. """
+        options = {**self.DEFAULTS, **options}
+        rue_ids = self._seed_addresses(options['localites'], options['streets'])
+        prix_ids, temps_ids = self._reference_rows()
+
+        client_ids, service_ids = [], []
+        for start in range(0, options['users'], self.chunk_size):
+            count = min(self.chunk_size, options['users'] - start)
+            clients, services = self._seed_users(start, count, rue_ids, prix_ids, temps_ids, options)
+            client_ids.extend(clients)
+            service_ids.extend(services)
+            self._progress()
+
+        # Paniers une fois tous les services créés : un panier peut contenir des services de n'importe quel salon
+        with_cart = [client_id for client_id in client_ids if self.rng.random() < options['cart_ratio']]
+        if service_ids:
+            for start in range(0, len(with_cart), self.chunk_size):
+                self._seed_carts(with_cart[start:start + self.chunk_size], service_ids, options['cart_items'])
+                self._progress()
+        return self.report
+
+    def _progress(self):
+        if self.on_chunk:
+            self.on_chunk(self.report)
+
+    def _seed_addresses(self, localites, streets):
+        rng = self.rng
+        rue_ids = []
+        per_chunk = max(self.chunk_size // max(streets, 1), 1)  # Localités par lot, rues comprises
+        for start in range(0, localites, per_chunk):
+            with transaction.atomic():
+                created = TblLocalite.objects.bulk_create([
+                    TblLocalite(commune=f'{self.COMMUNE_PREFIX}{i}', code_postal=str(rng.randint(1000, 9999)))
+                    for i in range(start, min(start + per_chunk, localites))
+                ])
+                rues = TblRue.objects.bulk_create([
+                    TblRue(nom_rue=numbered(STREET_NAMES, j), localite_id=localite.pk)
+                    for localite in created for j in range(streets)
+                ])
+            rue_ids.extend(rue.pk for rue in rues)
+            self.report['localites'] += len(created)
+            self.report['rues'] += len(rues)
+        return rue_ids
+
+    def _reference_rows(self):
+        """ Prix et durées partagés par les services ; les lignes existantes sont réutilisées (get_or_create des vues). """
+        existing_prices = dict(TblPrix.objects.filter(prix__in=PRICES).values_list('prix', 'idTblPrix'))
+        TblPrix.objects.bulk_create([TblPrix(prix=prix) for prix in PRICES if prix not in existing_prices])
+        existing_durations = set(TblTemps.objects.filter(minutes__in=DURATIONS).values_list('minutes', flat=True))
+        TblTemps.objects.bulk_create([TblTemps(minutes=minutes) for minutes in DURATIONS
+                                      if minutes not in existing_durations])
+
+        prix_ids = list(TblPrix.objects.filter(prix__in=PRICES).order_by('prix').values_list('idTblPrix', flat=True))
+        temps = {}
+        for temps_id, minutes in TblTemps.objects.filter(minutes__in=DURATIONS).order_by('pk') \
+                .values_list('idTblTemps', 'minutes'):
+            temps.setdefault(minutes, temps_id)  # Une seule ligne par durée, même si la table contient des doublons
+        return prix_ids, [temps[minutes] for minutes in DURATIONS]
+
+    def _seed_users(self, start, count, rue_ids, prix_ids, temps_ids, options):
+        rng = self.rng
+        today = now()
+        with transaction.atomic():
+            adresses = TblAdresse.objects.bulk_create([
+                TblAdresse(numero=str(rng.randint(1, 250)), rue_id=rng.choice(rue_ids)) for _ in range(count)
+            ])
+            users = TblUser.objects.bulk_create([
+                TblUser(
+                    uuid=f'{self.UUID_PREFIX}{i:09d}', nom=rng.choice(LAST_NAMES), prenom=rng.choice(FIRST_NAMES),
+                    email=f'{self.UUID_PREFIX}{i}@example.com',
+                    type='coiffeuse' if rng.random() < options['coiffeuse_ratio'] else 'client',
+                    sexe=rng.choice(('femme', 'homme', 'autre')), numero_telephone=f'04{rng.randint(0, 99999999):08d}',
+                    date_naissance=(today - timedelta(days=rng.randint(18 * 365, 70 * 365))).date(),
+                    adresse_id=adresse.pk,
+                )
+                for i, adresse in zip(range(start, start + count), adresses)
+            ])
+            coiffeuses = TblCoiffeuse.objects.bulk_create([
+                TblCoiffeuse(idTblUser_id=user.pk, denomination_sociale=f'Salon {user.prenom} {user.nom}',
+                             position='{:.6f}, {:.6f}'.format(*self.random_position(rng)))
+                for user in users if user.type == 'coiffeuse'
+            ])
+            clients = TblClient.objects.bulk_create([
+                TblClient(idTblUser_id=user.pk) for user in users if user.type == 'client'
+            ])
+            salons = TblSalon.objects.bulk_create([
+                TblSalon(coiffeuse_id=coiffeuse.pk, slogan=f'Bienvenue chez {coiffeuse.denomination_sociale}')
+                for coiffeuse in coiffeuses
+            ])
+
+            # Services propres à chaque salon (comme add_service_to_coiffeuse), avec prix, durée et promotion éventuelle
+            salon_services = [(salon, service_catalogue(rng, options['services_per_salon'])) for salon in salons]
+            services = TblService.objects.bulk_create([
+                TblService(intitule_service=name, description=description)
+                for _, catalogue in salon_services for name, description in catalogue
+            ])
+            owners = [salon for salon, catalogue in salon_services for _ in catalogue]
+            TblSalonService.objects.bulk_create([
+                TblSalonService(salon_id=salon.pk, service_id=service.pk) for salon, service in zip(owners, services)
+            ])
+            TblServicePrix.objects.bulk_create([
+                TblServicePrix(service_id=service.pk, prix_id=rng.choice(prix_ids)) for service in services
+            ])
+            TblServiceTemps.objects.bulk_create([
+                TblServiceTemps(service_id=service.pk, temps_id=rng.choice(temps_ids)) for service in services
+            ])
+            promotions = []
+            for service in services:
+                if rng.random() < options['promotion_ratio']:
+                    # Promotions en cours pour la plupart, quelques-unes terminées ou à venir
+                    start_date = today + timedelta(days=rng.randint(-30, 10))
+                    promotions.append(TblPromotion(
+                        service_id=service.pk, discount_percentage=rng.choice((10, 15, 20, 25, 30, 50)),
+                        start_date=start_date, end_date=start_date + timedelta(days=rng.randint(7, 60)),
+                    ))
+            TblPromotion.objects.bulk_create(promotions)
+
+        KnownUuids.add_many([user.uuid for user in users])  # bulk_create ne déclenche pas post_save
+        for key, rows in (('adresses', adresses), ('users', users), ('coiffeuses', coiffeuses), ('clients', clients),
+                          ('salons', salons), ('services', services), ('promotions', promotions)):
+            self.report[key] += len(rows)
+        self.report['service_links'] += 3 * len(services)  # Salon, prix et durée de chaque service
+        return [client.idTblUser_id for client in clients], [service.pk for service in services]
+
+    def _seed_carts(self, client_user_ids, service_ids, max_items):
+        rng = self.rng
+        with transaction.atomic():
+            carts = TblCart.objects.bulk_create([TblCart(user_id=user_id) for user_id in client_user_ids])
+            items = TblCartItem.objects.bulk_create([
+                TblCartItem(cart_id=cart.pk, service_id=service_id, quantity=rng.randint(1, 3))
+                for cart in carts
+                for service_id in rng.sample(service_ids, min(rng.randint(1, max_items), len(service_ids)))
+            ])
+        self.report['carts'] += len(carts)
+        self.report['cart_items'] += len(items)
+
+    @classmethod
+    def clear(cls, chunk_size=None):
+        """
+        Supprime les données générées (par lots) : services des salons générés, utilisateurs
+        (avec coiffeuse, client, salon, panier en cascade), puis localités (avec rues et adresses).
+        """
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        seeded_users = TblUser.objects.filter(uuid__startswith=cls.UUID_PREFIX)
+        services = TblService.objects.filter(salon_service__salon__coiffeuse__idTblUser__uuid__startswith=cls.UUID_PREFIX)
+        for queryset, model, key in ((services, TblService, 'idTblService'), (seeded_users, TblUser, 'idTblUser'),
+                                     (TblLocalite.objects.filter(commune__startswith=cls.COMMUNE_PREFIX),
+                                      TblLocalite, 'idTblLocalite')):
+            while True:
+                ids = list(queryset.values_list(key, flat=True)[:chunk_size])
+                if not ids:
+                    break
+                model.objects.filter(**{f'{key}__in': ids}).delete()
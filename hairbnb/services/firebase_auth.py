@@ -0,0 +1,141 @@
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from cryptography import x509
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FirebaseAuthError(Exception):
+    """ Jeton Firebase absent, mal formé, expiré ou dont la signature est invalide. """
+
+
+class FirebaseKeyStore:
+    """
+    Clés publiques (certificats x509) avec lesquelles Firebase signe les ID tokens.
+
+    Google publie les certificats avec un Cache-Control: max-age (quelques heures) :
+    - au premier appel, ils sont téléchargés (appel bloquant, une seule fois par processus : les requêtes
+      simultanées attendent ce téléchargement ; en cas d'échec, elles sont refusées sans appeler Google
+      jusqu'au prochain essai, MIN_REFRESH_INTERVAL plus tard) ;
+    - une fois expirés, les anciens restent utilisés pendant qu'un thread en arrière-plan
+      les renouvelle, pour qu'aucune requête n'attende Google ;
+    - un `kid` inconnu (rotation des clés) force un rechargement, au plus une fois par MIN_REFRESH_INTERVAL.
+    """
+    CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+    DEFAULT_MAX_AGE = 3600
+    MIN_REFRESH_INTERVAL = 60
+
+    _keys = None
+    _expires_at = 0.0
+    _fetched_at = 0.0
+    _lock = threading.RLock()  # Réentrant : load() le reprend pendant le chargement initial
+    _refreshing = False
+    stats = {'refreshes': 0, 'refresh_errors': 0}
+
+    @classmethod
+    def get_key(cls, kid):
+        """ Retourne la clé publique associée au `kid` d'un jeton, ou None. """
+        if cls._keys is None:
+            with cls._lock:
+                # Premier appel ou échec récent (refresh() repousse _expires_at) : un seul téléchargement à la fois
+                if cls._keys is None and time.monotonic() >= cls._expires_at:
+                    cls.refresh()
+            if cls._keys is None:
+                raise FirebaseAuthError("Clés publiques Firebase indisponibles, réessayez plus tard.")
+        elif time.monotonic() >= cls._expires_at:
+            cls._refresh_in_background()
+
+        key = cls._keys.get(kid) if cls._keys else None
+        if key is None and time.monotonic() - cls._fetched_at > cls.MIN_REFRESH_INTERVAL:
+            cls.refresh()
+            key = cls._keys.get(kid) if cls._keys else None
+        return key
+
+    @classmethod
+    def load(cls, certificates, max_age=None):
+        """ Remplace les clés par {kid: certificat PEM} (utilisé aussi par les tests, sans réseau). """
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in certificates.items()
+        }
+        with cls._lock:
+            cls._keys = keys
+            cls._fetched_at = time.monotonic()
+            cls._expires_at = cls._fetched_at + (max_age if max_age is not None else cls.DEFAULT_MAX_AGE)
+
+    @classmethod
+    def fetch(cls):
+        """ Télécharge les certificats ; retourne ({kid: PEM}, max_age en secondes). """
+        response = requests.get(cls.CERTS_URL, timeout=5)
+        response.raise_for_status()
+        match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+        return response.json(), int(match.group(1)) if match else cls.DEFAULT_MAX_AGE
+
+    @classmethod
+    def refresh(cls):
+        try:
+            certificates, max_age = cls.fetch()
+            cls.load(certificates, max_age)
+            cls.stats['refreshes'] += 1
+        except Exception as e:
+            # On garde les anciennes clés et on réessaiera plus tard
+            cls.stats['refresh_errors'] += 1
+            cls._fetched_at = time.monotonic()
+            cls._expires_at = time.monotonic() + cls.MIN_REFRESH_INTERVAL
+            logger.error(f"❌ Impossible de récupérer les clés publiques Firebase : {e}")
+
+    @classmethod
+    def _refresh_in_background(cls):
+        with cls._lock:
+            if cls._refreshing:
+                return
+            cls._refreshing = True
+
+        def run():
+            try:
+                cls.refresh()
+            finally:
+                cls._refreshing = False
+
+        threading.Thread(target=run, name='firebase-keys-refresh', daemon=True).start()
+
+
+def verify_id_token(token):
+    """
+    Vérifie localement un ID token Firebase (signature RS256, audience, émetteur, expiration)
+    et retourne ses claims ; l'uid Firebase (TblUser.uuid) est dans claims['sub'].
+    Lève FirebaseAuthError si le jeton n'est pas valide.
+    """
+    project_id = getattr(settings, 'HAIRBNB_FIREBASE_PROJECT_ID', None)
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError:
+        raise FirebaseAuthError("Jeton mal formé.")
+    if header.get('alg') != 'RS256' or not header.get('kid'):
+        raise FirebaseAuthError("Algorithme ou clé de signature non supportés.")
+
+    key = FirebaseKeyStore.get_key(header['kid'])
+    if key is None:
+        raise FirebaseAuthError("Clé de signature inconnue.")
+
+    try:
+        claims = jwt.decode(
+            token, key, algorithms=['RS256'], audience=project_id,
+            issuer=f'https://securetoken.google.com/{project_id}',
+            leeway=getattr(settings, 'HAIRBNB_FIREBASE_CLOCK_SKEW', 10),
+            options={'require': ['exp', 'iat', 'sub']},
+        )
+    except jwt.ExpiredSignatureError:
+        raise FirebaseAuthError("Jeton expiré.")
+    except jwt.PyJWTError as e:
+        raise FirebaseAuthError(f"Jeton invalide : {e}")
+
+    if not claims['sub'] or len(claims['sub']) > 128:
+        raise FirebaseAuthError("uid Firebase invalide.")
+    return claims
@@ -1,5 +1,9 @@
+import time
+
 import requests
 
+from hairbnb.services.metrics import Metrics
+
 
 class GeolocationService:
     @staticmethod
@@ -20,7 +24,11 @@ class GeolocationService:
         2. Envoyer une requête GET au serveur Nominatim avec un en-tête "User-Agent".
         3. Récupérer et analyser la réponse JSON.
         4. Extraire les coordonnées si elles existent, sinon retourner (None, None).
+
+        Chaque appel est compté (hairbnb_geocoding_requests_total, par résultat) et chronométré.
         """
+        start = time.perf_counter()
+        outcome = 'error'
         try:
             # Construire l'URL avec l'adresse complète
             url = f"https://nominatim.openstreetmap.org/search?q={adresse_complete}&format=json&limit=1"
@@ -39,11 +47,16 @@ class GeolocationService:
                 # Extraire latitude et longitude depuis le premier résultat
                 latitude = data[0]['lat']
                 longitude = data[0]['lon']
+                outcome = 'found'
                 return latitude, longitude
 
             # Si aucun résultat, retourner (None, None)
+            outcome = 'not_found'
             return None, None
         except Exception as e:
             # En cas d'erreur, afficher l'erreur et retourner (None, None)
             print(f"Erreur de géocodage : {e}")
             return None, None
+        finally:
+            Metrics.inc('hairbnb_geocoding_requests_total', (('outcome', outcome),))
+            Metrics.observe('hairbnb_geocoding_duration_seconds', time.perf_counter() - start)
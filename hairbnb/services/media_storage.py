@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.fields.files import ImageFieldFile
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stockage des images envoyées (photo_profil, logo_salon, TblImageSalon.urlImages) par contenu.
+
+    Chaque fichier est haché (SHA-256) pendant sa copie, puis rangé une seule fois sous
+        blobs/<2 premiers caractères>/<2 suivants>/<sha256><extension>
+    quel que soit le upload_to du champ : deux envois des mêmes octets donnent le même nom,
+    et une URL ne désigne jamais qu'un seul contenu (cacheable sans limite de durée).
+
+    TblMediaBlob compte les références : chaque envoi en ajoute une, release() en retire une,
+    et le fichier n'est supprimé (avec ses miniatures) qu'à zéro. Une ligne enregistrée avec le nom
+    d'un blob existant (ex: logo_salon = user.photo_profil.name) en ajoute une via retain().
+    Seuls les signaux de hairbnb/signals.py retirent des références : l'ancien fichier est libéré
+    quand une ligne est supprimée ou enregistrée avec une autre image (ou sans image, après
+    FieldFile.delete()). delete() ne fait donc rien. Les anciens fichiers (hors blobs/) sont lus
+    normalement et jamais comptés.
+    """
+    BLOB_DIR = 'blobs'
+    CHUNK_SIZE = 64 * 1024
+
+    def blob_name(self, digest, extension):
+        return f"{self.BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif est calculé par _save() à partir du contenu : aucun suffixe aléatoire
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1]
+        tmp_dir = self.path(f"{self.BLOB_DIR}/tmp")
+        if getattr(content, 'sha256', None) and hasattr(content, 'temporary_file_path') \
+                and os.path.dirname(content.temporary_file_path()) == tmp_dir:
+            # Reçu par StreamingImageUploadHandler : déjà écrit et haché au bon endroit
+            return self.store(content.temporary_file_path(), content.sha256, extension, content.size)
+
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=extension)
+        try:
+            # Une seule lecture du fichier envoyé : copie et hachage dans la même boucle
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as destination:
+                for chunk in content.chunks(self.CHUNK_SIZE):
+                    digest.update(chunk)
+                    destination.write(chunk)
+                    size += len(chunk)
+            return self.store(tmp_path, digest.hexdigest(), extension, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store(self, tmp_path, digest, extension, size):
+        """
+        Range un fichier temporaire déjà haché (même système de fichiers que MEDIA_ROOT)
+        sous son nom de blob et ajoute une référence. Retourne le nom du blob.
+        """
+        from hairbnb.models import TblMediaBlob  # models importe ce module (storage des ImageField)
+
+        name = self.blob_name(digest, extension)
+        with transaction.atomic():
+            if not TblMediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+                try:
+                    with transaction.atomic():
+                        TblMediaBlob.objects.create(name=name, sha256=digest, size=size)
+                except IntegrityError:  # Même contenu envoyé au même moment par une autre requête
+                    TblMediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+            path = self.path(name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)  # mkstemp crée le fichier en 0600
+                os.replace(tmp_path, path)  # Atomique : un lecteur ne voit jamais de fichier partiel
+        return name
+
+    def retain(self, name):
+        """ Ajoute une référence à un blob existant, affecté par son nom sans passer par store(). """
+        from hairbnb.models import TblMediaBlob
+
+        if name and name.startswith(f"{self.BLOB_DIR}/"):
+            TblMediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+    def delete(self, name):
+        # FieldFile.delete() : la référence est retirée par media_replaced quand la ligne est enregistrée
+        # sans l'image (rien à faire si elle ne l'est jamais : la base référence toujours le fichier)
+        pass
+
+    def release(self, name):
+        """ Retire une référence au blob ; le fichier est supprimé après le commit s'il n'en reste aucune. """
+        from hairbnb.models import TblMediaBlob
+
+        if not name or not name.startswith(f"{self.BLOB_DIR}/"):
+            return  # Image par défaut ou fichier antérieur au stockage par contenu
+        with transaction.atomic():
+            blob = TblMediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                TblMediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+        transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        from hairbnb.models import TblMediaBlob
+        from hairbnb.services.thumbnail_service import ThumbnailService
+
+        # Le même contenu a pu être renvoyé entre-temps : on ne supprime que s'il n'est toujours plus référencé
+        if not TblMediaBlob.objects.filter(name=name).exists():
+            super().delete(name)
+            ThumbnailService.delete(name)
+
+
+class ContentAddressedFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        super().save(name, content, save=False)
+        # Mêmes octets que l'image déjà enregistrée sur la ligne : store() a ajouté une référence
+        # que media_replaced ne retirera pas (nom inchangé)
+        if self.name == getattr(self.instance, '_media_name', None):
+            self.storage.release(self.name)
+        else:
+            self.instance._media_stored = self.name  # Référence déjà ajoutée : media_replaced n'appelle pas retain()
+        if save:
+            self.instance.save()
+
+
+class ContentAddressedImageField(models.ImageField):
+    """ ImageField dont l'envoi d'une image déjà portée par la ligne n'ajoute pas de référence. """
+    attr_class = ContentAddressedFieldFile
+
+
+media_storage = ContentAddressedStorage()
@@ -0,0 +1,258 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from hairbnb.services.address_resolver import AddressResolver
+from hairbnb.services.coiffeuse_info_service import CoiffeuseInfoService
+from hairbnb.services.firebase_auth import FirebaseKeyStore
+from hairbnb.services.profile_fragment_cache import ProfileFragmentCache
+from hairbnb.services.user_resolver import UserResolver
+from hairbnb.services.uuid_bloom import KnownUuids
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+GEOCODING_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+COUNTERS = {
+    'hairbnb_http_requests_total': "Requêtes HTTP traitées, par route, méthode et statut.",
+    'hairbnb_geocoding_requests_total': "Appels à Nominatim, par résultat (found, not_found, error).",
+    'hairbnb_cache_events_total': "Compteurs internes des caches de l'application.",
+}
+HISTOGRAMS = {
+    'hairbnb_http_request_duration_seconds': ("Durée des requêtes HTTP, par route.", LATENCY_BUCKETS),
+    'hairbnb_http_request_db_queries': ("Requêtes SQL par requête HTTP, par route.", QUERY_COUNT_BUCKETS),
+    'hairbnb_http_request_db_seconds': ("Temps passé en base par requête HTTP, par route.", LATENCY_BUCKETS),
+    'hairbnb_geocoding_duration_seconds': ("Durée des appels à Nominatim.", GEOCODING_BUCKETS),
+}
+# Compteurs `stats` des caches : (clés comptées comme succès, clés comptées comme échecs)
+CACHES = {
+    'user_resolver': (UserResolver, ('lru_hits', 'cache_hits'), ('misses',)),
+    'address_resolver': (AddressResolver, ('hits',), ('misses',)),
+    'profile_fragments': (ProfileFragmentCache, ('hits',), ('misses',)),
+    'coiffeuse_info': (CoiffeuseInfoService, ('hits',), ('misses',)),
+    'uuid_bloom': (KnownUuids, ('negatives',), ('positives', 'false_positives')),  # Succès : réponse sans la base
+    'firebase_keys': (FirebaseKeyStore, (), ()),
+}
+
+
+class Metrics:
+    """
+    Métriques au format texte Prometheus (vue /metrics). Les métriques HTTP sont relevées par
+    QueryInstrumentationMiddleware, les appels de géocodage par GeolocationService.geocode_address.
+
+    Collecte peu contendue : chaque thread incrémente ses propres compteurs (threading.local), sans verrou.
+    Le verrou n'est pris qu'à l'arrivée d'un nouveau thread (enregistrement de son fragment)
+    et à la lecture, qui additionne les fragments.
+
+    Plusieurs processus (workers gunicorn/uwsgi) : avec HAIRBNB_METRICS_DIR, chaque processus écrit
+    son instantané dans <dir>/<pid>-<jeton>.json au plus toutes les HAIRBNB_METRICS_FLUSH_INTERVAL secondes
+    (après une requête, écriture atomique par renommage) et à sa sortie ; /metrics additionne tous les fichiers.
+    Les fichiers des processus arrêtés sont conservés pour que les compteurs ne reculent pas :
+    vider le répertoire au redémarrage du serveur (comme PROMETHEUS_MULTIPROC_DIR).
+    Sans HAIRBNB_METRICS_DIR, /metrics ne montre que le processus qui répond.
+    Un processus qui n'a rien relevé (commande manage.py, shell...) n'écrit aucun fichier.
+    """
+    DIR = getattr(settings, 'HAIRBNB_METRICS_DIR', None)
+    FLUSH_INTERVAL = getattr(settings, 'HAIRBNB_METRICS_FLUSH_INTERVAL', 5)
+
+    _local = threading.local()
+    _shards = []  # [(thread, fragment)]
+    _retired = ({}, {})  # Fragments des threads terminés, additionnés
+    _shards_lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _flushed_at = 0.0
+    _exit_flush_registered = False
+    _token = uuid.uuid4().hex[:8]  # Distingue deux processus successifs ayant le même pid
+
+    # ------------------------------------------------------------------ collecte
+    @classmethod
+    def _shard(cls):
+        shard = getattr(cls._local, 'shard', None)
+        if shard is None:
+            shard = cls._local.shard = ({}, {})  # (compteurs, histogrammes) du thread
+            with cls._shards_lock:
+                cls._retire_dead_threads()
+                cls._shards.append((threading.current_thread(), shard))
+        return shard
+
+    @classmethod
+    def _retire_dead_threads(cls):
+        """ Regroupe les fragments des threads terminés (un thread par connexion avec runserver). """
+        alive = []
+        for thread, (counters, histograms) in cls._shards:
+            if thread.is_alive():
+                alive.append((thread, (counters, histograms)))
+                continue
+            for key, value in counters.items():
+                cls._retired[0][key] = cls._retired[0].get(key, 0) + value
+            for key, histogram in histograms.items():
+                _add(cls._retired[1].setdefault(key, [0] * len(histogram)), histogram)
+        cls._shards[:] = alive
+
+    @classmethod
+    def inc(cls, name, labels=(), value=1):
+        counters = cls._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, value, labels=()):
+        histograms = cls._shard()[1]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Compte par intervalle (le dernier pour +Inf) puis somme : le total se déduit des intervalles
+            histogram = histograms[key] = [0] * (len(HISTOGRAMS[name][1]) + 1) + [0.0]
+        histogram[bisect.bisect_left(HISTOGRAMS[name][1], value)] += 1
+        histogram[-1] += value
+
+    @classmethod
+    def snapshot(cls):
+        """ Valeurs du processus : {'counters': {(nom, labels): valeur}, 'histograms': {(nom, labels): [...]}}. """
+        counters, histograms = {}, {}
+        with cls._shards_lock:
+            # Copies prises sous le verrou : un fragment ne peut pas être regroupé (_retired) pendant la lecture.
+            # dict() copie en une opération, même si le thread propriétaire ajoute une clé en même temps.
+            shards = [(dict(shard_counters), {key: list(value) for key, value in dict(shard_histograms).items()})
+                      for shard_counters, shard_histograms in [cls._retired, *(shard for _, shard in cls._shards)]]
+        for shard_counters, shard_histograms in shards:
+            for key, value in shard_counters.items():
+                counters[key] = counters.get(key, 0) + value
+            for key, histogram in shard_histograms.items():
+                _add(histograms.setdefault(key, [0] * len(histogram)), histogram)
+        for cache_name, (owner, _, _) in CACHES.items():
+            for event, value in dict(owner.stats).items():
+                counters[('hairbnb_cache_events_total', (('cache', cache_name), ('event', event)))] = value
+        return {'counters': counters, 'histograms': histograms}
+
+    # ------------------------------------------------------------------ processus multiples
+    @classmethod
+    def _path(cls):
+        return os.path.join(cls.DIR, f'{os.getpid()}-{cls._token}.json')
+
+    @classmethod
+    def register_exit_flush(cls):
+        """
+        Dernier instantané d'un worker qui s'arrête (redémarrage après max_requests, arrêt du serveur).
+        Appelé par QueryInstrumentationMiddleware : seuls les processus qui servent des requêtes sont concernés.
+        """
+        if cls.DIR and not cls._exit_flush_registered:
+            cls._exit_flush_registered = True
+            atexit.register(cls.flush)
+
+    @classmethod
+    def _recorded(cls):
+        with cls._shards_lock:
+            return any(counters or histograms
+                       for counters, histograms in [cls._retired, *(shard for _, shard in cls._shards)])
+
+    @classmethod
+    def flush(cls):
+        """ Écrit l'instantané du processus dans HAIRBNB_METRICS_DIR (rien s'il n'a rien relevé). """
+        if not cls.DIR or not cls._recorded():
+            return
+        with cls._flush_lock:
+            cls._flushed_at = time.monotonic()
+            snapshot = cls.snapshot()
+            data = {kind: [[name, [list(label) for label in labels], value] for (name, labels), value in values.items()]
+                    for kind, values in snapshot.items()}
+            os.makedirs(cls.DIR, exist_ok=True)
+            path = cls._path()
+            with open(path + '.tmp', 'w') as f:
+                json.dump(data, f)
+            os.replace(path + '.tmp', path)  # Les lecteurs voient l'ancien ou le nouveau fichier, jamais un fichier partiel
+
+    @classmethod
+    def maybe_flush(cls):
+        """ Appelé après chaque requête : au plus une écriture par intervalle, sans attendre un autre thread. """
+        if not cls.DIR or time.monotonic() - cls._flushed_at < cls.FLUSH_INTERVAL or cls._flush_lock.locked():
+            return
+        cls.flush()
+
+    @classmethod
+    def collect(cls):
+        """ Instantané de tous les processus (celui-ci compris, à jour). """
+        if not cls.DIR:
+            return cls.snapshot()
+        cls.flush()
+        merged = {'counters': {}, 'histograms': {}}
+        for path in glob.glob(os.path.join(cls.DIR, '*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # Fichier supprimé entre glob() et open()
+            for name, labels, value in data.get('counters', []):
+                key = (name, tuple(tuple(label) for label in labels))
+                merged['counters'][key] = merged['counters'].get(key, 0) + value
+            for name, labels, histogram in data.get('histograms', []):
+                key = (name, tuple(tuple(label) for label in labels))
+                _add(merged['histograms'].setdefault(key, [0] * len(histogram)), histogram)
+        return merged
+
+    # ------------------------------------------------------------------ rendu
+    @classmethod
+    def render(cls):
+        """ Texte au format d'exposition Prometheus 0.0.4. """
+        data = cls.collect()
+        lines = []
+        for name, help_text in COUNTERS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (metric, labels), value in sorted(data['counters'].items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+        lines += ['# HELP hairbnb_cache_hit_ratio Part des lectures servies par le cache, depuis le démarrage.',
+                  '# TYPE hairbnb_cache_hit_ratio gauge']
+        for cache_name, (_, hit_events, miss_events) in CACHES.items():
+            events = {dict(labels)['event']: value for (metric, labels), value in data['counters'].items()
+                      if metric == 'hairbnb_cache_events_total' and dict(labels)['cache'] == cache_name}
+            hits = sum(events.get(event, 0) for event in hit_events)
+            total = hits + sum(events.get(event, 0) for event in miss_events)
+            if total:
+                lines.append(f'hairbnb_cache_hit_ratio{_labels((("cache", cache_name),))} {_number(hits / total)}')
+
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (metric, labels), histogram in sorted(data['histograms'].items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip((*buckets, '+Inf'), histogram[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{name}_bucket{_labels((*labels, ("le", le)))} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(histogram[-1])}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def reset(cls):
+        """ Remet les compteurs du processus à zéro (tests). """
+        with cls._shards_lock:
+            for counters, histograms in [cls._retired, *(shard for _, shard in cls._shards)]:
+                counters.clear()
+                histograms.clear()
+
+
+def _add(total, histogram):
+    for i, value in enumerate(histogram):
+        total[i] += value
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,130 @@
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse
+
+from hairbnb.models import TblCoiffeuse, TblUser
+from hairbnb.serializers.users_serializers import CoiffeuseSerializer, CurrentUserSerializer
+from hairbnb.services.thumbnail_service import ThumbnailService
+
+
+class ProfileFragmentCache:
+    """
+    Cache de fragments JSON déjà sérialisés (bytes) par utilisateur, pour ne pas repasser
+    par les serializers DRF imbriqués à chaque affichage d'un profil.
+
+    Chaque fragment est rangé sous (type de fragment, idTblUser, version du profil).
+    La version est un jeton aléatoire remplacé (bump) après chaque modification de TblUser,
+    TblCoiffeuse, TblClient ou TblAdresse (signaux de hairbnb/signals.py, après le commit) :
+    les anciens fragments ne sont plus jamais lus et expirent d'eux-mêmes.
+
+    Les vues de liste assemblent la réponse directement à partir des fragments (response / join),
+    sans désérialiser ni re-sérialiser : cache chaud = 2 get_many + concaténation d'octets.
+    """
+    VERSION_PREFIX = 'hairbnb:profile_version:'
+    FRAGMENT_PREFIX = 'hairbnb:profile_fragment:'
+    TIMEOUT = getattr(settings, 'HAIRBNB_PROFILE_FRAGMENT_TIMEOUT', 24 * 3600)
+
+    stats = {'hits': 0, 'misses': 0}
+
+    # ------------------------------------------------------------------ fragments
+    @classmethod
+    def coiffeuse_fragments(cls, user_ids):
+        """ CoiffeuseSerializer (get_coiffeuse_by_uuid, coiffeuses_proches), dans l'ordre de user_ids. """
+        def load(ids):
+            coiffeuses = TblCoiffeuse.objects.select_related('idTblUser__adresse__rue__localite') \
+                .filter(idTblUser_id__in=ids)
+            return {coiffeuse.idTblUser_id: CoiffeuseSerializer(coiffeuse).data for coiffeuse in coiffeuses}
+        return cls._fragments('coiffeuse', user_ids, load)
+
+    @classmethod
+    def list_fragments(cls, user_ids):
+        """ Format de list_coiffeuses (profil à plat, sans adresse). """
+        def load(ids):
+            coiffeuses = TblCoiffeuse.objects.select_related('idTblUser').filter(idTblUser_id__in=ids)
+            return {coiffeuse.idTblUser_id: {
+                'id': coiffeuse.id,  # ID de la coiffeuse
+                'uuid': coiffeuse.idTblUser.uuid,  # UUID de l'utilisateur
+                'nom': coiffeuse.idTblUser.nom,
+                'prenom': coiffeuse.idTblUser.prenom,
+                'email': coiffeuse.idTblUser.email,
+                'numero_telephone': coiffeuse.idTblUser.numero_telephone,
+                'photo_profil': coiffeuse.idTblUser.photo_profil.url if coiffeuse.idTblUser.photo_profil else None,
+                'photo_profil_urls': ThumbnailService.urls(coiffeuse.idTblUser.photo_profil),
+                'denomination_sociale': coiffeuse.denomination_sociale,
+                'tva': coiffeuse.tva,
+                'position': coiffeuse.position,
+            } for coiffeuse in coiffeuses}
+        return cls._fragments('list', user_ids, load)
+
+    @classmethod
+    def current_user_fragment(cls, user_id):
+        """ CurrentUserSerializer (get_current_user) ; None si l'utilisateur n'existe pas. """
+        def load(ids):
+            return {user.pk: CurrentUserSerializer(user).data for user in TblUser.objects.with_profile().filter(pk__in=ids)}
+        fragments = cls._fragments('current', [user_id], load)
+        return fragments[0] if fragments else None
+
+    # ------------------------------------------------------------------ réponses
+    @staticmethod
+    def join(fragments):
+        """ Liste JSON à partir de fragments déjà sérialisés. """
+        return b'[' + b','.join(fragments) + b']'
+
+    @staticmethod
+    def response(payload, key, fragment, status=200):
+        """
+        Réponse JSON équivalente à JsonResponse({**payload, key: ...}) où la valeur de `key`
+        est un fragment (ou une liste jointe) déjà sérialisé : il est recopié tel quel.
+        """
+        head = json.dumps(payload, cls=DjangoJSONEncoder).encode()[:-1]
+        body = b''.join([head, b', ' if payload else b'', json.dumps(key).encode(), b': ', fragment, b'}'])
+        return HttpResponse(body, status=status, content_type='application/json')
+
+    # ------------------------------------------------------------------ versions
+    @classmethod
+    def bump(cls, user_ids):
+        """
+        Invalide les fragments de ces utilisateurs. Appelé par les signaux ; exécuté après
+        le commit pour qu'un lecteur ne remette pas en cache l'ancienne version lue avant celui-ci.
+        """
+        user_ids = [user_id for user_id in user_ids if user_id]
+        if user_ids:
+            transaction.on_commit(lambda: cache.set_many(
+                {cls.VERSION_PREFIX + str(user_id): uuid.uuid4().hex for user_id in user_ids}, None
+            ))
+
+    @classmethod
+    def _versions(cls, user_ids):
+        keys = {user_id: cls.VERSION_PREFIX + str(user_id) for user_id in user_ids}
+        found = cache.get_many(keys.values())
+        missing = [key for key in keys.values() if key not in found]
+        if missing:
+            for key in missing:
+                cache.add(key, uuid.uuid4().hex, None)  # add() : deux lecteurs concurrents gardent le même jeton
+            found.update(cache.get_many(missing))
+        return {user_id: found.get(key) for user_id, key in keys.items()}
+
+    @classmethod
+    def _fragments(cls, kind, user_ids, load):
+        user_ids = list(user_ids)
+        versions = cls._versions(set(user_ids))
+        keys = {user_id: f"{cls.FRAGMENT_PREFIX}{kind}:{user_id}:{versions[user_id]}" for user_id in versions}
+        fragments = cache.get_many(keys.values())
+        found = {user_id: fragments[key] for user_id, key in keys.items() if key in fragments}
+
+        missing = [user_id for user_id in keys if user_id not in found]
+        cls.stats['hits'] += len(found)
+        cls.stats['misses'] += len(missing)
+        if missing:
+            rendered = {
+                user_id: json.dumps(data, cls=DjangoJSONEncoder).encode()
+                for user_id, data in load(missing).items()
+            }
+            cache.set_many({keys[user_id]: fragment for user_id, fragment in rendered.items()}, cls.TIMEOUT)
+            found.update(rendered)
+        return [found[user_id] for user_id in user_ids if user_id in found]
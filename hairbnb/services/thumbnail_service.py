@@ -0,0 +1,199 @@
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale (plus grand côté, en pixels) de chaque dérivée.
+# thumb : avatars des listes et du chat (48 px affichés, x2 pour les écrans haute densité)
+# card : cartes coiffeuses / salons ; full : affichage plein écran
+SIZES = {'thumb': 96, 'card': 320, 'full': 1280}
+
+IMAGE_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+
+PLACEHOLDER_SIZE = 16  # Placeholder flou (LQIP) affiché pendant le chargement de l'image
+
+
+def render_derivatives(data, sizes, image_format):
+    """
+    Décode une image et retourne {nom de taille: octets encodés}.
+
+    Exécutée dans un processus du pool : uniquement des octets en entrée et en sortie,
+    aucun accès à Django (base, storage) ici.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)  # Photos de téléphone : applique l'orientation EXIF
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if image_format == 'JPEG' or not has_alpha:
+            image = image.convert('RGB')
+        else:
+            image = image.convert('RGBA')
+
+        rendered = {}
+        for name, max_side in sizes.items():
+            derivative = image.copy()
+            derivative.thumbnail((max_side, max_side), Image.LANCZOS)  # Ne grossit jamais une petite image
+            buffer = io.BytesIO()
+            if image_format == 'WEBP':
+                derivative.save(buffer, format=image_format, quality=80, method=4)
+            else:
+                derivative.save(buffer, format=image_format, quality=80, optimize=True, progressive=True)
+            rendered[name] = buffer.getvalue()
+        return rendered
+
+
+def image_metadata(source):
+    """
+    {width, height, placeholder} d'une image (chemin ou fichier) : dimensions d'affichage
+    (orientation EXIF appliquée) et placeholder en data URI (~200 octets), calculés une fois à l'upload.
+
+    L'appelant limite le nombre de pixels (PNG et WebP sont décodés en entier) ; l'image est réduite
+    dès le décodage, les copies (orientation, transparence, conversion RGB) ne portent que sur la réduction.
+    """
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # Rotation de 90° : largeur et hauteur inversées
+            width, height = height, width
+
+        # JPEG : décodage directement réduit (draft) ; autres formats : reduce() par facteur entier
+        image.thumbnail((PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4), reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image)
+        image = image.convert('RGB')
+        image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=IMAGE_FORMAT, quality=30)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return {'width': width, 'height': height, 'placeholder': f"data:image/{IMAGE_FORMAT.lower()};base64,{encoded}"}
+
+
+class ThumbnailService:
+    """
+    Dérivées (thumb, card, full) des photos de profil et des logos de salon.
+
+    Les dérivées sont rangées à un chemin déduit du fichier original :
+        photos/profils/photo.png -> derivees/photos/profils/photo/thumb.webp
+    La colonne thumbnails_ready de la ligne (TblUser, TblSalon, TblImageSalon) indique qu'elles
+    sont écrites : urls() ne touche jamais le stockage et renvoie l'original pour toutes les tailles
+    tant qu'elle est fausse. Les signaux de hairbnb/signals.py lancent la génération quand l'image
+    d'une ligne change et passent la colonne à vrai une fois les fichiers écrits (thumbnails_generated).
+
+    Le redimensionnement (CPU) tourne dans un pool de processus (spawn) pour ne pas bloquer
+    les workers qui servent les requêtes ; la lecture de l'original et l'écriture des dérivées
+    passent par default_storage dans le processus principal.
+    """
+    DERIVATIVES_DIR = 'derivees'
+    EXTENSION = '.webp' if IMAGE_FORMAT == 'WEBP' else '.jpg'
+    WORKERS = getattr(settings, 'HAIRBNB_THUMBNAIL_WORKERS', 2)
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def derivative_name(name, size):
+        base, _ = os.path.splitext(name)
+        return f"{ThumbnailService.DERIVATIVES_DIR}/{base}/{size}{ThumbnailService.EXTENSION}"
+
+    @staticmethod
+    def urls(fieldfile):
+        """ {taille: URL} pour un ImageField, ou None s'il est vide. """
+        if not fieldfile:
+            return None
+        if getattr(fieldfile.instance, 'thumbnails_ready', False):
+            return {size: default_storage.url(ThumbnailService.derivative_name(fieldfile.name, size)) for size in SIZES}
+        return {size: fieldfile.url for size in SIZES}  # Dérivées pas encore générées
+
+    @classmethod
+    def schedule(cls, fieldfile, on_done=None):
+        """
+        Génère les dérivées d'un ImageField en arrière-plan ; on_done() est appelé une fois
+        les fichiers écrits (ex: invalider les caches de profil). Retourne le Future, ou None.
+        """
+        if not fieldfile:
+            return None
+        name = fieldfile.name
+        if default_storage.exists(cls.derivative_name(name, 'full')):
+            # Stockage par contenu : une image déjà envoyée (même octets, même nom) a déjà ses miniatures
+            if on_done:
+                on_done()
+            return None
+        try:
+            with default_storage.open(name, 'rb') as source:
+                data = source.read()
+        except OSError as e:  # Image par défaut absente du stockage, fichier supprimé entre-temps...
+            logger.warning(f"⚠️ Miniatures de {name} non générées : {e}")
+            return None
+
+        def done(rendered, background=False):
+            # Une image illisible ne doit pas faire échouer l'upload : l'original reste servi
+            if background:
+                # Thread de l'executor : aucune requête ne ferme sa connexion (CONN_MAX_AGE, connexion coupée)
+                close_old_connections()
+            try:
+                cls._save(name, rendered())
+                if on_done:
+                    on_done()
+            except Exception as e:
+                logger.error(f"❌ Échec de la génération des miniatures de {name} : {e}")
+            finally:
+                if background:
+                    close_old_connections()
+
+        executor = cls._get_executor()
+        if executor is None:  # HAIRBNB_THUMBNAIL_WORKERS = 0 : génération dans la requête
+            done(lambda: render_derivatives(data, SIZES, IMAGE_FORMAT))
+            return None
+
+        future = executor.submit(render_derivatives, data, SIZES, IMAGE_FORMAT)
+        future.add_done_callback(lambda completed: done(completed.result, background=True))
+        return future
+
+    @classmethod
+    def generate(cls, name, force=False):
+        """ Génération synchrone (commande generate_thumbnails). Retourne False si déjà faite. """
+        if not force and default_storage.exists(cls.derivative_name(name, 'full')):
+            return False
+        with default_storage.open(name, 'rb') as source:
+            cls._save(name, render_derivatives(source.read(), SIZES, IMAGE_FORMAT))
+        return True
+
+    @classmethod
+    def delete(cls, name):
+        """ Supprime les dérivées d'une image (fichier original supprimé du stockage). """
+        for size in SIZES:
+            default_storage.delete(cls.derivative_name(name, size))
+
+    @classmethod
+    def _save(cls, name, rendered):
+        # "full" en dernier : sa présence signifie que toutes les tailles sont disponibles
+        for size in sorted(rendered, key=lambda size: size == 'full'):
+            derivative = cls.derivative_name(name, size)
+            if default_storage.exists(derivative):
+                default_storage.delete(derivative)
+            default_storage.save(derivative, ContentFile(rendered[size]))
+
+    @classmethod
+    def _get_executor(cls):
+        if cls.WORKERS <= 0:
+            return None
+        with cls._lock:
+            if cls._executor is None:
+                # spawn : un fork copierait les connexions à la base et les threads du worker
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=cls.WORKERS, mp_context=multiprocessing.get_context('spawn')
+                )
+            return cls._executor
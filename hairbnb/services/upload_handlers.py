@@ -0,0 +1,168 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image
+
+from hairbnb.services.media_storage import media_storage
+from hairbnb.services.thumbnail_service import image_metadata
+
+# Signatures (premiers octets) des formats acceptés : le type envoyé par le client n'est pas fiable
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', '.png', 'image/png'),
+)
+SIGNATURE_LENGTH = 12  # RIFF....WEBP
+
+
+def sniff_image(head):
+    """ (extension, type MIME) d'après les premiers octets, ou None si le format n'est pas accepté. """
+    for signature, extension, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension, content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp', 'image/webp'
+    return None
+
+
+class HashedUploadedFile(UploadedFile):
+    """
+    Fichier reçu par StreamingImageUploadHandler : déjà écrit dans le répertoire temporaire
+    du stockage par contenu et déjà haché. ContentAddressedStorage le déplace simplement à
+    son emplacement définitif (aucune seconde copie).
+    `metadata` : {width, height, placeholder} (voir image_metadata).
+    """
+
+    def __init__(self, path, name, content_type, size, sha256, metadata):
+        super().__init__(open(path, 'rb'), name, content_type, size)
+        self.path = path
+        self.sha256 = sha256
+        self.metadata = metadata
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            if os.path.exists(self.path):  # Fichier refusé ou jamais enregistré
+                os.remove(self.path)
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    Handler d'upload des images de galerie : chaque morceau reçu est écrit directement dans
+    MEDIA_ROOT/blobs/tmp et haché au passage. La mémoire utilisée ne dépend ni de la taille
+    ni du nombre d'images (un morceau de CHUNK_SIZE à la fois).
+
+    Les limites sont vérifiées pendant la réception : format (signature des premiers octets),
+    taille de chaque image et nombre d'images. Un fichier refusé est ignoré (SkipFile) et
+    son erreur ajoutée à `errors` ; les autres fichiers de la requête sont conservés.
+
+    Limites : HAIRBNB_GALLERY_MAX_IMAGE_SIZE (octets, 10 Mo par défaut),
+    HAIRBNB_GALLERY_MAX_IMAGES (10 par requête par défaut) et HAIRBNB_GALLERY_MAX_PIXELS
+    (25 mégapixels par défaut). Cette dernière est vérifiée sur l'en-tête, avant tout décodage :
+    un PNG uni de quelques centaines de Ko peut décrire des centaines de Mo de pixels.
+    """
+    chunk_size = 64 * 1024
+    MAX_IMAGE_SIZE = getattr(settings, 'HAIRBNB_GALLERY_MAX_IMAGE_SIZE', 10 * 1024 * 1024)
+    MAX_IMAGES = getattr(settings, 'HAIRBNB_GALLERY_MAX_IMAGES', 10)
+    MAX_PIXELS = getattr(settings, 'HAIRBNB_GALLERY_MAX_PIXELS', 25 * 1000 * 1000)
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = []
+        self.accepted = 0
+        self.destination = None
+        self.path = None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.path = None
+        if self.accepted >= self.MAX_IMAGES:
+            raise self._reject(f"Maximum {self.MAX_IMAGES} images par envoi.")
+        if self.content_length and self.content_length > self.MAX_IMAGE_SIZE:
+            raise self._reject(self._too_large())
+
+        tmp_dir = media_storage.path(f"{media_storage.BLOB_DIR}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir)
+        self.destination = os.fdopen(fd, 'wb')
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.detected = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.detected is None:
+            self.head += raw_data[:SIGNATURE_LENGTH]
+            if len(self.head) >= SIGNATURE_LENGTH and not self._detect():
+                raise self._reject(self._unsupported())
+        if start + len(raw_data) > self.MAX_IMAGE_SIZE:
+            raise self._reject(self._too_large())
+        self.digest.update(raw_data)
+        self.destination.write(raw_data)
+        return None  # Aucun autre handler ne reçoit les données
+
+    def file_complete(self, file_size):
+        # Appelé hors du bloc qui intercepte SkipFile : un fichier refusé ici retourne None
+        self.destination.close()
+        self.destination = None
+        if self.detected is None and not self._detect():
+            self._reject(self._unsupported())
+            return None
+        extension, content_type = self.detected
+        try:
+            # Vérifie la structure du fichier (et les bombes de décompression) sans décoder les pixels
+            with Image.open(self.path) as image:
+                width, height = image.size
+                image.verify()
+        except Exception:
+            self._reject("Image illisible ou corrompue.")
+            return None
+        if width * height > self.MAX_PIXELS:
+            self._reject(f"Image trop grande (maximum {self.MAX_PIXELS / 1000000:g} mégapixels).")
+            return None
+        try:
+            metadata = image_metadata(self.path)
+        except Exception:
+            self._reject("Image illisible ou corrompue.")
+            return None
+
+        self.accepted += 1
+        path, self.path = self.path, None  # Le fichier appartient désormais au HashedUploadedFile
+        base = os.path.splitext(os.path.basename(self.file_name))[0] or 'image'
+        return HashedUploadedFile(
+            path, base + extension, content_type, file_size, self.digest.hexdigest(), metadata
+        )
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _detect(self):
+        self.detected = sniff_image(self.head)
+        return self.detected is not None
+
+    def _too_large(self):
+        return f"Image trop volumineuse (maximum {self.MAX_IMAGE_SIZE // (1024 * 1024)} Mo)."
+
+    @staticmethod
+    def _unsupported():
+        return "Format non supporté (JPEG, PNG ou WebP uniquement)."
+
+    def _discard(self):
+        if self.destination is not None:
+            self.destination.close()
+            self.destination = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def _reject(self, message):
+        """ Supprime le fichier partiel, note l'erreur et retourne l'exception SkipFile à lever. """
+        self._discard()
+        self.errors.append({"file": self.file_name, "message": message})
+        return SkipFile(message)
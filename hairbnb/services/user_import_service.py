@@ -0,0 +1,178 @@
+import csv
+import json
+import logging
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+
+from hairbnb.models import TblAdresse, TblClient, TblCoiffeuse, TblUser
+from hairbnb.services.address_resolver import AddressResolver
+from hairbnb.services.uuid_bloom import KnownUuids
+
+logger = logging.getLogger(__name__)
+
+
+class UserImportError(ValueError):
+    """ Ligne d'import invalide (champ manquant, date mal formée, rôle inconnu...). """
+
+
+class UserImportService:
+    """
+    Import en masse d'utilisateurs (membres d'une chaîne de salons, clients d'un partenaire).
+
+    Les lignes ont les mêmes champs que create_user_profile (userUuid, nom, prenom, email, role,
+    sexe, telephone, code_postal, commune, rue, numero, date_naissance, ...).
+
+    Chaque lot de CHUNK_SIZE lignes coûte un nombre fixe de requêtes :
+    1. doublons (uuid, email) déjà en base : 2 requêtes ;
+    2. localités et rues via AddressResolver.resolve_many (hors transaction, voir _import_chunk) ;
+    3. dans une transaction : bulk_create de TblAdresse, puis TblUser, puis TblCoiffeuse / TblClient.
+
+    Le géocodage n'est pas fait pendant l'import : les coiffeuses sont créées sans position
+    et la commande geocode_pending les complète ensuite, au rythme autorisé par Nominatim.
+    """
+    CHUNK_SIZE = 1000
+    REQUIRED_FIELDS = (
+        'userUuid', 'nom', 'prenom', 'email', 'role', 'sexe',
+        'telephone', 'code_postal', 'commune', 'rue', 'numero', 'date_naissance'
+    )
+    # Longueurs des colonnes : une valeur trop longue ferait échouer tout le lot sous PostgreSQL
+    MAX_LENGTHS = {'userUuid': 255, 'nom': 255, 'prenom': 255, 'telephone': 15, 'numero': 10,
+                   'boite_postale': 10, 'code_postal': 10, 'commune': 255, 'rue': 255, 'tva': 20,
+                   'denomination_sociale': 255}
+    ROLES = ('coiffeuse', 'client')
+    SEXES = ('homme', 'femme', 'autre')
+
+    @staticmethod
+    def read_rows(stream, file_format):
+        """ Lit un fichier texte CSV (avec en-tête) ou JSON lines ; retourne des (numéro de ligne, dict). """
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(stream), start=2):
+                yield line_number, row
+        elif file_format == 'jsonl':
+            for line_number, line in enumerate(stream, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError:
+                        yield line_number, None
+        else:
+            raise UserImportError(f"Format '{file_format}' inconnu (csv ou jsonl).")
+
+    @staticmethod
+    def validate_row(row):
+        """ Vérifie une ligne et retourne ses valeurs nettoyées ; lève UserImportError sinon. """
+        if not isinstance(row, dict):
+            raise UserImportError("Ligne illisible.")
+        row = {key: str(value).strip() if value is not None else '' for key, value in row.items()}
+        for field in UserImportService.REQUIRED_FIELDS:
+            if not row.get(field):
+                raise UserImportError(f"Le champ {field} est obligatoire.")
+        for field, max_length in UserImportService.MAX_LENGTHS.items():
+            if len(row.get(field, '')) > max_length:
+                raise UserImportError(f"Le champ {field} dépasse {max_length} caractères.")
+        if row['role'] not in UserImportService.ROLES:
+            raise UserImportError(f"Rôle '{row['role']}' inconnu.")
+        if row['sexe'] not in UserImportService.SEXES:
+            raise UserImportError(f"Sexe '{row['sexe']}' inconnu.")
+        try:
+            validate_email(row['email'])
+        except ValidationError:
+            raise UserImportError("Email non valide.")
+        try:
+            row['date_naissance'] = datetime.strptime(row['date_naissance'], '%d-%m-%Y').date()
+        except ValueError:
+            raise UserImportError("Le format de la date de naissance doit être DD-MM-YYYY.")
+        return row
+
+    @staticmethod
+    def import_rows(rows, chunk_size=None, on_chunk=None):
+        """
+        Importe des (numéro de ligne, dict) par lots ; une ligne invalide ou déjà existante est
+        ignorée sans bloquer les autres. on_chunk(report) est appelé après chaque lot.
+
+        Retourne {'imported', 'skipped', 'errors': [(ligne, message)], 'to_geocode'}.
+        """
+        chunk_size = chunk_size or UserImportService.CHUNK_SIZE
+        report = {'imported': 0, 'skipped': 0, 'errors': [], 'to_geocode': 0}
+        seen_uuids, seen_emails = set(), set()
+        chunk = []
+        for line_number, row in rows:
+            try:
+                row = UserImportService.validate_row(row)
+                if row['userUuid'] in seen_uuids or row['email'] in seen_emails:
+                    raise UserImportError("Utilisateur présent plusieurs fois dans le fichier.")
+            except UserImportError as e:
+                report['errors'].append((line_number, str(e)))
+                report['skipped'] += 1
+                continue
+            seen_uuids.add(row['userUuid'])
+            seen_emails.add(row['email'])
+            chunk.append((line_number, row))
+            if len(chunk) >= chunk_size:
+                UserImportService._import_chunk(chunk, report)
+                chunk = []
+                if on_chunk:
+                    on_chunk(report)
+        if chunk:
+            UserImportService._import_chunk(chunk, report)
+            if on_chunk:
+                on_chunk(report)
+        return report
+
+    @staticmethod
+    def _import_chunk(chunk, report):
+        uuids = [row['userUuid'] for _, row in chunk]
+        emails = [row['email'] for _, row in chunk]
+        existing_uuids = set(TblUser.objects.filter(uuid__in=uuids).values_list('uuid', flat=True))
+        existing_emails = set(TblUser.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        rows = []
+        for line_number, row in chunk:
+            if row['userUuid'] in existing_uuids or row['email'] in existing_emails:
+                report['errors'].append((line_number, "Utilisateur déjà existant"))
+                report['skipped'] += 1
+            else:
+                rows.append((line_number, row))
+        if not rows:
+            return
+
+        # Hors transaction : si le lot échoue, les localités/rues créées restent valides et mémorisées
+        rue_ids = AddressResolver.resolve_many((row['commune'], row['code_postal'], row['rue']) for _, row in rows)
+
+        try:
+            with transaction.atomic():
+                adresses = TblAdresse.objects.bulk_create([
+                    TblAdresse(numero=row['numero'], boite_postale=row.get('boite_postale') or None, rue_id=rue_id)
+                    for (_, row), rue_id in zip(rows, rue_ids)
+                ])
+                users = TblUser.objects.bulk_create([
+                    TblUser(
+                        uuid=row['userUuid'], nom=row['nom'], prenom=row['prenom'], email=row['email'],
+                        type=row['role'], sexe=row['sexe'], numero_telephone=row['telephone'],
+                        date_naissance=row['date_naissance'], adresse_id=adresse.pk
+                    )
+                    for (_, row), adresse in zip(rows, adresses)
+                ])
+                coiffeuses = [
+                    TblCoiffeuse(idTblUser_id=user.pk, denomination_sociale=row.get('denomination_sociale') or None,
+                                 tva=row.get('tva') or None)
+                    for (_, row), user in zip(rows, users) if row['role'] == 'coiffeuse'
+                ]
+                TblCoiffeuse.objects.bulk_create(coiffeuses)
+                TblClient.objects.bulk_create([
+                    TblClient(idTblUser_id=user.pk)
+                    for (_, row), user in zip(rows, users) if row['role'] == 'client'
+                ])
+        except DatabaseError as e:
+            # Ex: un utilisateur créé entre-temps par l'application ; le lot entier est annulé
+            logger.error(f"❌ Lot lignes {rows[0][0]}-{rows[-1][0]} annulé : {e}")
+            report['errors'].extend((line_number, f"Lot annulé : {e}") for line_number, _ in rows)
+            report['skipped'] += len(rows)
+            return
+
+        KnownUuids.add_many([row['userUuid'] for _, row in rows])  # bulk_create ne déclenche pas post_save
+        report['imported'] += len(rows)
+        report['to_geocode'] += len(coiffeuses)
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from hairbnb.models import TblUser
+
+
+class UserResolver:
+    """
+    Résout un uuid Firebase en (idTblUser, type) sans interroger TblUser à chaque appel.
+
+    Deux niveaux de cache :
+    1. un LRU en mémoire du processus (aucun aller-retour réseau) ;
+    2. le cache Django (partagé entre les processus si CACHES pointe vers Redis/Memcached).
+
+    Le couple (idTblUser, type) ne change pas pendant la vie d'un compte, sauf suppression
+    ou changement de type : les signaux de hairbnb/signals.py appellent alors invalidate().
+    Les entrées du LRU expirent après LRU_TTL secondes pour borner le délai de propagation
+    d'une invalidation faite dans un autre processus.
+    """
+    CACHE_PREFIX = 'hairbnb:uuid:'
+    CACHE_TIMEOUT = getattr(settings, 'HAIRBNB_UUID_CACHE_TIMEOUT', 24 * 3600)
+    LRU_SIZE = getattr(settings, 'HAIRBNB_UUID_LRU_SIZE', 10000)
+    LRU_TTL = getattr(settings, 'HAIRBNB_UUID_LRU_TTL', 300)
+
+    _lru = OrderedDict()
+    _lock = threading.Lock()
+    stats = {'lru_hits': 0, 'cache_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def _cache_key(uuid):
+        # Les uuid peuvent faire 255 caractères : on les hache pour rester compatible avec Memcached
+        return UserResolver.CACHE_PREFIX + hashlib.sha1(uuid.encode()).hexdigest()
+
+    @classmethod
+    def resolve(cls, uuid):
+        """ Retourne (idTblUser, type), ou None si aucun utilisateur n'a cet uuid. """
+        if not uuid:
+            return None
+
+        with cls._lock:
+            entry = cls._lru.get(uuid)
+            if entry is not None and entry[1] > time.monotonic():
+                cls._lru.move_to_end(uuid)
+                cls.stats['lru_hits'] += 1
+                return entry[0]
+
+        value = cache.get(cls._cache_key(uuid))
+        if value is not None:
+            value = tuple(value)
+            cls.stats['cache_hits'] += 1
+        else:
+            value = TblUser.objects.filter(uuid=uuid).values_list('idTblUser', 'type').first()
+            cls.stats['misses'] += 1
+            if value is None:
+                return None  # Pas de cache négatif : l'utilisateur peut être créé juste après
+            cache.set(cls._cache_key(uuid), value, cls.CACHE_TIMEOUT)
+
+        cls._remember(uuid, value)
+        return value
+
+    @classmethod
+    def store(cls, uuid, id_user, user_type):
+        """
+        Enregistre directement la correspondance (ex: juste après la création ou la mise à jour).
+        Après le commit : une création annulée ne doit pas laisser en cache un utilisateur inexistant.
+        """
+        value = (id_user, user_type)
+
+        def publish():
+            cache.set(cls._cache_key(uuid), value, cls.CACHE_TIMEOUT)
+            cls._remember(uuid, value)
+
+        transaction.on_commit(publish)
+
+    @classmethod
+    def invalidate(cls, uuid):
+        cache.delete(cls._cache_key(uuid))
+        with cls._lock:
+            cls._lru.pop(uuid, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._lru.clear()
+
+    @classmethod
+    def _remember(cls, uuid, value):
+        with cls._lock:
+            cls._lru[uuid] = (value, time.monotonic() + cls.LRU_TTL)
+            cls._lru.move_to_end(uuid)
+            while len(cls._lru) > cls.LRU_SIZE:
+                cls._lru.popitem(last=False)
@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from hairbnb.models import TblUser
+from hairbnb.services.user_resolver import UserResolver
+
+logger = logging.getLogger(__name__)
+
+
+class UuidBloomFilter:
+    """
+    Filtre de Bloom : répond "absent" (certain) ou "peut-être présent".
+    Environ 1,2 Mo pour un million d'uuid à 1 % de faux positifs.
+    """
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))  # nombre de bits
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hachage (Kirsch-Mitzenmacher) : deux entiers de 64 bits suffisent pour k positions
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class KnownUuids:
+    """
+    Filtre de Bloom des uuid connus, par processus, pour check_user_profile.
+
+    - Un "absent" du filtre répond "not_exists" sans toucher la base.
+    - Un "peut-être" passe par UserResolver (cache, puis base si besoin).
+
+    Le filtre est construit au premier appel puis reconstruit toutes les REBUILD_INTERVAL
+    secondes (les utilisateurs supprimés n'en sortent qu'à ce moment-là).
+    Les créations, de ce processus ou des autres, sont publiées après le commit dans le cache partagé :
+    un compteur de génération et, par génération, la liste des uuid ajoutés. Quand le compteur a bougé,
+    chaque processus ajoute à son filtre les uuid des générations qui lui manquent (un get_many)
+    avant de répondre "absent". Si une génération manque au journal (expulsée du cache) plus de
+    STALL_TIMEOUT secondes, ou si le retard dépasse MAX_CATCH_UP générations, le filtre est reconstruit ;
+    en attendant, les négatifs passent par le resolver.
+
+    Le compteur et le journal doivent être partagés entre processus : avec LocMemCache ou DummyCache
+    (la configuration par défaut du projet) le filtre est désactivé et check_user_profile passe
+    par UserResolver ; HAIRBNB_UUID_BLOOM_ENABLED permet de forcer le choix.
+    """
+    ERROR_RATE = getattr(settings, 'HAIRBNB_UUID_BLOOM_ERROR_RATE', 0.01)
+    REBUILD_INTERVAL = getattr(settings, 'HAIRBNB_UUID_BLOOM_REBUILD_INTERVAL', 3600)
+    MAX_CATCH_UP = 1000
+    STALL_TIMEOUT = 10
+    GENERATION_KEY = 'hairbnb:uuid_bloom:generation'
+    ADDED_PREFIX = 'hairbnb:uuid_bloom:added:'
+
+    _filter = None
+    _built_at = 0.0
+    _generation = None
+    _stalled_at = None
+    _build_lock = threading.Lock()
+    _update_lock = threading.Lock()  # Modifications du filtre (bits et génération) : jamais deux threads à la fois
+    stats = {'negatives': 0, 'positives': 0, 'false_positives': 0, 'rebuilds': 0}
+
+    @staticmethod
+    def enabled():
+        forced = getattr(settings, 'HAIRBNB_UUID_BLOOM_ENABLED', None)
+        if forced is not None:
+            return forced
+        # caches['default'] : le backend lui-même (`cache` n'est qu'un proxy vers celui-ci)
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+    @classmethod
+    def exists(cls, uuid):
+        """ Remplace TblUser.objects.filter(uuid=...).exists() pour check_user_profile. """
+        if not uuid:
+            return False
+        if not cls.enabled():
+            return UserResolver.resolve(uuid) is not None
+
+        in_filter = uuid in cls._current_filter()
+        if not in_filter and cls._catch_up():
+            in_filter = uuid in cls._filter
+            if not in_filter:
+                cls.stats['negatives'] += 1
+                return False
+
+        found = UserResolver.resolve(uuid) is not None
+        if in_filter:
+            cls.stats['positives' if found else 'false_positives'] += 1
+        return found
+
+    @classmethod
+    def add(cls, uuid):
+        """ Appelé à la création d'un utilisateur (signal post_save). """
+        cls.add_many([uuid])
+
+    @classmethod
+    def add_many(cls, uuids):
+        """
+        Variante groupée pour les imports (bulk_create ne déclenche pas post_save).
+        Publiée après le commit : une reconstruction qui lit la génération voit aussi les lignes.
+        """
+        if not cls.enabled():
+            return
+        uuids = list(uuids)
+        transaction.on_commit(lambda: cls._publish(uuids))
+
+    @classmethod
+    def _publish(cls, uuids):
+        cache.add(cls.GENERATION_KEY, 0, None)
+        try:
+            generation = cache.incr(cls.GENERATION_KEY)
+        except ValueError:  # Clé expulsée du cache entre add() et incr() : les filtres seront reconstruits
+            return
+        cache.set(cls._added_key(generation), uuids, cls.REBUILD_INTERVAL)
+
+    @classmethod
+    def _added_key(cls, generation):
+        return f'{cls.ADDED_PREFIX}{generation}'
+
+    @classmethod
+    def _catch_up(cls):
+        """ Ajoute au filtre les uuid publiés depuis sa génération ; True si les négatifs sont sûrs. """
+        shared = cache.get(cls.GENERATION_KEY, 0)
+        local = cls._generation
+        if shared == local:
+            return True
+        if shared < local or shared - local > cls.MAX_CATCH_UP:
+            cls._built_at = 0.0  # Compteur réinitialisé ou retard trop grand : reconstruction au prochain appel
+            return False
+
+        found = cache.get_many([cls._added_key(generation) for generation in range(local + 1, shared + 1)])
+        if not cls._update_lock.acquire(blocking=False):
+            return False  # Un autre thread met le filtre à jour : ce négatif passe par le resolver
+        try:
+            for generation in range(cls._generation + 1, shared + 1):
+                added = found.get(cls._added_key(generation))
+                if added is None:
+                    break  # Pas encore écrite (incr() puis set()) ou expulsée du cache
+                for uuid in added:
+                    cls._filter.add(uuid)
+                cls._generation = generation
+        finally:
+            cls._update_lock.release()
+
+        if cls._generation >= shared:
+            cls._stalled_at = None
+            return True
+        if cls._stalled_at is None:
+            cls._stalled_at = time.monotonic()
+        elif time.monotonic() - cls._stalled_at > cls.STALL_TIMEOUT:
+            cls._stalled_at, cls._built_at = None, 0.0
+        return False
+
+    @classmethod
+    def false_positive_rate(cls):
+        """ Part des uuid inconnus pour lesquels le filtre a répondu "peut-être". """
+        unknown = cls.stats['false_positives'] + cls.stats['negatives']
+        return cls.stats['false_positives'] / unknown if unknown else 0.0
+
+    @classmethod
+    def _current_filter(cls):
+        if cls._filter is None or time.monotonic() - cls._built_at > cls.REBUILD_INTERVAL:
+            # Un seul thread reconstruit ; les autres continuent avec l'ancien filtre s'il existe
+            if cls._build_lock.acquire(blocking=cls._filter is None):
+                try:
+                    if cls._filter is None or time.monotonic() - cls._built_at > cls.REBUILD_INTERVAL:
+                        cls.rebuild()
+                finally:
+                    cls._build_lock.release()
+        return cls._filter
+
+    @classmethod
+    def rebuild(cls):
+        started = time.monotonic()
+        # La génération est lue AVANT le scan : les créations publiées ensuite seront rattrapées (_catch_up)
+        cache.add(cls.GENERATION_KEY, 0, None)
+        generation = cache.get(cls.GENERATION_KEY, 0)
+        uuids = TblUser.objects.values_list('uuid', flat=True)
+        bloom = UuidBloomFilter(capacity=max(2 * uuids.count(), 10000), error_rate=cls.ERROR_RATE)
+        for uuid in uuids.iterator(chunk_size=5000):
+            bloom.add(uuid)
+
+        logger.info(
+            "Filtre de Bloom des uuid reconstruit en %.0f ms (%d octets, taux de faux positifs observé : %.4f)",
+            (time.monotonic() - started) * 1000, len(bloom.bits), cls.false_positive_rate()
+        )
+        with cls._update_lock:
+            cls._filter, cls._generation, cls._built_at = bloom, generation, time.monotonic()
+        cls.stats['rebuilds'] += 1
+
+    @classmethod
+    def reset(cls):
+        """ Oublie le filtre du processus (tests) : reconstruit au prochain appel. """
+        with cls._update_lock:
+            cls._filter, cls._generation, cls._built_at, cls._stalled_at = None, None, 0.0, None
@@ -0,0 +1,138 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from hairbnb.models import TblAdresse, TblClient, TblCoiffeuse, TblImageSalon, TblLocalite, TblRue, TblSalon, \
+    TblUser
+from hairbnb.services.address_resolver import AddressResolver
+from hairbnb.services.coiffeuse_info_service import CoiffeuseInfoService
+from hairbnb.services.profile_fragment_cache import ProfileFragmentCache
+from hairbnb.services.thumbnail_service import ThumbnailService
+from hairbnb.services.user_resolver import UserResolver
+from hairbnb.services.uuid_bloom import KnownUuids
+
+
+def profile_changed(user_id, uuid):
+    """ Invalide les caches de profil quand aucun signal n'est envoyé (update(), miniatures générées...). """
+    CoiffeuseInfoService.invalidate(uuid)
+    ProfileFragmentCache.bump([user_id])
+
+
+def thumbnails_generated(name):
+    """ Miniatures de `name` écrites : toutes les lignes qui utilisent ce fichier les servent désormais. """
+    TblSalon.objects.filter(logo_salon=name, thumbnails_ready=False).update(thumbnails_ready=True)
+    TblImageSalon.objects.filter(urlImages=name, thumbnails_ready=False).update(thumbnails_ready=True)
+    users = list(TblUser.objects.filter(photo_profil=name, thumbnails_ready=False).values_list('idTblUser', 'uuid'))
+    if users:
+        # update() n'envoie aucun signal : les profils en cache contiennent encore les URLs de l'original
+        TblUser.objects.filter(pk__in=[user_id for user_id, _ in users]).update(thumbnails_ready=True)
+        ProfileFragmentCache.bump([user_id for user_id, _ in users])
+        for _, uuid in users:
+            CoiffeuseInfoService.invalidate(uuid)
+
+
+@receiver(post_save, sender=TblUser)
+def user_saved(sender, instance, created, **kwargs):
+    # Le type (coiffeuse / client) peut changer via update_user_profile : on republie la correspondance
+    UserResolver.store(instance.uuid, instance.idTblUser, instance.type)
+    CoiffeuseInfoService.invalidate(instance.uuid)  # Nom, prénom ou photo ont pu changer
+    ProfileFragmentCache.bump([instance.pk])
+    if created:
+        KnownUuids.add(instance.uuid)
+
+
+@receiver(post_delete, sender=TblUser)
+def user_deleted(sender, instance, **kwargs):
+    UserResolver.invalidate(instance.uuid)
+    CoiffeuseInfoService.invalidate(instance.uuid)
+    ProfileFragmentCache.bump([instance.pk])
+
+
+@receiver(post_save, sender=TblCoiffeuse)
+@receiver(post_delete, sender=TblCoiffeuse)
+def coiffeuse_changed(sender, instance, **kwargs):
+    ProfileFragmentCache.bump([instance.idTblUser_id])
+    # L'utilisateur peut déjà être supprimé (cascade) : user_deleted s'en charge alors
+    if TblCoiffeuse.idTblUser.is_cached(instance):
+        uuid = instance.idTblUser.uuid
+    else:
+        uuid = TblUser.objects.filter(pk=instance.idTblUser_id).values_list('uuid', flat=True).first()
+    if uuid:
+        CoiffeuseInfoService.invalidate(uuid)
+
+
+@receiver(post_save, sender=TblClient)
+@receiver(post_delete, sender=TblClient)
+def client_changed(sender, instance, **kwargs):
+    ProfileFragmentCache.bump([instance.idTblUser_id])
+
+
+@receiver(post_save, sender=TblAdresse)
+@receiver(pre_delete, sender=TblAdresse)
+def adresse_changed(sender, instance, created=False, **kwargs):
+    # Une adresse qui vient d'être créée n'est encore liée à aucun utilisateur
+    # (pre_delete : les utilisateurs sont détachés, SET_NULL, avant post_delete)
+    if not created:
+        ProfileFragmentCache.bump(TblUser.objects.filter(adresse_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=TblLocalite)
+@receiver(post_delete, sender=TblRue)
+def address_deleted(sender, instance, **kwargs):
+    # Les IDs mémorisés pourraient pointer vers une ligne supprimée : on repart d'un cache vide
+    AddressResolver.clear()
+
+
+# Champs image servis par ContentAddressedStorage : une référence au fichier par ligne
+MEDIA_FIELDS = {TblUser: 'photo_profil', TblSalon: 'logo_salon', TblImageSalon: 'urlImages'}
+
+
+def _media_name(instance, field):
+    # Lecture dans __dict__ : un champ différé (only() / defer()) ne déclenche pas de requête
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value)
+
+
+@receiver(post_init, sender=TblUser)
+@receiver(post_init, sender=TblSalon)
+@receiver(post_init, sender=TblImageSalon)
+def media_loaded(sender, instance, **kwargs):
+    instance._media_name = _media_name(instance, MEDIA_FIELDS[sender])
+
+
+@receiver(post_save, sender=TblUser)
+@receiver(post_save, sender=TblSalon)
+@receiver(post_save, sender=TblImageSalon)
+def media_replaced(sender, instance, created, **kwargs):
+    field = MEDIA_FIELDS[sender]
+    name = _media_name(instance, field)
+    if field not in instance.__dict__ or (name == instance._media_name and not created):
+        return
+    storage = sender._meta.get_field(field).storage
+    if instance.__dict__.pop('_media_stored', None) != name:
+        # Nom d'un blob existant affecté tel quel (pas d'envoi) : store() n'a ajouté aucune référence
+        storage.retain(name)
+    if name != instance._media_name:
+        # Nouvelle image : l'ancienne perd une référence (et disparaît si plus aucune ligne ne l'utilise)
+        storage.release(instance._media_name)
+        instance._media_name = name
+        if instance.__dict__.get('thumbnails_ready', True):  # Les miniatures étaient celles de l'ancienne image
+            sender.objects.filter(pk=instance.pk).update(thumbnails_ready=False)
+            instance.thumbnails_ready = False
+    if name:
+        # Après le commit : la ligne doit être visible quand thumbnails_generated la met à jour (autre thread)
+        transaction.on_commit(partial(
+            ThumbnailService.schedule, getattr(instance, field), on_done=partial(thumbnails_generated, name)
+        ))
+
+
+@receiver(post_delete, sender=TblUser)
+@receiver(post_delete, sender=TblSalon)
+@receiver(post_delete, sender=TblImageSalon)
+def media_deleted(sender, instance, **kwargs):
+    # Nom enregistré en base (FieldFile.delete(save=False) a pu vider le champ de l'instance)
+    field = MEDIA_FIELDS[sender]
+    name = instance._media_name if instance._media_name is not None else _media_name(instance, field)
+    sender._meta.get_field(field).storage.release(name)
@@ -1,3 +1,1528 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from PIL import Image
+
+from hairbnb.business.business_logic import CurrentUserData
+from hairbnb.middleware import QueryStats
+from hairbnb.models import TblAdresse, TblCart, TblCartItem, TblClient, TblCoiffeuse, TblImageSalon, TblLocalite, \
+    TblMediaBlob, TblPrix, TblPromotion, TblRue, TblSalon, TblSalonService, TblService, TblServicePrix, \
+    TblServiceTemps, TblTemps, TblUser
+from hairbnb.serializers.users_serializers import CurrentUserSerializer
+from hairbnb.services.address_resolver import AddressResolver
+from hairbnb.services.dataset_seeder import DatasetSeeder
+from hairbnb.services.cart_service import CartService
+from hairbnb.services.cart_token_service import CartTokenService
+from hairbnb.services.coiffeuse_info_service import CoiffeuseInfoService
+from hairbnb.services.firebase_auth import FirebaseKeyStore
+from hairbnb.services.geolocation_service import GeolocationService
+from hairbnb.services.metrics import Metrics
+from hairbnb.services.thumbnail_service import SIZES, ThumbnailService
+from hairbnb.services.upload_handlers import StreamingImageUploadHandler
+from hairbnb.services.user_import_service import UserImportService
+from hairbnb.services.user_resolver import UserResolver
+from hairbnb.services.uuid_bloom import KnownUuids, UuidBloomFilter
+from hairbnb.signals import thumbnails_generated
+from hairbnb.views.media_views import serve_media
+from hairbnb.views.users_serializers_views import get_authenticated_user
+
+
+def create_user(uuid, user_type):
+    """ Crée un utilisateur complet (adresse, rue, localité et ligne coiffeuse/client). """
+    localite, _ = TblLocalite.objects.get_or_create(commune='Liège', code_postal='4000')
+    rue, _ = TblRue.objects.get_or_create(nom_rue='Rue Saint-Gilles', localite=localite)
+    adresse = TblAdresse.objects.create(numero='12', rue=rue)
+    user = TblUser.objects.create(
+        uuid=uuid, nom='Dupont', prenom='Marie', email=f'{uuid}@example.com', type=user_type,
+        sexe='femme', numero_telephone='0400000000', adresse=adresse
+    )
+    if user_type == 'coiffeuse':
+        TblCoiffeuse.objects.create(idTblUser=user, denomination_sociale='Salon Marie', position='50.63, 5.57')
+    else:
+        TblClient.objects.create(idTblUser=user)
+    return user
+
+
+def without_thumbnails(test):
+    """ Pour les tests qui exécutent les callbacks on_commit : aucune miniature générée dans le vrai MEDIA_ROOT. """
+    patcher = mock.patch.object(ThumbnailService, 'schedule')
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class TempMediaRootMixin:
+    """ MEDIA_ROOT temporaire, supprimé après chaque test. """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+def create_service(intitule, prix, minutes=30):
+    """ Crée un service avec son prix et sa durée (lignes TblPrix / TblTemps réutilisées). """
+    service = TblService.objects.create(intitule_service=intitule, description=f'{intitule} (test)')
+    TblServicePrix.objects.create(service=service, prix=TblPrix.objects.get_or_create(prix=prix)[0])
+    TblServiceTemps.objects.create(service=service, temps=TblTemps.objects.get_or_create(minutes=minutes)[0])
+    return service
+
+
+class CartConcurrencyTests(TransactionTestCase):
+    """
+    Plusieurs threads ajoutent le même service au même panier en même temps :
+    aucune mise à jour ne doit être perdue et aucune IntegrityError ne doit remonter.
+    """
+    THREADS = 8
+    ADDS_PER_THREAD = 25
+
+    def setUp(self):
+        without_thumbnails(self)  # Transactions réelles : callbacks on_commit exécutés
+        user = TblUser.objects.create(
+            uuid='uuid-panier', nom='Test', prenom='Panier', email='panier@example.com',
+            type='client', sexe='femme', numero_telephone='0400000000'
+        )
+        self.cart = TblCart.objects.create(user=user)
+        self.service = TblService.objects.create(intitule_service='Coupe', description='Coupe simple')
+
+    def _hammer(self, errors, barrier):
+        try:
+            barrier.wait()
+            for _ in range(self.ADDS_PER_THREAD):
+                CartService.add_item(self.cart, self.service.idTblService, 1)
+                CartService.bump_version(TblCart.objects.get(pk=self.cart.pk))
+        except Exception as e:  # On remonte l'erreur au thread principal
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_lose_no_updates(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # SQLite en mémoire (cache partagé) refuse les écritures concurrentes au lieu d'attendre
+            self.skipTest("Nécessite une base de test sur disque ou PostgreSQL")
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+        threads = [threading.Thread(target=self._hammer, args=(errors, barrier)) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.THREADS * self.ADDS_PER_THREAD
+        item = TblCartItem.objects.get(cart=self.cart, service=self.service)
+        self.assertEqual(item.quantity, total)
+        self.assertEqual(TblCart.objects.get(pk=self.cart.pk).version, total)
+
+    def test_batches_and_single_adds_on_a_new_line_lose_no_updates(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Nécessite une base de test sur disque ou PostgreSQL")
+        service = TblService.objects.create(intitule_service='Brushing', description='Brushing')
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def hammer(batch):
+            try:
+                barrier.wait()
+                for _ in range(self.ADDS_PER_THREAD):
+                    if batch:  # Lecture des quantités puis upsert de la quantité finale
+                        CartService.apply_operations(self.cart, [{'op': 'add', 'service_id': service.pk}])
+                    else:
+                        CartService.add_item(self.cart, service.pk, 1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=hammer, args=(i % 2,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        item = TblCartItem.objects.get(cart=self.cart, service=service)
+        self.assertEqual(item.quantity, self.THREADS * self.ADDS_PER_THREAD)
+
+    def test_new_line_uses_requested_quantity(self):
+        CartService.add_item(self.cart, self.service.idTblService, 3)
+        CartService.add_item(self.cart, self.service.idTblService, 2)
+        item = TblCartItem.objects.get(cart=self.cart, service=self.service)
+        self.assertEqual(item.quantity, 5)
+
+
+class BatchCartOperationsTests(TestCase):
+    """ batch_cart_operations : opérations appliquées dans l'ordre, lot entier refusé s'il contient une erreur. """
+
+    def setUp(self):
+        self.user = create_user('uuid-batch', 'client')
+        self.cart = TblCart.objects.create(user=self.user)
+        self.coupe, self.brushing, self.soin = (create_service(name, 10) for name in ('Coupe', 'Brushing', 'Soin'))
+
+    def batch(self, *operations):
+        return self.client.post('/api/batch_cart_operations/', json.dumps(
+            {'user_id': self.user.pk, 'operations': list(operations)}), content_type='application/json')
+
+    def quantities(self):
+        return dict(self.cart.items.values_list('service_id', 'quantity'))
+
+    def test_operations_are_folded_in_order(self):
+        CartService.add_item(self.cart, self.soin.pk, 4)
+        response = self.batch(
+            {'op': 'add', 'service_id': self.coupe.pk, 'quantity': 2},
+            {'op': 'set', 'service_id': self.coupe.pk, 'quantity': 5},
+            {'op': 'add', 'service_id': self.coupe.pk},
+            {'op': 'add', 'service_id': self.brushing.pk},
+            {'op': 'remove', 'service_id': self.brushing.pk},
+            {'op': 'add', 'service_id': self.soin.pk, 'quantity': 1},
+            {'op': 'set', 'service_id': self.soin.pk, 'quantity': 0},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities(), {self.coupe.pk: 6})
+        self.assertEqual(response.json()['cart']['version'], 1)
+
+        # Lot sans effet : aucune écriture, version inchangée
+        self.batch({'op': 'set', 'service_id': self.coupe.pk, 'quantity': 6})
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.version, 1)
+
+    def test_invalid_batch_writes_nothing(self):
+        CartService.add_item(self.cart, self.coupe.pk, 1)
+        for operations in (
+            [{'op': 'add', 'service_id': self.coupe.pk}, {'op': 'add', 'service_id': 999999}],
+            [{'op': 'add', 'service_id': self.coupe.pk}, {'op': 'vider'}],
+            [{'op': 'set', 'service_id': self.coupe.pk, 'quantity': -1}],
+            [{'op': 'add', 'service_id': self.coupe.pk, 'quantity': 'deux'}],
+        ):
+            response = self.batch(*operations)
+            self.assertEqual(response.status_code, 400, operations)
+        self.assertEqual(self.quantities(), {self.coupe.pk: 1})
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.version, 0)
+
+
+class TokenCartTests(TestCase):
+    """ Panier dans un jeton signé : aucune écriture avant le commit, fusion idempotente au commit. """
+
+    def setUp(self):
+        self.user = create_user('uuid-token', 'client')
+        self.coupe, self.brushing, self.soin = (create_service(name, 10) for name in ('Coupe', 'Brushing', 'Soin'))
+
+    def post(self, url, token, **body):
+        return self.client.post(url, json.dumps(body), content_type='application/json', HTTP_X_CART_TOKEN=token)
+
+    def test_round_trip_tampered_and_expired_tokens(self):
+        token = CartTokenService.dumps({self.coupe.pk: 2, self.brushing.pk: 0}, version=3)
+        items, version, nonce = CartTokenService.loads(token)
+        self.assertEqual((items, version), ({self.coupe.pk: 2}, 3))
+        self.assertTrue(nonce)
+
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        self.assertEqual(CartTokenService.loads(tampered), ({}, 0, None))
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + CartTokenService.MAX_AGE + 1):
+            self.assertEqual(CartTokenService.loads(token), ({}, 0, None))
+
+    def test_view_and_modify_write_nothing(self):
+        token = CartTokenService.dumps({self.coupe.pk: 1})
+        with CaptureQueriesContext(connection) as queries:
+            viewed = self.client.get('/api/token_cart/', HTTP_X_CART_TOKEN=token)
+            modified = self.post('/api/token_cart/operations/', token, operations=[
+                {'op': 'add', 'service_id': self.coupe.pk}, {'op': 'set', 'service_id': self.brushing.pk, 'quantity': 2}])
+        self.assertEqual((viewed.status_code, modified.status_code), (200, 200))
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+        self.assertEqual(CartTokenService.loads(viewed.json()['cart_token'])[2], CartTokenService.loads(token)[2])
+        items, version, _ = CartTokenService.loads(modified.json()['cart_token'])
+        self.assertEqual((items, version), ({self.coupe.pk: 2, self.brushing.pk: 2}, 1))
+        self.assertFalse(TblCart.objects.exists())
+
+    def test_commit_merges_once_and_skips_deleted_services(self):
+        CartService.add_item(TblCart.objects.create(user=self.user), self.coupe.pk, 1)
+        token = CartTokenService.dumps({self.coupe.pk: 2, self.brushing.pk: 1, self.soin.pk: 1})
+        self.soin.delete()  # Supprimé depuis la création du jeton
+
+        response = self.post('/api/token_cart/commit/', token, user_id=self.user.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CartTokenService.loads(response.json()['cart_token'])[0], {})
+        quantities = dict(TblCartItem.objects.values_list('service_id', 'quantity'))
+        self.assertEqual(quantities, {self.coupe.pk: 3, self.brushing.pk: 1})
+
+        retry = self.post('/api/token_cart/commit/', token, user_id=self.user.pk)  # Réponse perdue, même jeton
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(dict(TblCartItem.objects.values_list('service_id', 'quantity')), quantities)
+
+    def test_nonce_is_scoped_per_cart_and_other_integrity_errors_surface(self):
+        token = CartTokenService.dumps({self.coupe.pk: 1})
+        other = create_user('uuid-token-autre', 'client')
+        for user in (self.user, other):  # Même jeton, paniers différents : chacun est fusionné
+            self.assertEqual(self.post('/api/token_cart/commit/', token, user_id=user.pk).status_code, 200)
+        self.assertEqual(TblCartItem.objects.filter(service=self.coupe).count(), 2)
+
+        fresh = CartTokenService.dumps({self.brushing.pk: 1})
+        with mock.patch.object(CartService, 'apply_operations', side_effect=IntegrityError('contrainte')):
+            with self.assertRaises(IntegrityError):  # Pas un retry : aucun commit enregistré pour ce nonce
+                self.post('/api/token_cart/commit/', fresh, user_id=self.user.pk)
+        self.assertFalse(TblCartItem.objects.filter(service=self.brushing).exists())
+        self.assertEqual(self.post('/api/token_cart/commit/', fresh, user_id=self.user.pk).json()['message'],
+                         "Panier enregistré ✅")
+
+    def test_line_limit_applies_to_operations_and_commit(self):
+        token = CartTokenService.dumps({self.coupe.pk: 1, self.brushing.pk: 1})
+        with mock.patch.object(CartTokenService, 'MAX_LINES', 1):
+            added = self.post('/api/token_cart/operations/', CartTokenService.dumps({}),
+                              operations=[{'op': 'add', 'service_id': self.coupe.pk},
+                                          {'op': 'add', 'service_id': self.soin.pk}])
+            committed = self.post('/api/token_cart/commit/', token, user_id=self.user.pk)
+        self.assertEqual((added.status_code, committed.status_code), (400, 400))
+        self.assertFalse(TblCartItem.objects.exists())
+
+
+class PurgeCartsTests(TestCase):
+    """ purge_carts ne supprime que les paniers inactifs depuis plus de --ttl-days, sur plusieurs lots. """
+
+    def setUp(self):
+        service = create_service('Coupe', 10)
+        self.carts = {}
+        for name, days, with_item in (('vieux_vide', 40, False), ('vieux_plein', 40, True), ('vieux_vide_2', 35, False),
+                                      ('vieux_plein_2', 31, True), ('recent', 2, True), ('recent_vide', 29, False)):
+            cart = TblCart.objects.create(user=create_user(f'uuid-purge-{name}', 'client'))
+            if with_item:
+                TblCartItem.objects.create(cart=cart, service=service)
+            TblCart.objects.filter(pk=cart.pk).update(updated_at=now() - timedelta(days=days))
+            self.carts[name] = cart.pk
+
+    def remaining(self):
+        names = {pk: name for name, pk in self.carts.items()}
+        return {names[pk] for pk in TblCart.objects.values_list('pk', flat=True)}
+
+    def test_idle_carts_are_purged_across_chunks(self):
+        call_command('purge_carts', ttl_days=30, chunk_size=1, dry_run=True, stdout=io.StringIO())
+        self.assertEqual(len(self.remaining()), 6)
+
+        call_command('purge_carts', ttl_days=30, chunk_size=1, empty_only=True, stdout=io.StringIO())
+        self.assertEqual(self.remaining(), {'vieux_plein', 'vieux_plein_2', 'recent', 'recent_vide'})
+
+        output = io.StringIO()
+        call_command('purge_carts', ttl_days=30, chunk_size=1, stdout=output)
+        self.assertEqual(self.remaining(), {'recent', 'recent_vide'})
+        self.assertIn('Lot 2 :', output.getvalue())
+        self.assertEqual(TblCartItem.objects.count(), 1)
+
+    def test_viewed_cart_is_not_idle(self):
+        user_id = TblCart.objects.get(pk=self.carts['vieux_plein']).user_id
+        self.assertEqual(self.client.get(f'/api/get_cart/{user_id}/').status_code, 200)
+        call_command('purge_carts', ttl_days=30, stdout=io.StringIO())
+        self.assertIn('vieux_plein', self.remaining())
+
+
+class CartDeltaTests(TestCase):
+    """ ?mode=delta : ligne modifiée, nombre d'articles (quantités), total et version après chaque écriture. """
+
+    def setUp(self):
+        self.user = create_user('uuid-delta', 'client')
+        self.coupe = create_service('Coupe', 10)
+        self.brushing = create_service('Brushing', 25)
+
+    def send(self, method, url, **body):
+        response = getattr(self.client, method)(url, json.dumps({'user_id': self.user.pk, **body}),
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_delta_payload_and_version_bumps(self):
+        delta = self.send('post', '/api/add_to_cart/?mode=delta', service_id=self.coupe.pk, quantity=2)['cart_delta']
+        cart = TblCart.objects.get(user=self.user)
+        self.assertEqual(set(delta), {'idTblCart', 'version', 'service_id', 'item', 'item_count', 'total_price'})
+        self.assertEqual((delta['idTblCart'], delta['version'], delta['service_id']), (cart.pk, 1, self.coupe.pk))
+        self.assertEqual((delta['item']['quantity'], delta['item']['service']['idTblService']), (2, self.coupe.pk))
+        self.assertEqual((delta['item_count'], float(delta['total_price'])), (2, 20))
+
+        delta = self.send('post', '/api/add_to_cart/?mode=delta', service_id=self.brushing.pk)['cart_delta']
+        self.assertEqual((delta['version'], delta['item_count'], float(delta['total_price'])), (2, 3, 45))
+
+        delta = self.send('delete', '/api/remove_from_cart/', service_id=self.coupe.pk, mode='delta')['cart_delta']
+        self.assertEqual((delta['version'], delta['service_id'], delta['item']), (3, self.coupe.pk, None))
+        self.assertEqual((delta['item_count'], float(delta['total_price'])), (1, 25))
+
+        delta = self.send('delete', '/api/clear_cart/', mode='delta')['cart_delta']
+        self.assertEqual((delta['version'], delta['item'], delta['item_count'], float(delta['total_price'])),
+                         (4, None, 0, 0))
+
+    def test_full_cart_without_mode(self):
+        data = self.send('post', '/api/add_to_cart/', service_id=self.coupe.pk)
+        self.assertNotIn('cart_delta', data)
+        self.assertEqual((data['cart']['version'], len(data['cart']['items'])), (1, 1))
+
+    def test_add_rejects_invalid_quantity_and_unknown_service(self):
+        for body in ({'service_id': self.coupe.pk, 'quantity': 'deux'}, {'service_id': self.coupe.pk, 'quantity': -1},
+                     {'service_id': self.coupe.pk, 'quantity': 0}, {'service_id': 'abc'}, {'service_id': 999999}):
+            response = self.client.post('/api/add_to_cart/', json.dumps({'user_id': self.user.pk, **body}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('message', response.json())
+        self.assertFalse(TblCartItem.objects.exists())
+
+
+class ProfileQueryCountTests(TestCase):
+    """ Un profil complet (utilisateur, adresse, rue, localité, rôle) se lit en 1 à 2 requêtes. """
+
+    def setUp(self):
+        cache.clear()
+        without_thumbnails(self)
+        with self.captureOnCommitCallbacks(execute=True):  # Correspondances uuid publiées par post_save
+            self.coiffeuse = create_user('uuid-coiffeuse', 'coiffeuse')
+            self.client_user = create_user('uuid-client', 'client')
+
+    def test_current_user_data(self):
+        for user in (self.coiffeuse, self.client_user):
+            user = TblUser.objects.get(pk=user.pk)  # Utilisateur chargé sans son profil (ex: cart.user)
+            with self.assertNumQueries(2):
+                data = CurrentUserData(user).to_dict()
+            self.assertEqual(data['extra_data']['commune'], 'Liège')
+
+    def test_current_user_serializer(self):
+        for user in (self.coiffeuse, self.client_user):
+            with self.assertNumQueries(2):
+                data = CurrentUserSerializer(TblUser.objects.with_profile().get(pk=user.pk)).data
+            self.assertEqual(data['extra_data']['user']['adresse']['rue']['localite']['code_postal'], '4000')
+
+    def test_get_user_profile(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/get_user_profile/{self.coiffeuse.uuid}/')
+        self.assertEqual(response.json()['data']['denomination_sociale'], 'Salon Marie')
+
+    def test_get_current_user(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/get_current_user/{self.client_user.uuid}/')
+        self.assertEqual(response.json()['user']['extra_data']['user']['adresse']['numero'], '12')
+
+
+class UserResolverTests(TestCase):
+    """ uuid -> (idTblUser, type) : LRU sans requête, puis cache Django, invalidé par les signaux. """
+
+    def setUp(self):
+        cache.clear()
+        UserResolver.clear()
+        without_thumbnails(self)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = create_user('uuid-resolver', 'client')
+
+    def resolve(self, queries):
+        before = dict(UserResolver.stats)
+        with self.assertNumQueries(queries):
+            value = UserResolver.resolve(self.user.uuid)
+        return value, {key: UserResolver.stats[key] - before[key] for key in before}
+
+    def test_lru_then_django_cache_then_database(self):
+        # post_save a déjà publié la correspondance : LRU du processus, aucune requête
+        self.assertEqual(self.resolve(0), ((self.user.pk, 'client'), {'lru_hits': 1, 'cache_hits': 0, 'misses': 0}))
+
+        UserResolver.clear()  # Autre processus : seul le cache Django est partagé
+        self.assertEqual(self.resolve(0), ((self.user.pk, 'client'), {'lru_hits': 0, 'cache_hits': 1, 'misses': 0}))
+        self.assertEqual(self.resolve(0)[1]['lru_hits'], 1)
+
+        with mock.patch.object(UserResolver, 'LRU_TTL', -1):  # Entrée expirée : on repasse par le cache Django
+            UserResolver.clear()
+            self.resolve(0)
+            self.assertEqual(self.resolve(0)[1]['cache_hits'], 1)
+
+        cache.clear()
+        UserResolver.clear()
+        self.assertEqual(self.resolve(1), ((self.user.pk, 'client'), {'lru_hits': 0, 'cache_hits': 0, 'misses': 1}))
+        self.assertEqual(self.resolve(0)[1]['lru_hits'], 1)
+
+    def test_signals_republish_and_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.type = 'coiffeuse'
+            self.user.save()
+        self.assertEqual(self.resolve(0)[0], (self.user.pk, 'coiffeuse'))
+
+        self.user.delete()
+        self.assertEqual(self.resolve(1)[0], None)
+        self.assertEqual(self.resolve(1)[0], None)  # Pas de cache négatif
+
+    def test_rolled_back_changes_are_not_published(self):
+        coiffeuse = create_user('uuid-resolver-coiffeuse', 'coiffeuse')
+        CoiffeuseInfoService.get_many([coiffeuse.uuid])
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                create_user('uuid-annule', 'client')  # Inscription annulée (ex: erreur plus loin dans la vue)
+                coiffeuse.nom = 'Annulé'
+                coiffeuse.save()
+                transaction.set_rollback(True)
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(UserResolver.resolve('uuid-annule'))
+        with self.assertNumQueries(0):  # Infos en cache toujours valables
+            self.assertEqual(CoiffeuseInfoService.get_many([coiffeuse.uuid])[0]['nom'], 'Dupont')
+
+
+@override_settings(HAIRBNB_UUID_BLOOM_ENABLED=True)  # Le cache local des tests sert de cache partagé entre "processus"
+class KnownUuidsTests(TestCase):
+    """ Filtre de Bloom des uuid : négatifs sans requête, faux positifs comptés, créations des autres processus rattrapées. """
+
+    def setUp(self):
+        cache.clear()
+        UserResolver.clear()
+        KnownUuids.reset()
+        self.addCleanup(KnownUuids.reset)
+        without_thumbnails(self)
+        self.user = create_user('uuid-bloom', 'client')
+
+    def exists(self, uuid, queries):
+        before = dict(KnownUuids.stats)
+        with self.assertNumQueries(queries):
+            value = KnownUuids.exists(uuid)
+        return value, {key: KnownUuids.stats[key] - before[key] for key in before}
+
+    @staticmethod
+    def other_process():
+        """ Un autre worker : même cache partagé, filtre du processus vierge. """
+        return mock.patch.multiple(KnownUuids, _filter=None, _generation=None, _built_at=0.0, _stalled_at=None)
+
+    def test_filter_has_no_false_negatives(self):
+        bloom = UuidBloomFilter(capacity=1000, error_rate=0.01)
+        uuids = [f'uuid-{i}' for i in range(1000)]
+        for uuid in uuids:
+            bloom.add(uuid)
+        self.assertTrue(all(uuid in bloom for uuid in uuids))
+        false_positives = sum(f'inconnu-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_negatives_skip_the_database_and_false_positives_are_counted(self):
+        KnownUuids.exists(self.user.uuid)  # Construction du filtre
+        self.assertEqual(self.exists(self.user.uuid, 0)[0], True)
+        self.assertEqual(self.exists('uuid-inconnu', 0), (False, {
+            'negatives': 1, 'positives': 0, 'false_positives': 0, 'rebuilds': 0}))
+
+        KnownUuids._filter.add('uuid-supprime')  # Utilisateur supprimé depuis la construction
+        self.assertEqual(self.exists('uuid-supprime', 1), (False, {
+            'negatives': 0, 'positives': 0, 'false_positives': 1, 'rebuilds': 0}))
+        with mock.patch.dict(KnownUuids.stats, {'negatives': 3, 'false_positives': 1}):
+            self.assertEqual(KnownUuids.false_positive_rate(), 0.25)
+
+    def test_creations_in_other_processes_are_caught_up(self):
+        KnownUuids.exists(self.user.uuid)
+        with self.other_process():
+            with self.captureOnCommitCallbacks(execute=True):
+                created = create_user('uuid-autre-worker', 'client')
+            with self.captureOnCommitCallbacks(execute=True):
+                KnownUuids.add_many(['uuid-import-1', 'uuid-import-2'])
+
+        # Le compteur partagé a bougé : ce processus rattrape le journal (cache) sans reconstruire ni requêter
+        self.assertEqual(self.exists('uuid-inconnu', 0), (False, {
+            'negatives': 1, 'positives': 0, 'false_positives': 0, 'rebuilds': 0}))
+        self.assertIn(created.uuid, KnownUuids._filter)
+        self.assertIn('uuid-import-2', KnownUuids._filter)
+        self.assertEqual(self.exists(created.uuid, 0)[0], True)
+
+    def test_missing_journal_entry_falls_back_then_rebuilds(self):
+        KnownUuids.exists(self.user.uuid)
+        cache.incr(KnownUuids.GENERATION_KEY)  # Génération publiée mais absente du journal (expulsée du cache)
+
+        self.assertEqual(self.exists('uuid-inconnu', 1), (False, {
+            'negatives': 0, 'positives': 0, 'false_positives': 0, 'rebuilds': 0}))
+        with mock.patch.object(KnownUuids, 'STALL_TIMEOUT', -1):
+            self.exists('uuid-inconnu', 1)  # Bloqué trop longtemps : reconstruction demandée
+        self.assertEqual(self.exists('uuid-inconnu', 2), (False, {
+            'negatives': 1, 'positives': 0, 'false_positives': 0, 'rebuilds': 1}))
+        self.assertEqual(self.exists('uuid-inconnu', 0)[1]['negatives'], 1)
+
+    @override_settings(HAIRBNB_UUID_BLOOM_ENABLED=None)
+    def test_disabled_with_a_process_local_cache(self):
+        self.assertFalse(KnownUuids.enabled())
+        self.assertEqual(self.exists('uuid-inconnu', 1)[0], False)
+        self.assertIsNone(KnownUuids._filter)
+
+
+class CoiffeuseInfoServiceTests(TestCase):
+    """ get_coiffeuses_info : ordre de la liste reçue, plafond MAX_UUIDS, lecture par paquets en nombre de requêtes constant. """
+
+    def setUp(self):
+        cache.clear()
+        self.coiffeuses = [create_user(f'uuid-info-{i}', 'coiffeuse') for i in range(6)]
+        self.client_user = create_user('uuid-info-client', 'client')
+
+    def get_many(self, uuids, queries):
+        with self.assertNumQueries(queries):
+            return [data['uuid'] for data in CoiffeuseInfoService.get_many(uuids)]
+
+    def test_result_follows_the_received_order(self):
+        c0, c1, c2 = (user.uuid for user in self.coiffeuses[:3])
+        uuids = [c2, 'uuid-inconnu', c0, self.client_user.uuid, c2, c1]
+        self.assertEqual(self.get_many(uuids, 1), [c2, c0, c1])  # Doublons, inconnus et clients écartés
+
+        before = dict(CoiffeuseInfoService.stats)
+        self.assertEqual(self.get_many([c1, c0, c2], 0), [c1, c0, c2])  # Autre ordre : tout vient du cache
+        self.assertEqual(CoiffeuseInfoService.stats['hits'] - before['hits'], 3)
+
+    def test_cache_misses_cost_one_query_per_chunk(self):
+        uuids = [user.uuid for user in self.coiffeuses]
+        self.assertEqual(self.get_many(uuids[:2], 1), uuids[:2])
+        cache.clear()
+        self.assertEqual(self.get_many(uuids, 1), uuids)  # Nombre de requêtes indépendant du nombre d'uuid
+
+        cache.clear()
+        with mock.patch.object(CoiffeuseInfoService, 'CHUNK_SIZE', 4):
+            self.assertEqual(self.get_many(uuids, 2), uuids)
+        self.assertEqual(self.get_many(list(reversed(uuids)), 0), list(reversed(uuids)))
+
+    def test_view_rejects_more_than_max_uuids(self):
+        uuids = [user.uuid for user in self.coiffeuses[:3]]
+        with mock.patch.object(CoiffeuseInfoService, 'MAX_UUIDS', 2):
+            with self.assertNumQueries(0):
+                response = self.client.post('/api/get_coiffeuses_info/', json.dumps({'uuids': uuids}),
+                                            content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('maximum 2', response.json()['message'])
+
+            response = self.client.post('/api/get_coiffeuses_info/', json.dumps({'uuids': uuids[:2]}),
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([data['uuid'] for data in response.json()['coiffeuses']], uuids[:2])
+
+
+class CoiffeusesProchesTests(TestCase):
+    """ Recherche par distance : positions vides ignorées, positions invalides journalisées. """
+
+    def test_empty_and_invalid_positions(self):
+        proche = create_user('uuid-proche', 'coiffeuse')
+        sans_position = create_user('uuid-sans-position', 'coiffeuse')
+        TblCoiffeuse.objects.filter(idTblUser=sans_position).update(position='')
+        invalide = create_user('uuid-position-invalide', 'coiffeuse')
+        TblCoiffeuse.objects.filter(idTblUser=invalide).update(position='pas une position')
+
+        with self.assertLogs('hairbnb.views.geolocation_serializers_views', 'WARNING') as logs:
+            response = self.client.get('/api/coiffeuses_proches/', {'lat': 50.63, 'lon': 5.57, 'distance': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['idTblUser'] for c in response.json()['coiffeuses']], [proche.pk])
+        self.assertEqual(len(logs.output), 1)  # Position vide exclue de la requête
+        self.assertIn(str(invalide.pk), logs.output[0])
+
+
+class AddressResolverTests(TestCase):
+    """ Les localités et rues sont réutilisées malgré la casse, les accents et les espaces. """
+
+    def setUp(self):
+        AddressResolver.clear()
+
+    def test_normalized_names_reuse_existing_rows(self):
+        localite = TblLocalite.objects.create(commune='Liège', code_postal='4000')
+        rue = TblRue.objects.create(nom_rue='Rue Saint-Gilles', localite=localite)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(AddressResolver.resolve('  LIEGE ', '4000', 'rue saint gilles'), rue.pk)
+        self.assertEqual(TblLocalite.objects.count(), 1)
+        self.assertEqual(TblRue.objects.count(), 1)
+
+        with self.assertNumQueries(0):  # Résolu depuis le LRU
+            self.assertEqual(AddressResolver.resolve('Liège', '4000', 'Rue Saint-Gilles'), rue.pk)
+
+    def test_resolve_many_creates_missing_rows_in_bulk(self):
+        addresses = [('Namur', '5000', f'Rue {i}') for i in range(50)] + [('Liège', '4000', 'Rue 1')] * 2
+        with self.assertNumQueries(6):  # Par table : lecture, insertion groupée, relecture
+            ids = AddressResolver.resolve_many(addresses)
+
+        self.assertEqual(len(set(ids)), 51)
+        self.assertEqual(ids[-1], ids[-2])
+        self.assertEqual(TblRue.objects.get(pk=ids[0]).nom_rue, 'Rue 0')
+        self.assertEqual(TblLocalite.objects.count(), 2)
+
+    def test_rolled_back_rows_are_not_remembered(self):
+        with transaction.atomic():
+            rolled_back = AddressResolver.resolve('Namur', '5000', 'Rue de Fer')
+            transaction.set_rollback(True)
+        self.assertFalse(TblRue.objects.filter(pk=rolled_back).exists())
+
+        # Le LRU ne renvoie pas l'ID annulé : la rue est recréée et l'adresse peut y être rattachée
+        with self.captureOnCommitCallbacks(execute=True):
+            rue_id = AddressResolver.resolve('Namur', '5000', 'Rue de Fer')
+        TblAdresse.objects.create(numero='1', rue_id=rue_id)
+        self.assertTrue(TblRue.objects.filter(pk=rue_id).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(AddressResolver.resolve('Namur', '5000', 'Rue de Fer'), rue_id)
+
+
+class UserImportTests(TestCase):
+    """ L'import en masse crée adresses, utilisateurs et rôles sans doublon, en un nombre fixe de requêtes. """
+
+    def setUp(self):
+        AddressResolver.clear()
+
+    def row(self, i, **overrides):
+        row = {
+            'userUuid': f'import-{i}', 'nom': 'Dupont', 'prenom': 'Marie', 'email': f'import-{i}@example.com',
+            'role': 'coiffeuse' if i % 2 else 'client', 'sexe': 'femme', 'telephone': '0400000000',
+            'code_postal': '4000', 'commune': 'Liège', 'rue': f'Rue {i % 3}', 'numero': str(i),
+            'date_naissance': '01-02-1990',
+        }
+        row.update(overrides)
+        return row
+
+    def test_import_rows(self):
+        create_user('import-0', 'client')
+        rows = [self.row(i) for i in range(40)] + [self.row(99, email='invalide'), self.row(1)]
+
+        report = UserImportService.import_rows(enumerate(rows, start=1), chunk_size=20)
+
+        self.assertEqual(report['imported'], 39)
+        self.assertEqual(report['skipped'], 3)  # Déjà en base, email invalide, doublon dans le fichier
+        self.assertEqual(report['to_geocode'], 20)
+        self.assertEqual(TblCoiffeuse.objects.filter(position__isnull=True).count(), 20)
+        self.assertEqual(TblClient.objects.count(), 20)
+        self.assertEqual(TblLocalite.objects.count(), 1)
+        user = TblUser.objects.with_profile().get(uuid='import-5')
+        self.assertEqual(user.adresse.rue.nom_rue, 'Rue 2')
+
+
+@override_settings(HAIRBNB_UUID_BLOOM_ENABLED=False)
+class DatasetSeederTests(TestCase):
+    """ Le générateur est reproductible, compte ce qu'il insère et ne supprime que ses propres données. """
+    OPTIONS = {'localites': 3, 'streets': 2, 'users': 60, 'coiffeuse_ratio': 0.2, 'services_per_salon': 12,
+               'cart_ratio': 0.5, 'cart_items': 4}
+
+    def snapshot(self):
+        return list(TblUser.objects.filter(uuid__startswith=DatasetSeeder.UUID_PREFIX).order_by('uuid').values_list(
+            'uuid', 'nom', 'type', 'adresse__numero', 'coiffeuse__position'))
+
+    def test_seed_is_deterministic_and_clear_keeps_real_data(self):
+        create_user('vraie-coiffeuse', 'coiffeuse')
+        report = DatasetSeeder(seed=3, chunk_size=25).run(**self.OPTIONS)
+
+        self.assertEqual(report['users'], 60)
+        self.assertEqual(report['coiffeuses'] + report['clients'], 60)
+        self.assertEqual(report['services'], report['salons'] * 12)
+        self.assertEqual(TblService.objects.count(), report['services'])
+        self.assertEqual(TblCartItem.objects.count(), report['cart_items'])
+        self.assertEqual(TblService.objects.filter(salons__isnull=True).count(), 0)
+        # 12 services pour 10 intitulés de base : aucun doublon de nom dans un salon
+        self.assertEqual(TblService.objects.values('salons', 'intitule_service').distinct().count(), report['services'])
+        first = self.snapshot()
+
+        DatasetSeeder.clear(chunk_size=10)
+        self.assertFalse(DatasetSeeder.exists())
+        self.assertEqual(TblUser.objects.count(), 1)
+        self.assertEqual(TblService.objects.count(), 0)
+        self.assertEqual(TblLocalite.objects.count(), 1)
+
+        prix = TblPrix.objects.count()
+        DatasetSeeder(seed=3, chunk_size=25).run(**self.OPTIONS)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(TblPrix.objects.count(), prix)  # Prix existants réutilisés (prix unique)
+
+
+    def test_command_rejects_values_the_generator_cannot_use(self):
+        for options, message in (
+            ({'cart_items': 0}, '--cart-items'),
+            ({'streets': 0}, '--streets'),
+            ({'localites': 0, 'users': 10}, '--localites'),
+            ({'cart_ratio': 1.5}, '--cart-ratio'),
+        ):
+            with self.subTest(options=options), self.assertRaisesMessage(CommandError, message):
+                call_command('seed', stdout=io.StringIO(), **options)
+        self.assertFalse(DatasetSeeder.exists())
+
+        call_command('seed', users=0, streets=0, cart_items=0, cart_ratio=0, localites=1, stdout=io.StringIO())
+        self.assertEqual(TblLocalite.objects.filter(commune__startswith=DatasetSeeder.COMMUNE_PREFIX).count(), 1)
+
+
+class BenchApiCommandTests(TestCase):
+    """ Options refusées avant toute mesure ; --compare tolère les valeurs absentes. """
+
+    def test_invalid_counts_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, '--requests'):
+            call_command('bench_api', requests=0)
+        with self.assertRaisesMessage(CommandError, '--warmup'):
+            call_command('bench_api', warmup=-1)
+
+    def test_compare_handles_missing_values(self):
+        endpoint = {'throughput_rps': None, 'latency_ms': {'p50': 1.5, 'p95': 2.0, 'p99': None},
+                    'queries_per_request': {'mean': 3}}
+        paths = []
+        for throughput in (None, 120.0):
+            fd, path = tempfile.mkstemp(suffix='.json')
+            self.addCleanup(os.remove, path)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'scales': {'small': {'endpoints': {
+                    'get_cart': {**endpoint, 'throughput_rps': throughput}}}}}, f)
+            paths.append(path)
+
+        out = io.StringIO()
+        call_command('bench_api', compare=paths, stdout=out)
+        line = out.getvalue().splitlines()[1]
+        self.assertIn('n/a → 120.00', line)
+        self.assertIn('1.50 → 1.50', line)
+        self.assertIn('3 → 3', line)
+
+
+class PartialUpdateTests(TestCase):
+    """ Les mises à jour n'écrivent que les colonnes modifiées, et rien si aucune valeur ne change. """
+
+    def setUp(self):
+        self.user = create_user('uuid-maj', 'coiffeuse')
+
+    def patch(self, data):
+        return self.client.patch(f'/api/update_user_profile/{self.user.uuid}/', json.dumps(data),
+                                 content_type='application/json')
+
+    def test_unchanged_profile_is_not_written(self):
+        with self.assertNumQueries(1):  # Lecture seule
+            response = self.patch({'nom': 'Dupont', 'prenom': 'Marie', 'adresse': {'numero': '12'}})
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_changed_columns_are_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.patch({'nom': 'Durand', 'prenom': 'Marie', 'tva': 'BE0123456789'})
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertNotIn('prenom', updates[0])
+        self.assertEqual(TblUser.objects.get(pk=self.user.pk).nom, 'Durand')
+        self.assertEqual(TblCoiffeuse.objects.get(idTblUser=self.user).tva, 'BE0123456789')
+
+
+class ProfileFragmentCacheTests(TestCase):
+    """ Les profils servis depuis le cache de fragments suivent les modifications. """
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('uuid-fragment', 'coiffeuse')
+
+    def test_fragment_is_reused_then_refreshed(self):
+        url = f'/api/get_coiffeuse_by_uuid/{self.user.uuid}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['data']['user']['nom'], 'Dupont')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.adresse.numero = '99'
+            self.user.adresse.save()
+        self.assertEqual(self.client.get(url).json()['data']['user']['adresse']['numero'], '99')
+
+    def test_list_coiffeuses_splices_fragments(self):
+        create_user('uuid-fragment-2', 'coiffeuse')
+        expected = self.client.get('/api/list_coiffeuses/').json()
+        with self.assertNumQueries(1):  # Seule la liste des IDs est lue
+            self.assertEqual(self.client.get('/api/list_coiffeuses/').json(), expected)
+        self.assertEqual([c['uuid'] for c in expected['data']], ['uuid-fragment', 'uuid-fragment-2'])
+
+
+def generate_signing_certificate():
+    """ Paire de clés RSA et certificat x509 auto-signé générés localement (comme ceux publiés par Google). """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'securetoken.system.gserviceaccount.com')])
+    certificate = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.now(timezone.utc) - timedelta(days=1))
+        .not_valid_after(datetime.now(timezone.utc) + timedelta(days=1))
+        .sign(private_key, hashes.SHA256())
+    )
+    return private_key, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+@override_settings(
+    HAIRBNB_FIREBASE_PROJECT_ID='hairbnb-test',
+    MIDDLEWARE=settings.MIDDLEWARE + ['hairbnb.middleware.FirebaseAuthenticationMiddleware'],
+)
+class FirebaseAuthenticationTests(TestCase):
+    """ Les ID tokens sont vérifiés localement avec des clés générées pour le test (aucun accès réseau). """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key, certificate = generate_signing_certificate()
+        cls.other_key, _ = generate_signing_certificate()
+        cls.certificates = {'kid-test': certificate}
+
+    def setUp(self):
+        cache.clear()
+        FirebaseKeyStore.load(self.certificates, max_age=3600)
+        self.user = create_user('firebase-uid', 'client')
+
+    def token(self, key=None, **claims):
+        issued = int(time.time())
+        payload = {
+            'iss': 'https://securetoken.google.com/hairbnb-test', 'aud': 'hairbnb-test',
+            'sub': 'firebase-uid', 'iat': issued, 'exp': issued + 3600, 'auth_time': issued,
+        }
+        payload.update(claims)
+        return jwt.encode(payload, key or self.private_key, algorithm='RS256', headers={'kid': 'kid-test'})
+
+    def get(self, token):
+        return self.client.get('/api/get_current_user/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_valid_token_returns_current_user(self):
+        response = self.get(self.token())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['uuid'], 'firebase-uid')
+
+    def test_invalid_tokens_are_rejected(self):
+        now = int(time.time())
+        for token in (
+            self.token(key=self.other_key),  # Mauvaise signature
+            self.token(exp=now - 3600, iat=now - 7200),  # Expiré
+            self.token(aud='autre-projet'),
+            'pas-un-jwt',
+        ):
+            self.assertEqual(self.get(token).status_code, 401)
+
+    def test_request_without_token_is_not_authenticated(self):
+        self.assertEqual(self.client.get('/api/get_current_user/').status_code, 403)
+        # Les routes publiques ne sont pas concernées
+        self.assertEqual(self.client.get(f'/api/get_current_user/{self.user.uuid}/').status_code, 200)
+
+    def test_expired_keys_are_refreshed_in_background(self):
+        FirebaseKeyStore.load(self.certificates, max_age=0)
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return self.certificates, 3600
+
+        with mock.patch.object(FirebaseKeyStore, 'fetch', side_effect=fetch):
+            # Les anciennes clés servent encore pendant le renouvellement
+            self.assertEqual(self.get(self.token()).status_code, 200)
+            self.assertTrue(refreshed.wait(5))
+
+    def test_initial_load_is_shared_and_backs_off_after_failure(self):
+        def fetch():
+            time.sleep(0.05)  # Les autres requêtes arrivent pendant le téléchargement
+            return self.certificates, 3600
+
+        with mock.patch.object(FirebaseKeyStore, '_keys', None), \
+                mock.patch.object(FirebaseKeyStore, '_expires_at', 0.0):
+            with mock.patch.object(FirebaseKeyStore, 'fetch', side_effect=fetch) as fetched:
+                keys = []
+                workers = [threading.Thread(target=lambda: keys.append(FirebaseKeyStore.get_key('kid-test')))
+                           for _ in range(4)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            self.assertEqual(fetched.call_count, 1)
+            self.assertEqual(len([key for key in keys if key is not None]), 4)
+
+            FirebaseKeyStore._keys, FirebaseKeyStore._expires_at = None, 0.0
+            with mock.patch.object(FirebaseKeyStore, 'fetch', side_effect=OSError("réseau coupé")) as fetched:
+                self.assertEqual(self.get(self.token()).status_code, 401)
+                self.assertEqual(self.get(self.token()).status_code, 401)  # Refusé sans rappeler Google
+            self.assertEqual(fetched.call_count, 1)
+
+
+class ThumbnailServiceTests(TempMediaRootMixin, TestCase):
+    """ Miniatures générées dans un MEDIA_ROOT temporaire (génération dans le processus du test). """
+
+    def setUp(self):
+        super().setUp()
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(buffer, format='PNG')
+        self.user = create_user('uuid-thumbnail', 'coiffeuse')
+        self.user.photo_profil.save('photo.png', ContentFile(buffer.getvalue()))
+
+    def test_original_is_served_until_derivatives_exist(self):
+        original = self.user.photo_profil.url
+        self.assertEqual(ThumbnailService.urls(self.user.photo_profil), {size: original for size in SIZES})
+
+        done = mock.Mock()
+        with mock.patch.object(ThumbnailService, 'WORKERS', 0):
+            ThumbnailService.schedule(self.user.photo_profil, on_done=done)
+        done.assert_called_once_with()
+        # L'état est lu sur la ligne, pas dans le stockage : toujours l'original tant qu'elle n'est pas marquée
+        self.assertEqual(ThumbnailService.urls(self.user.photo_profil), {size: original for size in SIZES})
+
+        thumbnails_generated(self.user.photo_profil.name)
+        self.user.refresh_from_db()
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("stat dans urls()")):
+            urls = ThumbnailService.urls(self.user.photo_profil)
+        for size, max_side in SIZES.items():
+            name = ThumbnailService.derivative_name(self.user.photo_profil.name, size)
+            self.assertEqual(urls[size], default_storage.url(name))
+            with default_storage.open(name) as derivative, Image.open(derivative) as image:
+                self.assertEqual(image.size, (max_side, max_side // 2))
+
+    def test_executor_callback_closes_stale_connections(self):
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda function, *args: mock.Mock(
+            add_done_callback=lambda callback: callback(mock.Mock(result=lambda: function(*args))))
+        done = mock.Mock()
+        with mock.patch('hairbnb.services.thumbnail_service.close_old_connections') as close:
+            with mock.patch.object(ThumbnailService, 'WORKERS', 0):  # Dans la requête : connexion inchangée
+                ThumbnailService.schedule(self.user.photo_profil, on_done=done)
+            self.assertEqual((done.call_count, close.call_count), (1, 0))
+
+            ThumbnailService.delete(self.user.photo_profil.name)
+            with mock.patch.object(ThumbnailService, '_get_executor', return_value=executor):
+                ThumbnailService.schedule(self.user.photo_profil, on_done=done)
+            self.assertEqual((done.call_count, close.call_count), (2, 2))  # Avant et après les écritures du thread
+
+    def test_saving_a_new_image_generates_and_marks_the_row(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 300), 'blue').save(buffer, format='PNG')
+        with mock.patch.object(ThumbnailService, 'WORKERS', 0), self.captureOnCommitCallbacks(execute=True):
+            self.user.photo_profil.save('bleu.png', ContentFile(buffer.getvalue()))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.thumbnails_ready)
+        self.assertEqual(ThumbnailService.urls(self.user.photo_profil)['thumb'],
+                         default_storage.url(ThumbnailService.derivative_name(self.user.photo_profil.name, 'thumb')))
+
+        # Même fichier sur une autre ligne : miniatures déjà écrites, la ligne est marquée sans régénération
+        other = create_user('uuid-thumbnail-2', 'client')
+        with mock.patch('hairbnb.services.thumbnail_service.render_derivatives') as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            other.photo_profil = self.user.photo_profil.name
+            other.save()
+        render.assert_not_called()
+        other.refresh_from_db()
+        self.assertTrue(other.thumbnails_ready)
+
+        # Nouvelle image pas encore traitée : l'original est servi, pas les miniatures de l'ancienne
+        with mock.patch.object(ThumbnailService, 'WORKERS', 0), \
+                mock.patch.object(ThumbnailService, 'schedule'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.photo_profil.save('autre.png', ContentFile(b'pas encore traitee'))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.thumbnails_ready)
+        self.assertEqual(set(ThumbnailService.urls(self.user.photo_profil).values()), {self.user.photo_profil.url})
+
+
+class ContentAddressedStorageTests(TempMediaRootMixin, TestCase):
+    """ Images identiques stockées une seule fois, supprimées avec leur dernière référence. """
+
+    def test_identical_uploads_share_one_blob(self):
+        first = create_user('uuid-blob-1', 'client')
+        second = create_user('uuid-blob-2', 'client')
+        first.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+        second.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+
+        name = first.photo_profil.name
+        self.assertEqual(second.photo_profil.name, name)
+        self.assertRegex(name, r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.photo_profil.save('autre.png', ContentFile(b'autres octets'))
+        self.assertFalse(TblMediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_field_delete_releases_one_reference(self):
+        first = create_user('uuid-blob-1', 'client')
+        second = create_user('uuid-blob-2', 'client')
+        first.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+        second.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+        name = first.photo_profil.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.photo_profil.delete(save=True)
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 1)  # Toujours utilisé par second
+        self.assertTrue(default_storage.exists(name))
+
+        # Champ vidé sans enregistrer puis ligne supprimée : la base référençait encore le fichier
+        with self.captureOnCommitCallbacks(execute=True):
+            second.photo_profil.delete(save=False)
+            second.delete()
+        self.assertFalse(TblMediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_uploading_the_same_image_again_adds_no_reference(self):
+        user = create_user('uuid-blob-1', 'client')
+        user.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+        name = user.photo_profil.name
+
+        user.photo_profil.save('encore.png', ContentFile(b'memes octets'))
+        self.assertEqual(user.photo_profil.name, name)
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 1)
+
+        user.photo_profil = SimpleUploadedFile('upload.png', b'memes octets')  # Envoi par pre_save
+        user.save()
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.photo_profil.save('autre.png', ContentFile(b'autres octets'))
+        self.assertFalse(TblMediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_assigning_an_existing_blob_name_adds_a_reference(self):
+        user = create_user('uuid-blob-1', 'coiffeuse')
+        user.photo_profil.save('profile_photo.png', ContentFile(b'memes octets'))
+        name = user.photo_profil.name
+
+        salon = TblSalon.objects.create(coiffeuse=user.coiffeuse, slogan='Salon test')
+        salon.logo_salon = user.photo_profil.name  # Chaîne : aucun envoi, store() n'est pas appelé
+        salon.save()
+        TblImageSalon.objects.create(salon=salon, urlImages=name)
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            salon.delete()  # Logo et image de galerie libérés
+        self.assertEqual(TblMediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))  # Toujours la photo de profil
+
+
+class SalonImagesUploadTests(TempMediaRootMixin, TestCase):
+    """ Upload de la galerie : fichiers vérifiés pendant la réception, stockés par contenu. """
+
+    def setUp(self):
+        super().setUp()
+        coiffeuse = create_user('uuid-gallery', 'coiffeuse')
+        self.salon = TblSalon.objects.create(coiffeuse=coiffeuse.coiffeuse, slogan='Salon test')
+
+    def png(self, name, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), color).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_oversized_dimensions_are_rejected_before_decoding(self):
+        buffer = io.BytesIO()
+        Image.new('1', (6000, 5000)).save(buffer, format='PNG')  # 30 mégapixels, quelques Ko une fois compressé
+        self.assertLess(len(buffer.getvalue()), StreamingImageUploadHandler.MAX_IMAGE_SIZE)
+        huge = SimpleUploadedFile('immense.png', buffer.getvalue(), content_type='image/png')
+
+        with mock.patch('hairbnb.services.upload_handlers.image_metadata') as metadata:
+            response = self.client.post(f'/api/salons/{self.salon.pk}/images/', {'images': [huge]})
+        metadata.assert_not_called()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {'file': 'immense.png', 'message': 'Image trop grande (maximum 25 mégapixels).'}])
+        self.assertEqual(os.listdir(default_storage.path('blobs/tmp')), [])
+
+    def test_upload_keeps_valid_images_and_reports_rejected_files(self):
+        with mock.patch.object(ThumbnailService, 'WORKERS', 0):
+            response = self.client.post(f'/api/salons/{self.salon.pk}/images/', {'images': [
+                self.png('rouge.png', 'red'),
+                self.png('copie.png', 'red'),
+                self.png('bleu.png', 'blue'),
+                SimpleUploadedFile('faux.jpg', b'pas une image du tout', content_type='image/jpeg'),
+            ]})
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(len(body['images']), 3)
+        self.assertEqual([error['file'] for error in body['errors']], ['faux.jpg'])
+
+        names = list(TblImageSalon.objects.filter(salon=self.salon).values_list('urlImages', flat=True))
+        self.assertEqual(len(set(names)), 2)  # Les deux images rouges partagent le même fichier
+        self.assertEqual(TblMediaBlob.objects.get(name=names[0]).refcount, 2)
+        self.assertEqual(os.listdir(default_storage.path('blobs/tmp')), [])
+
+    def test_gallery_is_paged_by_key_with_stored_metadata(self):
+        with mock.patch.object(ThumbnailService, 'WORKERS', 0):
+            self.client.post(f'/api/salons/{self.salon.pk}/images/', {'images': [
+                self.png(f'photo{i}.png', (i * 40, 0, 0)) for i in range(5)
+            ]})
+
+        url = f'/api/salons/{self.salon.pk}/images/'
+        with self.assertNumQueries(1):
+            first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual(len(first['images']), 3)
+        image = first['images'][0]
+        self.assertEqual((image['width'], image['height']), (40, 30))
+        self.assertTrue(image['size'] > 0)
+        self.assertTrue(image['placeholder'].startswith('data:image/'))
+
+        second = self.client.get(url, {'limit': 3, 'after': first['next']}).json()
+        self.assertEqual(len(second['images']), 2)
+        self.assertIsNone(second['next'])
+        ids = [image['idTblImageSalon'] for image in first['images'] + second['images']]
+        self.assertEqual(ids, sorted(ids))
+
+
+class MediaServingTests(TempMediaRootMixin, TestCase):
+    """ Fichiers médias servis avec validateurs, réponses 304 et plages d'octets. """
+
+    def setUp(self):
+        super().setUp()
+        self.name = TblImageSalon._meta.get_field('urlImages').storage.save('photo.png', ContentFile(b'0123456789'))
+        self.factory = RequestFactory()
+
+    def get(self, path, **headers):
+        response = serve_media(self.factory.get('/media/' + path, **headers), path)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        if getattr(response, 'file_to_stream', None):
+            response.file_to_stream.close()  # response.close() enverrait request_finished (fermeture de la base)
+        return response, body
+
+    def test_blob_is_cacheable_forever_and_revalidated(self):
+        response, body = self.get(self.name)
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['ETag'], f'"{os.path.basename(self.name).split(".")[0]}"')
+
+        response, body = self.get(self.name, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((response.status_code, body), (304, b''))
+
+    def test_byte_ranges(self):
+        response, body = self.get(self.name, HTTP_RANGE='bytes=2-5')
+        self.assertEqual((response.status_code, body), (206, b'2345'))
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response, body = self.get(self.name, HTTP_RANGE='bytes=-3')
+        self.assertEqual(body, b'789')
+        response, _ = self.get(self.name, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        # If-Range périmé : fichier complet
+        response, body = self.get(self.name, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"autre"')
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+
+    def test_paths_outside_media_root_are_not_found(self):
+        with self.assertRaises(Http404):
+            self.get('../settings.py')
+
+
+@override_settings(
+    MIDDLEWARE=['hairbnb.middleware.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE,
+    HAIRBNB_QUERY_BUDGETS={'get_coiffeuse_by_uuid': 0},
+)
+class QueryInstrumentationTests(TestCase):
+    """ Nombre de requêtes, temps en base et requêtes répétées relevés pour chaque requête HTTP. """
+
+    def test_server_timing_log_and_budget_alert(self):
+        user = create_user('uuid-instrumented', 'coiffeuse')
+        with self.assertLogs('hairbnb.requests', 'INFO') as requests_log, \
+                self.assertLogs('hairbnb.query_budget', 'WARNING') as budget_log:
+            response = self.client.get(f'/api/get_coiffeuse_by_uuid/{user.uuid}/')
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries, \d+ dup", total;dur=[\d.]+$')
+        entry = json.loads(requests_log.records[0].getMessage())
+        self.assertEqual((entry['view'], entry['status']), ('get_coiffeuse_by_uuid', 200))
+        self.assertGreater(entry['queries'], 0)
+        self.assertIn('get_coiffeuse_by_uuid', budget_log.output[0])
+
+    def test_repeated_queries_are_detected(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for pk in range(4):
+                TblUser.objects.filter(pk=pk).exists()
+            list(TblUser.objects.filter(pk__in=[1, 2]))
+            list(TblUser.objects.filter(pk__in=[1, 2, 3]))
+        self.assertEqual((stats.count, stats.duplicates), (6, 4))
+        self.assertEqual(stats.most_repeated()[1], 4)
+
+
+
+@override_settings(
+    MIDDLEWARE=['hairbnb.middleware.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE,
+    HAIRBNB_METRICS_ENABLED=True,
+)
+class MetricsTests(TestCase):
+    """ /metrics expose requêtes, base, géocodage et caches, additionnés sur les threads et les workers. """
+
+    def setUp(self):
+        Metrics.reset()
+
+    def test_requests_geocoding_and_caches_are_exported(self):
+        user = create_user('uuid-metrics', 'coiffeuse')
+        self.client.get(f'/api/get_coiffeuse_by_uuid/{user.uuid}/')
+        found = mock.Mock(**{'json.return_value': [{'lat': '50.63', 'lon': '5.57'}]})
+        with mock.patch('hairbnb.services.geolocation_service.requests.get', side_effect=[found, OSError('timeout')]), \
+                mock.patch('hairbnb.services.geolocation_service.print', create=True):
+            GeolocationService.geocode_address('Rue Saint-Gilles 12, 4000 Liège')
+            GeolocationService.geocode_address('Rue Saint-Gilles 12, 4000 Liège')
+
+        response = self.client.get('/metrics')
+
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('hairbnb_http_requests_total{route="get_coiffeuse_by_uuid",method="GET",status="200"} 1\n', text)
+        self.assertIn('hairbnb_http_request_duration_seconds_bucket{route="get_coiffeuse_by_uuid",le="+Inf"} 1\n', text)
+        self.assertRegex(text, r'hairbnb_http_request_db_queries_sum\{route="get_coiffeuse_by_uuid"\} [1-9]')
+        self.assertIn('hairbnb_geocoding_requests_total{outcome="found"} 1\n', text)
+        self.assertIn('hairbnb_geocoding_requests_total{outcome="error"} 1\n', text)
+        self.assertIn('hairbnb_geocoding_duration_seconds_count 2\n', text)
+        self.assertIn('hairbnb_cache_hit_ratio{cache="profile_fragments"}', text)
+
+    def test_threads_and_workers_are_added_up(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        labels = (('outcome', 'found'),)
+        worker = threading.Thread(target=lambda: [Metrics.inc('hairbnb_geocoding_requests_total', labels)
+                                                  for _ in range(3)])
+        worker.start()
+        worker.join()
+        Metrics.inc('hairbnb_geocoding_requests_total', labels)
+
+        with mock.patch.object(Metrics, 'DIR', metrics_dir):
+            with mock.patch.object(Metrics, '_token', 'autre-worker'):
+                Metrics.flush()  # Un second worker avec les mêmes compteurs
+            Metrics.inc('hairbnb_geocoding_requests_total', labels)
+            text = Metrics.render()
+
+        self.assertIn('hairbnb_geocoding_requests_total{outcome="found"} 9\n', text)  # 4 + 5
+        self.assertEqual(len(os.listdir(metrics_dir)), 2)
+
+    def test_endpoint_is_disabled_by_default_and_limited_to_allowed_ips(self):
+        with override_settings(HAIRBNB_METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(HAIRBNB_METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)  # 127.0.0.1 autorisée par défaut
+
+    def test_processes_without_metrics_write_no_snapshot(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        with mock.patch.object(Metrics, 'DIR', metrics_dir), mock.patch('atexit.register') as register, \
+                mock.patch.object(Metrics, '_exit_flush_registered', False):
+            Metrics.flush()  # Commande manage.py : rien relevé
+            self.assertEqual(os.listdir(metrics_dir), [])
+            register.assert_not_called()
+
+            self.client.get('/api/list_coiffeuses/')  # Le middleware enregistre le dernier instantané du worker
+            register.assert_called_once_with(Metrics.flush)
+            Metrics.flush()
+        self.assertEqual(len(os.listdir(metrics_dir)), 1)
+
+
+@override_settings(
+    HAIRBNB_UUID_BLOOM_ENABLED=False,  # Filtre reconstruit une fois par heure : hors mesure
+    HAIRBNB_METRICS_ENABLED=True,
+)
+class QueryBudgetTests(TempMediaRootMixin, TestCase):
+    """
+    Chaque route de l'API avec un nombre maximal de requêtes SQL, mesuré sur deux tailles de catalogue
+    (salons de 30 puis 60 services, paniers de 10 puis 20 articles) : le nombre de requêtes d'une route
+    ne doit pas dépendre du volume de données. Caches vidés avant chaque appel (pire cas, cache froid).
+    L'admin Django n'est pas couverte ; la route des médias, montée seulement en DEBUG, est appelée directement.
+    """
+    SCALES = (1, 2)
+    # Nom de la route : (requêtes maximum, statut attendu)
+    BUDGETS = {
+        'home': (0, 200),
+        'create_user_profile': (8, 201),
+        'check_user_profile': (1, 200),
+        'create_salon': (8, 201),
+        'services-list': (1, 200),
+        'add_or_update_service': (14, 200),
+        'add_or_update_service_without_id': (11, 201),
+        'coiffeuse_services': (6, 200),
+        'list_coiffeuses': (2, 200),
+        'get_user_profile': (2, 200),
+        'update_user_profile': (2, 200),
+        'get_id_and_type_from_uuid': (1, 200),
+        'add_service_to_salon': (27, 201),
+        'get_coiffeuse_by_uuid': (2, 200),
+        'get_client_by_uuid': (2, 200),
+        'update_coiffeuse': (2, 200),
+        'update_client': (2, 200),
+        'get_services_by_coiffeuse': (5, 200),
+        'add_service_to_coiffeuse': (13, 201),
+        'update_service': (14, 200),
+        'delete_service': (7, 200),
+        'coiffeuses_proches': (2, 200),
+        'get_authenticated_user': (3, 200),
+        'get_current_user': (3, 200),
+        'get_coiffeuses_info': (1, 200),
+        'get_cart': (7, 200),
+        'add_to_cart': (13, 200),
+        'remove_from_cart': (12, 200),
+        'clear_cart': (8, 200),
+        'batch_cart_operations': (16, 200),
+        'get_token_cart': (4, 200),
+        'token_cart_operations': (5, 200),
+        'commit_token_cart': (20, 200),
+        'create_promotion': (7, 201),
+        'salon_images': (1, 200),
+        'salon_images_upload': (13, 201),  # Dont 3 pour thumbnails_generated (génération synchrone ici)
+        'serve_media': (0, 200),
+        'metrics': (0, 200),
+    }
+
+    def setUp(self):
+        super().setUp()
+        default_storage.save('photos/budget.txt', ContentFile(b'budget'))
+
+        geocode = mock.patch.object(GeolocationService, 'geocode_address', return_value=(50.63, 5.57))
+        geocode.start()
+        self.addCleanup(geocode.stop)
+
+    def build_catalogue(self, scale):
+        """ Coiffeuses, salons, services (temps, prix, promotions), galerie et panier, proportionnels à scale. """
+        prix = TblPrix.objects.bulk_create([TblPrix(prix=10 + i) for i in range(30)])
+        temps = TblTemps.objects.bulk_create([TblTemps(minutes=minutes) for minutes in (15, 30, 45, 60)])
+        debut, fin = now() - timedelta(days=1), now() + timedelta(days=30)
+
+        coiffeuses, salons, services = [], [], []
+        for i in range(2 * scale):
+            user = create_user(f'uuid-budget-coiffeuse-{i}', 'coiffeuse')
+            salon = TblSalon.objects.create(coiffeuse=user.coiffeuse, slogan=f'Salon {i}')
+            salon_services = TblService.objects.bulk_create([
+                TblService(intitule_service=f'Service {i}-{j}', description='Description') for j in range(30 * scale)
+            ])
+            TblSalonService.objects.bulk_create([TblSalonService(salon=salon, service=s) for s in salon_services])
+            TblServicePrix.objects.bulk_create([
+                TblServicePrix(service=s, prix=prix[j % len(prix)]) for j, s in enumerate(salon_services)
+            ])
+            TblServiceTemps.objects.bulk_create([
+                TblServiceTemps(service=s, temps=temps[j % len(temps)]) for j, s in enumerate(salon_services)
+            ])
+            TblPromotion.objects.bulk_create([
+                TblPromotion(service=s, discount_percentage=20, start_date=debut, end_date=fin)
+                for s in salon_services[::2]
+            ])
+            TblImageSalon.objects.bulk_create([
+                TblImageSalon(salon=salon, urlImages=f'photos/salons/{i}-{j}.jpg', width=800, height=600, size=1000)
+                for j in range(5 * scale)
+            ])
+            coiffeuses.append(user)
+            salons.append(salon)
+            services.extend(salon_services)
+
+        client = create_user('uuid-budget-client', 'client')
+        cart = TblCart.objects.create(user=client)
+        TblCartItem.objects.bulk_create([TblCartItem(cart=cart, service=s, quantity=2) for s in services[:10 * scale]])
+        return {
+            'coiffeuses': coiffeuses, 'salon': salons[0], 'services': services, 'client': client,
+            'sans_salon': create_user('uuid-budget-sans-salon', 'coiffeuse'),
+        }
+
+    def routes(self, data):
+        """ {nom de la route: appel} ; les prix et durées envoyés n'existent pas encore dans le catalogue. """
+        coiffeuse, client, service, salon = data['coiffeuses'][0], data['client'], data['services'][0], data['salon']
+        cart_services = data['services'][:10]
+        token = CartTokenService.dumps({s.idTblService: 1 for s in cart_services})
+        factory = RequestFactory()
+
+        def send(method, url, body, **extra):
+            return getattr(self.client, method)(url, json.dumps(body), content_type='application/json', **extra)
+
+        def authenticated_user():
+            # FirebaseAuthenticationMiddleware pose request.firebase_uid (vérification testée à part)
+            request = factory.get('/api/get_current_user/')
+            request.firebase_uid = coiffeuse.uuid
+            return get_authenticated_user(request)
+
+        def upload():
+            buffer = io.BytesIO()
+            Image.new('RGB', (40, 30), 'green').save(buffer, format='PNG')
+            image = SimpleUploadedFile('budget.png', buffer.getvalue(), content_type='image/png')
+            with mock.patch.object(ThumbnailService, 'WORKERS', 0):
+                return self.client.post(f'/api/salons/{salon.pk}/images/', {'images': [image]})
+
+        def media():
+            response = serve_media(factory.get('/media/photos/budget.txt'), 'photos/budget.txt')
+            response.file_to_stream.close()
+            return response
+
+        profile = {
+            'userUuid': 'uuid-budget-nouveau', 'email': 'nouveau@example.com', 'role': 'client', 'nom': 'Nouveau',
+            'prenom': 'Client', 'sexe': 'homme', 'telephone': '0400000001', 'code_postal': '4000',
+            'commune': 'Liège', 'rue': 'Rue Neuve', 'numero': '3', 'date_naissance': '01-02-1990',
+        }
+        new_service = {'description': 'Nouveau service', 'prix': 99}
+        return {
+            'home': lambda: self.client.get('/'),
+            'create_user_profile': lambda: send('post', '/api/create-profile/', profile),
+            'check_user_profile': lambda: send('post', '/api/check-user-profile/', {'userUuid': coiffeuse.uuid}),
+            'create_salon': lambda: send('post', '/api/create_salon/', {
+                'userUuid': data['sans_salon'].uuid, 'slogan': 'Nouveau salon'}),
+            'services-list': lambda: self.client.get('/api/services/'),
+            'add_or_update_service': lambda: send('put', f'/api/add_or_update_service/{service.pk}/', {
+                **new_service, 'minutes': 50}),
+            'add_or_update_service_without_id': lambda: send('post', '/api/add_or_update_service/', {
+                **new_service, 'name': 'Brushing', 'minutes': 50}),
+            'coiffeuse_services': lambda: self.client.get(f'/api/coiffeuse_services/{coiffeuse.pk}/'),
+            'list_coiffeuses': lambda: self.client.get('/api/list_coiffeuses/'),
+            'get_user_profile': lambda: self.client.get(f'/api/get_user_profile/{coiffeuse.uuid}/'),
+            'update_user_profile': lambda: send('patch', f'/api/update_user_profile/{coiffeuse.uuid}/', {
+                'nom': 'Martin'}),
+            'get_id_and_type_from_uuid': lambda: self.client.get(f'/api/get_id_and_type_from_uuid/{coiffeuse.uuid}/'),
+            'add_service_to_salon': lambda: send('post', '/api/add_service_to_salon/', {
+                **new_service, 'userId': coiffeuse.pk, 'intitule_service': 'Balayage', 'temps_minutes': 50}),
+            'get_coiffeuse_by_uuid': lambda: self.client.get(f'/api/get_coiffeuse_by_uuid/{coiffeuse.uuid}/'),
+            'get_client_by_uuid': lambda: self.client.get(f'/api/get_client_by_uuid/{client.uuid}/'),
+            'update_coiffeuse': lambda: send('put', f'/api/update_coiffeuse/{coiffeuse.uuid}/', {
+                'denomination_sociale': 'Salon Martin'}),
+            'update_client': lambda: send('put', f'/api/update_client/{client.uuid}/', {}),
+            'get_services_by_coiffeuse': lambda: self.client.get(f'/api/get_services_by_coiffeuse/{coiffeuse.pk}/'),
+            'add_service_to_coiffeuse': lambda: send('post', f'/api/add_service_to_coiffeuse/{coiffeuse.pk}/', {
+                **new_service, 'intitule_service': 'Chignon', 'temps': 50}),
+            'update_service': lambda: send('put', f'/api/update_service/{service.pk}/', {**new_service, 'temps': 50}),
+            'delete_service': lambda: self.client.delete(f'/api/delete_service/{service.pk}/'),
+            'coiffeuses_proches': lambda: self.client.get('/api/coiffeuses_proches/', {
+                'lat': 50.63, 'lon': 5.57, 'distance': 10}),
+            'get_authenticated_user': authenticated_user,
+            'get_current_user': lambda: self.client.get(f'/api/get_current_user/{coiffeuse.uuid}/'),
+            'get_coiffeuses_info': lambda: send('post', '/api/get_coiffeuses_info/', {
+                'uuids': [user.uuid for user in data['coiffeuses']]}),
+            'get_cart': lambda: self.client.get(f'/api/get_cart/{client.pk}/'),
+            'add_to_cart': lambda: send('post', '/api/add_to_cart/', {
+                'user_id': client.pk, 'service_id': data['services'][-1].pk}),
+            'remove_from_cart': lambda: send('delete', '/api/remove_from_cart/', {
+                'user_id': client.pk, 'service_id': service.pk}),
+            'clear_cart': lambda: send('delete', '/api/clear_cart/', {'user_id': client.pk}),
+            'batch_cart_operations': lambda: send('post', '/api/batch_cart_operations/', {
+                'user_id': client.pk,
+                'operations': [{'op': 'set', 'service_id': s.pk, 'quantity': 3} for s in cart_services]}),
+            'get_token_cart': lambda: self.client.get('/api/token_cart/', HTTP_X_CART_TOKEN=token),
+            'token_cart_operations': lambda: send('post', '/api/token_cart/operations/', {
+                'operations': [{'op': 'add', 'service_id': service.pk, 'quantity': 1}]}, HTTP_X_CART_TOKEN=token),
+            'commit_token_cart': lambda: send('post', '/api/token_cart/commit/', {'user_id': client.pk},
+                                              HTTP_X_CART_TOKEN=token),
+            'create_promotion': lambda: send('post', f'/api/create_promotion/{service.pk}/', {
+                'discount_percentage': 15, 'start_date': '2026-01-01', 'end_date': '2026-12-31'}),
+            'salon_images': lambda: self.client.get(f'/api/salons/{salon.pk}/images/'),
+            'salon_images_upload': upload,
+            'serve_media': media,
+            'metrics': lambda: self.client.get('/metrics'),
+        }
+
+    def measure(self, scale):
+        """ {route: (requêtes, statut)} ; chaque appel est annulé pour que les routes d'écriture restent indépendantes. """
+        counts = {}
+        with transaction.atomic():
+            for name, call in self.routes(self.build_catalogue(scale)).items():
+                cache.clear()
+                UserResolver.clear()
+                AddressResolver.clear()
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        response = call()
+                    transaction.set_rollback(True)
+                counts[name] = (len(queries), response.status_code)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_every_route_has_a_budget(self):
+        from hairbnb.urls.serializers_urls import urlpatterns as api_patterns
+        from hairbnb_backend.urls import urlpatterns as root_patterns
+
+        names = {getattr(pattern, 'name', None) for pattern in root_patterns + api_patterns} - {None}
+        self.assertEqual(names - set(self.BUDGETS), set())
+
+    def test_query_counts_stay_within_budget_and_do_not_grow(self):
+        small, large = (self.measure(scale) for scale in self.SCALES)
+        self.assertEqual(set(small), set(self.BUDGETS))
+        for name, (budget, status) in self.BUDGETS.items():
+            with self.subTest(route=name):
+                self.assertEqual((small[name][1], large[name][1]), (status, status))
+                self.assertLessEqual(small[name][0], budget)
+                self.assertEqual(large[name][0], small[name][0], "Le nombre de requêtes dépend du volume de données")
@@ -1,11 +1,13 @@
 from django.urls import path
 
-from hairbnb.views.cart_serialisers_views import get_cart, add_to_cart, remove_from_cart, clear_cart
+from hairbnb.views.cart_serialisers_views import get_cart, add_to_cart, remove_from_cart, clear_cart, \
+    batch_cart_operations, get_token_cart, token_cart_operations, commit_token_cart
 from hairbnb.views.geolocation_serializers_views import coiffeuses_proches
 from hairbnb.views.salon_services_serializers_views import get_services_by_coiffeuse, \
     update_service, delete_service, add_service_to_coiffeuse, create_promotion
+from hairbnb.views.salon_images_views import salon_images
 from hairbnb.views.users_serializers_views import get_coiffeuse_by_uuid, get_client_by_uuid, update_coiffeuse, \
-    update_client, get_current_user, get_coiffeuses_info
+    update_client, get_current_user, get_authenticated_user, get_coiffeuses_info
 
 urlpatterns = [
     path('get_coiffeuse_by_uuid/<str:uuid>/', get_coiffeuse_by_uuid, name='get_coiffeuse_by_uuid'),
@@ -17,12 +19,18 @@ urlpatterns = [
     path('update_service/<int:service_id>/', update_service, name='update_service'),
     path('delete_service/<int:service_id>/', delete_service, name='delete_service'),
     path('coiffeuses_proches/', coiffeuses_proches, name='coiffeuses_proches'),
+    path('get_current_user/', get_authenticated_user, name='get_authenticated_user'),
     path('get_current_user/<str:uuid>/', get_current_user, name='get_current_user'),
     path('get_coiffeuses_info/', get_coiffeuses_info, name="get_coiffeuses_info"),
     path('get_cart/<int:user_id>/', get_cart, name="get_cart" ),
     path('add_to_cart/', add_to_cart, name="add_to_cart"),
     path('remove_from_cart/', remove_from_cart, name="remove_from_cart"),
     path('clear_cart/', clear_cart, name="clear_cart"),
+    path('batch_cart_operations/', batch_cart_operations, name="batch_cart_operations"),
+    path('token_cart/', get_token_cart, name="get_token_cart"),
+    path('token_cart/operations/', token_cart_operations, name="token_cart_operations"),
+    path('token_cart/commit/', commit_token_cart, name="commit_token_cart"),
     path('create_promotion/<int:service_id>/', create_promotion, name="create_promotion"),
+    path('salons/<int:salon_id>/images/', salon_images, name="salon_images"),
 
 ]
@@ -0,0 +1,63 @@
+def first_related(instance, related_name):
+    """
+    Retourne le premier objet d'une relation inverse (ex: service.service_prix).
+
+    Si la relation a été préchargée avec prefetch_related, on lit le cache
+    (aucune requête). Sinon on retombe sur .first() comme avant.
+    """
+    prefetched = getattr(instance, '_prefetched_objects_cache', {})
+    if related_name in prefetched:
+        return next(iter(prefetched[related_name]), None)
+    return getattr(instance, related_name).first()
+
+
+def apply_changes(instance, data, fields):
+    """
+    Copie dans `instance` les valeurs de `data` qui diffèrent de l'instance, pour les seuls
+    champs de `fields` (liste blanche, les autres clés sont ignorées), puis sauve uniquement
+    ces colonnes avec update_fields.
+
+    Aucune requête si rien n'a changé. Une instance pas encore en base n'est pas sauvée
+    (l'appelant fait le save() complet). Retourne la liste des champs modifiés.
+    Lève ValidationError si une valeur ne peut pas être convertie (ex: date mal formée).
+    """
+    changed = []
+    for name in fields:
+        if name not in data:
+            continue
+        field = instance._meta.get_field(name)
+        value = field.to_python(data[name])
+        if getattr(instance, field.attname) != value:
+            setattr(instance, field.attname, value)
+            changed.append(field.name)
+
+    if changed and instance.pk is not None:
+        # Les champs auto_now (ex: updated_at) ne sont mis à jour par save() que s'ils sont listés
+        auto_now = [f.name for f in instance._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        instance.save(update_fields=changed + [name for name in auto_now if name not in changed])
+    return changed
+
+
+def upsert_link(model, lookup, field, value):
+    """
+    Fait pointer la ligne de liaison `model` désignée par `lookup` vers `value`,
+    ex: upsert_link(TblServicePrix, {'service': service}, 'prix', prix).
+
+    La ligne existante est modifiée sur place (UPDATE d'une colonne) au lieu d'être
+    supprimée puis recréée ; rien n'est écrit si elle pointe déjà vers `value`.
+    Les éventuelles lignes en trop (anciens doublons) sont supprimées.
+    Retourne True si une écriture a eu lieu.
+    """
+    attname = model._meta.get_field(field).attname
+    rows = list(model.objects.filter(**lookup).order_by('pk').values_list('pk', attname))
+    if not rows:
+        model.objects.create(**lookup, **{field: value})
+        return True
+
+    (pk, current), extra = rows[0], [row[0] for row in rows[1:]]
+    if extra:
+        model.objects.filter(pk__in=extra).delete()
+    if current == value.pk:
+        return bool(extra)
+    model.objects.filter(pk=pk).update(**{attname: value.pk})
+    return True
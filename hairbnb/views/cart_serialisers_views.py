@@ -1,8 +1,20 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from hairbnb.business.business_logic import CartData
-from hairbnb.models import TblCart, TblCartItem, TblService, TblUser
+from hairbnb.business.business_logic import CartData, CartDeltaData, TokenCartData
+from hairbnb.models import TblCart, TblCartItem, TblCartTokenCommit, TblService, TblUser
+from hairbnb.services.cart_service import CartService, CartOperationError
+from hairbnb.services.cart_token_service import CartTokenService
+
+
+def wants_delta(request):
+    """
+    Le client demande une réponse allégée avec ?mode=delta (ou "mode": "delta" dans le corps).
+    Sans ce paramètre, les vues renvoient le panier complet comme avant.
+    """
+    mode = request.query_params.get('mode') or request.data.get('mode')
+    return mode == 'delta'
 
 # 🛒 **Récupérer le panier d'un utilisateur spécifique**
 @api_view(['GET'])
@@ -10,8 +22,11 @@ def get_cart(request, user_id):
     """
     Récupérer le panier d'un utilisateur via son ID.
     """
-    user = get_object_or_404(TblUser, idTblUser=user_id)  # Vérifie si l'utilisateur existe
+    # Vérifie si l'utilisateur existe (chargé avec son profil, réutilisé par CartData)
+    user = get_object_or_404(TblUser.objects.with_profile(), idTblUser=user_id)
     cart, created = TblCart.objects.get_or_create(user=user)  # Récupère ou crée le panier
+    cart.user = user  # get_or_create ne réutilise pas l'instance passée lorsqu'il trouve le panier
+    CartService.touch(cart)  # Panier consulté = actif pour purge_carts (une écriture par heure au plus)
 
     return Response(CartData(cart).to_dict(), status=200)
 
@@ -23,19 +38,25 @@ def add_to_cart(request):
     Ajouter un service au panier via l'ID utilisateur et l'ID service.
     """
     user_id = request.data.get('user_id')  # Récupère l'ID utilisateur envoyé dans la requête
-    service_id = request.data.get('service_id')
-    quantity = int(request.data.get('quantity', 1))
-
     user = get_object_or_404(TblUser, idTblUser=user_id)  # Vérifie si l'utilisateur existe
-    service = get_object_or_404(TblService, idTblService=service_id)  # Vérifie si le service existe
+
+    # Mêmes règles que les opérations groupées : entiers, quantité positive, service existant
+    try:
+        [(_, service_id, quantity)] = CartService.parse_operations([{
+            "op": "add", "service_id": request.data.get('service_id'), "quantity": request.data.get('quantity', 1)}])
+    except CartOperationError as e:
+        return Response({"message": str(e)}, status=400)
 
     cart, created = TblCart.objects.get_or_create(user=user)  # Récupère ou crée le panier
 
-    # Vérifier si le service est déjà dans le panier
-    cart_item, created = TblCartItem.objects.get_or_create(cart=cart, service=service)
-    if not created:
-        cart_item.quantity += quantity  # Incrémente si déjà présent
-    cart_item.save()
+    # Crée la ligne ou incrémente sa quantité directement en base (sans perte sous concurrence)
+    cart_item_id = CartService.add_item(cart, service_id, quantity)
+    CartService.bump_version(cart)
+
+    if wants_delta(request):
+        cart_item = TblCartItem.objects.with_details().get(pk=cart_item_id)
+        delta = CartDeltaData(cart, service_id=service_id, cart_item=cart_item)
+        return Response({"message": "Service ajouté au panier ✅", "cart_delta": delta.to_dict()}, status=200)
 
     return Response({"message": "Service ajouté au panier ✅", "cart": CartData(cart).to_dict()}, status=200)
 
@@ -54,10 +75,132 @@ def remove_from_cart(request):
     cart_item = get_object_or_404(TblCartItem, cart=cart, service_id=service_id)  # Récupère l'élément à supprimer
 
     cart_item.delete()  # Supprime l'article du panier
+    CartService.bump_version(cart)
+
+    if wants_delta(request):
+        delta = CartDeltaData(cart, service_id=cart_item.service_id)
+        return Response({"message": "Service supprimé du panier ✅", "cart_delta": delta.to_dict()}, status=200)
 
     return Response({"message": "Service supprimé du panier ✅", "cart": CartData(cart).to_dict()}, status=200)
 
 
+# 📦 **Appliquer plusieurs opérations au panier en une seule requête**
+@api_view(['POST'])
+def batch_cart_operations(request):
+    """
+    Applique une liste d'opérations (add / set / remove) au panier d'un utilisateur
+    dans une seule transaction, puis renvoie le panier final une seule fois.
+    Utile pour restaurer un panier après réinstallation ou pour "réserver à nouveau".
+
+    Corps attendu :
+    {"user_id": 1, "operations": [{"op": "add", "service_id": 3, "quantity": 2},
+                                  {"op": "set", "service_id": 5, "quantity": 1},
+                                  {"op": "remove", "service_id": 7}]}
+    """
+    user_id = request.data.get('user_id')
+    operations = request.data.get('operations')
+
+    if not isinstance(operations, list) or not operations:
+        return Response({"message": "La liste 'operations' est obligatoire."}, status=400)
+
+    user = get_object_or_404(TblUser, idTblUser=user_id)
+    cart, created = TblCart.objects.get_or_create(user=user)
+
+    try:
+        CartService.apply_operations(cart, operations)
+    except CartOperationError as e:
+        return Response({"message": str(e)}, status=400)
+
+    return Response({"message": "Panier mis à jour ✅", "cart": CartData(cart).to_dict()}, status=200)
+
+
+# 🍪 **Panier sans base de données (jeton signé côté client)**
+@api_view(['GET'])
+def get_token_cart(request):
+    """
+    Affiche le panier stocké dans le jeton signé (en-tête X-Cart-Token ou cookie).
+    Aucune écriture en base : seuls les services sont relus pour les prix et promotions.
+    """
+    items, version, nonce = CartTokenService.from_request(request)
+    token = CartTokenService.dumps(items, version, nonce)  # Contenu inchangé : même nonce
+    response = Response({"cart": TokenCartData(items, version).to_dict(), "cart_token": token}, status=200)
+    return CartTokenService.attach(response, token)
+
+
+@api_view(['POST'])
+def token_cart_operations(request):
+    """
+    Applique des opérations (add / set / remove, même format que batch_cart_operations)
+    au panier stocké dans le jeton, et renvoie le nouveau jeton. Aucune écriture en base.
+    """
+    operations = request.data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return Response({"message": "La liste 'operations' est obligatoire."}, status=400)
+
+    items, version, _ = CartTokenService.from_request(request)
+    try:
+        parsed = CartService.parse_operations(operations)
+    except CartOperationError as e:
+        return Response({"message": str(e)}, status=400)
+
+    items.update(CartService.fold_operations(parsed, items))
+    items = {service_id: quantity for service_id, quantity in items.items() if quantity > 0}
+    too_large = CartTokenService.too_large(items)
+    if too_large:
+        return Response({"message": too_large}, status=400)
+
+    version += 1
+    token = CartTokenService.dumps(items, version)
+    response = Response({"message": "Panier mis à jour ✅", "cart": TokenCartData(items, version).to_dict(),
+                         "cart_token": token}, status=200)
+    return CartTokenService.attach(response, token)
+
+
+@api_view(['POST'])
+def commit_token_cart(request):
+    """
+    Fusionne le panier du jeton dans le panier en base de l'utilisateur (les quantités s'additionnent),
+    en une seule transaction, puis vide le jeton. À appeler quand l'utilisateur valide son panier.
+
+    - Les services supprimés depuis la création du jeton sont ignorés (comme à l'affichage).
+    - Idempotent : le nonce du jeton est enregistré avec la fusion (TblCartTokenCommit, unique par panier),
+      un retry avec le même jeton sur le même panier ne rajoute rien. La réponse contient un jeton vide ("cart_token")
+      qui remplace celui du client (le cookie est supprimé).
+    """
+    user_id = request.data.get('user_id')
+    user = get_object_or_404(TblUser, idTblUser=user_id)
+    items, version, nonce = CartTokenService.from_request(request)
+    too_large = CartTokenService.too_large(items)
+    if too_large:
+        return Response({"message": too_large}, status=400)
+
+    existing = set(TblService.objects.filter(pk__in=list(items)).values_list('pk', flat=True))
+    operations = [{"op": "add", "service_id": service_id, "quantity": quantity}
+                  for service_id, quantity in items.items() if service_id in existing]
+
+    cart, created = TblCart.objects.get_or_create(user=user)
+    already_committed = False
+    try:
+        with transaction.atomic():
+            if nonce:
+                TblCartTokenCommit.objects.create(cart=cart, nonce=nonce)  # (panier, nonce) unique : échoue au retry
+            if operations:
+                CartService.apply_operations(cart, operations)
+    except IntegrityError:
+        # Seul un commit déjà enregistré pour ce panier et ce nonce signifie "retry" ; toute autre erreur remonte
+        if not nonce or not TblCartTokenCommit.objects.filter(cart=cart, nonce=nonce).exists():
+            raise
+        already_committed = True
+    except CartOperationError as e:  # Service supprimé pendant la fusion : rien n'est enregistré, nonce compris
+        return Response({"message": str(e)}, status=400)
+
+    message = "Panier déjà enregistré ✅" if already_committed else "Panier enregistré ✅"
+    response = Response({"message": message, "cart": CartData(cart).to_dict(),
+                         "cart_token": CartTokenService.dumps({}, version + 1)}, status=200)
+    response.delete_cookie(CartTokenService.COOKIE_NAME)
+    return response
+
+
 # 🗑 **Vider complètement le panier d'un utilisateur**
 @api_view(['DELETE'])
 def clear_cart(request):
@@ -69,6 +212,10 @@ def clear_cart(request):
     user = get_object_or_404(TblUser, idTblUser=user_id)
     cart = get_object_or_404(TblCart, user=user)
     cart.items.all().delete()  # Supprime tous les articles du panier
+    CartService.bump_version(cart)
+
+    if wants_delta(request):
+        return Response({"message": "Panier vidé ✅", "cart_delta": CartDeltaData(cart).to_dict()}, status=200)
 
     return Response({"message": "Panier vidé ✅", "cart": CartData(cart).to_dict()}, status=200)
 
@@ -1,8 +1,12 @@
+import logging
+
 from django.http import JsonResponse
 from hairbnb.models import TblCoiffeuse
-from ..serializers.users_serializers import CoiffeuseSerializer
+from ..services.profile_fragment_cache import ProfileFragmentCache
 from math import radians, cos, sin, sqrt, atan2
 
+logger = logging.getLogger(__name__)
+
 def haversine(lat1, lon1, lat2, lon2):
     """
     Calcul de la distance entre deux points en kilomètres avec la formule de Haversine.
@@ -23,21 +27,23 @@ def coiffeuses_proches(request):
         lon_client = float(request.GET.get('lon', 0))  # Longitude du client
         distance_max = float(request.GET.get('distance', 10))  # Distance max en km
 
-        coiffeuses = []
-        for coiffeuse in TblCoiffeuse.objects.all():
-            if coiffeuse.position:
-                try:
-                    lat_coiffeuse, lon_coiffeuse = map(float, coiffeuse.position.split(","))  # Extraire coordonnées
-                    distance = haversine(lat_client, lon_client, lat_coiffeuse, lon_coiffeuse)
+        # Seules les positions sont lues ici ; les profils viennent du cache de fragments JSON
+        proches = []
+        positions = TblCoiffeuse.objects.exclude(position__isnull=True).exclude(position='').order_by('id') \
+            .values_list('idTblUser_id', 'position')
+        for user_id, position in positions:
+            try:
+                lat_coiffeuse, lon_coiffeuse = map(float, position.split(","))  # Extraire coordonnées
+                distance = haversine(lat_client, lon_client, lat_coiffeuse, lon_coiffeuse)
 
-                    if distance <= distance_max:
-                        coiffeuses.append(coiffeuse)
-                except ValueError:
-                    print(f"⚠️ Erreur conversion position pour {coiffeuse.idTblUser.nom}")
+                if distance <= distance_max:
+                    proches.append(user_id)
+            except ValueError:
+                logger.warning(f"⚠️ Position invalide ({position!r}) pour l'utilisateur {user_id}")
 
-        serialized_coiffeuses = CoiffeuseSerializer(coiffeuses, many=True).data
+        fragments = ProfileFragmentCache.coiffeuse_fragments(proches)
 
-        return JsonResponse({"status": "success", "coiffeuses": serialized_coiffeuses})
+        return ProfileFragmentCache.response({"status": "success"}, "coiffeuses", ProfileFragmentCache.join(fragments))
 
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
@@ -0,0 +1,139 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+# Fichiers dont l'URL ne change jamais de contenu (stockage par contenu et leurs miniatures)
+IMMUTABLE_PREFIXES = ('blobs/', 'derivees/blobs/')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+BLOB_HASH = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Lecture bornée à une plage d'octets. Sans fileno() : le serveur WSGI ne peut pas
+    l'envoyer avec sendfile jusqu'à la fin du fichier, seule la plage demandée est transmise.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def media_etag(path, stats):
+    # blobs/ : le nom contient le SHA-256 du contenu, validateur fort sans relire le fichier
+    match = BLOB_HASH.match(path)
+    if match:
+        return quote_etag(match.group(1))
+    return quote_etag(f"{stats.st_mtime_ns:x}-{stats.st_size:x}")
+
+
+def parse_range(header, size):
+    """ (début, fin incluse) pour une plage unique "bytes=a-b", "bytes=a-" ou "bytes=-n" ; None si ignorée. """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # Plages multiples ou syntaxe inconnue : réponse complète (autorisé par la RFC 9110)
+    start, end = match.groups()
+    if start:
+        start = int(start)
+        if start >= size:
+            return start, size - 1  # Plage hors du fichier : 416
+        end = min(int(end), size - 1) if end else size - 1
+        if end < start:
+            return None
+    else:
+        start, end = max(size - int(end), 0), size - 1  # Suffixe : les n derniers octets
+    return start, end
+
+
+def serve_media(request, path):
+    """
+    Sert les fichiers de MEDIA_ROOT (remplace django.conf.urls.static sur les petits déploiements) :
+    - ETag (SHA-256 pour les blobs) et Last-Modified, réponses 304 sur If-None-Match / If-Modified-Since ;
+    - Range (une plage) avec If-Range, réponses 206 / 416 ;
+    - Cache-Control d'un an (immutable) pour les blobs et leurs miniatures, HAIRBNB_MEDIA_MAX_AGE sinon ;
+    - réponse complète via FileResponse : le serveur WSGI l'envoie avec sendfile (wsgi.file_wrapper).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if path.startswith('blobs/tmp/'):
+        raise Http404("Fichier introuvable")  # Uploads en cours de réception
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Fichier introuvable")
+    try:
+        stats = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Fichier introuvable")
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404("Fichier introuvable")
+
+    etag = media_etag(path, stats)
+    last_modified = int(stats.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _with_cache_headers(not_modified, path, etag, last_modified)
+
+    size = stats.st_size
+    content_type, encoding = mimetypes.guess_type(full_path)
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and size:
+        if_range = request.META.get('HTTP_IF_RANGE')
+        # If-Range : la plage n'est valable que si le fichier n'a pas changé depuis la première réponse
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+            if byte_range is not None and byte_range[0] >= size:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(status=206 if byte_range else 200)
+    elif byte_range:
+        start, end = byte_range
+        response = FileResponse(RangeFile(open(full_path, 'rb'), start, end - start + 1), status=206)
+    else:
+        response = FileResponse(open(full_path, 'rb'))
+
+    if byte_range:
+        start, end = byte_range
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = end - start + 1
+    else:
+        response['Content-Length'] = size
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return _with_cache_headers(response, path, etag, last_modified)
+
+
+def _with_cache_headers(response, path, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if path.startswith(IMMUTABLE_PREFIXES):
+        response['Cache-Control'] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'HAIRBNB_MEDIA_MAX_AGE', 3600)}"
+    return response
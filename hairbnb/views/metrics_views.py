@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from hairbnb.services.metrics import Metrics
+
+
+def metrics(request):
+    """
+    Métriques au format texte Prometheus (requêtes et durées par route, base de données,
+    géocodage, caches), additionnées sur tous les workers avec HAIRBNB_METRICS_DIR.
+
+    Désactivée par défaut (404) : HAIRBNB_METRICS_ENABLED = True pour l'activer. Seules les adresses
+    de HAIRBNB_METRICS_ALLOWED_IPS (REMOTE_ADDR, 127.0.0.1 et ::1 par défaut ; None = toutes) y ont accès :
+    derrière un proxy, y mettre l'adresse du proxy et filtrer /metrics à ce niveau.
+
+    Les métriques HTTP (hairbnb_http_*) ne sont relevées que si 'hairbnb.middleware.QueryInstrumentationMiddleware'
+    est dans settings.MIDDLEWARE, ce qui n'est pas le cas par défaut : sans lui, seuls le géocodage
+    et les caches sont exposés.
+    """
+    if not getattr(settings, 'HAIRBNB_METRICS_ENABLED', False):
+        raise Http404
+    allowed_ips = getattr(settings, 'HAIRBNB_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if allowed_ips is not None and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(Metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
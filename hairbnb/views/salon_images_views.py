@@ -0,0 +1,133 @@
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.http import JsonResponse
+from django.http.multipartparser import MultiPartParserError
+from django.views.decorators.csrf import csrf_exempt
+
+from hairbnb.models import TblImageSalon, TblSalon
+from hairbnb.services.media_storage import media_storage
+from hairbnb.services.thumbnail_service import ThumbnailService
+from hairbnb.services.upload_handlers import StreamingImageUploadHandler
+from hairbnb.signals import thumbnails_generated
+
+logger = logging.getLogger(__name__)
+
+GALLERY_PAGE_SIZE = 24
+GALLERY_MAX_PAGE_SIZE = 100
+
+
+def image_data(image):
+    """ Représentation d'une image de galerie : URLs et métadonnées stockées (aucune lecture du fichier). """
+    return {
+        "idTblImageSalon": image.idTblImageSalon,
+        "url": image.urlImages.url,
+        "urls": ThumbnailService.urls(image.urlImages),
+        "width": image.width,
+        "height": image.height,
+        "size": image.size,
+        "placeholder": image.placeholder,
+    }
+
+
+def list_salon_images(request, salon_id):
+    """
+    GET ?after=<idTblImageSalon>&limit=<n> : une page de la galerie, par ordre d'ajout.
+    Pagination par clé (idTblImageSalon > after) : une page coûte le même prix quelle que soit sa position.
+    "next" est le curseur de la page suivante (None à la fin).
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', GALLERY_PAGE_SIZE)), GALLERY_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "after et limit doivent être des entiers"}, status=400)
+    if limit < 1:
+        return JsonResponse({"status": "error", "message": "limit doit être positif"}, status=400)
+
+    # Une ligne de plus que demandé : indique s'il reste une page, sans COUNT(*)
+    images = list(
+        TblImageSalon.objects.filter(salon_id=salon_id, idTblImageSalon__gt=after)
+        .only('idTblImageSalon', 'urlImages', 'width', 'height', 'size', 'placeholder', 'thumbnails_ready')
+        .order_by('idTblImageSalon')[:limit + 1]
+    )
+    if not images and not after and not TblSalon.objects.filter(idTblSalon=salon_id).exists():
+        return JsonResponse({"status": "error", "message": "Salon introuvable"}, status=404)
+
+    has_more = len(images) > limit
+    images = images[:limit]
+    return JsonResponse({
+        "status": "success",
+        "images": [image_data(image) for image in images],
+        "next": images[-1].idTblImageSalon if has_more else None,
+    })
+
+
+# csrf_exempt seul (pas d'api_view) : les handlers d'upload doivent être remplacés
+# avant toute lecture du corps de la requête
+@csrf_exempt
+def salon_images(request, salon_id):
+    """
+    GET : galerie paginée du salon (voir list_salon_images).
+    POST multipart, champ "images" (un ou plusieurs fichiers) : ajoute des photos à la galerie du salon.
+    Les fichiers sont écrits et hachés pendant la réception (StreamingImageUploadHandler),
+    puis rangés par ContentAddressedStorage sans seconde copie ; les lignes sont insérées en une requête.
+    Réponse : images ajoutées et erreurs des fichiers refusés (format, taille, nombre).
+    """
+    if request.method == 'GET':
+        return list_salon_images(request, salon_id)
+    if request.method != 'POST':
+        return JsonResponse({"status": "error", "message": "Méthode non autorisée"}, status=405)
+
+    salon = TblSalon.objects.select_related('coiffeuse__idTblUser').filter(idTblSalon=salon_id).first()
+    if not salon:
+        return JsonResponse({"status": "error", "message": "Salon introuvable"}, status=404)
+    # Avec FirebaseAuthenticationMiddleware, seule la coiffeuse du salon peut y ajouter des photos
+    firebase_uid = getattr(request, 'firebase_uid', None)
+    if firebase_uid and firebase_uid != salon.coiffeuse.idTblUser.uuid:
+        return JsonResponse({"status": "error", "message": "Ce salon ne vous appartient pas"}, status=403)
+
+    # Refus avant de lire le corps : le multipart complet ne peut pas dépasser la limite totale
+    handler = StreamingImageUploadHandler(request)
+    max_body = handler.MAX_IMAGES * handler.MAX_IMAGE_SIZE + 64 * 1024
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_body:
+        return JsonResponse({"status": "error", "message": "Envoi trop volumineux"}, status=413)
+
+    request.upload_handlers = [handler]
+    try:
+        files = request.FILES.getlist('images')
+    except MultiPartParserError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    try:
+        if not files:
+            return JsonResponse(
+                {"status": "error", "message": "Aucune image valide reçue", "errors": handler.errors}, status=400
+            )
+
+        field = TblImageSalon._meta.get_field('urlImages')
+        with transaction.atomic():
+            images = []
+            for uploaded in files:
+                image = TblImageSalon(salon=salon, size=uploaded.size, **uploaded.metadata)
+                # Déplacement du fichier temporaire vers son blob (+1 référence), sans relecture
+                image.urlImages.name = media_storage.save(field.generate_filename(image, uploaded.name), uploaded)
+                images.append(image)
+            images = TblImageSalon.objects.bulk_create(images)
+    finally:
+        for uploaded in files:
+            uploaded.close()  # Supprime les fichiers temporaires non utilisés (contenu déjà stocké)
+
+    for image in images:  # bulk_create n'envoie pas post_save : miniatures lancées ici
+        ThumbnailService.schedule(image.urlImages, on_done=partial(thumbnails_generated, image.urlImages.name))
+
+    logger.info(f"📷 Salon {salon_id} : {len(images)} images ajoutées, {len(handler.errors)} refusées")
+    return JsonResponse({
+        "status": "success",
+        "images": [image_data(image) for image in images],
+        "errors": handler.errors,
+    }, status=201)
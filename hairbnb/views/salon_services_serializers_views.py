@@ -7,13 +7,14 @@ from rest_framework.response import Response
 from hairbnb.business.business_logic import ServiceData, SalonData
 from hairbnb.models import TblService, TblSalonService, TblSalon, TblTemps, TblPrix, TblServicePrix, \
     TblServiceTemps, TblPromotion
+from hairbnb.utils import apply_changes, upsert_link
 
 
 # ✅ Récupérer tous les services d'une coiffeuse via son salon
 @api_view(['GET'])
 def get_services_by_coiffeuse(request, coiffeuse_id):
     try:
-        salon = TblSalon.objects.get(coiffeuse__idTblUser=coiffeuse_id)
+        salon = TblSalon.objects.with_services().get(coiffeuse__idTblUser=coiffeuse_id)
         salon_data = SalonData(salon).to_dict()
         return Response({"status": "success", "salon": salon_data}, status=200)
 
@@ -112,20 +113,19 @@ def update_service(request, service_id):
         temps_minutes = request.data.pop('temps', None)
         prix_montant = request.data.pop('prix', None)
 
-        for key, value in request.data.items():
-            setattr(service, key, value)
-        service.save()
+        # ✅ Seuls les champs autorisés et réellement modifiés sont écrits (aucune requête sinon)
+        apply_changes(service, request.data, ['intitule_service', 'description'])
 
         # Mettre à jour le temps et le prix
-        # ✅ Gestion du temps (évite les doublons)
+        # ✅ Gestion du temps (évite les doublons, la ligne de liaison est modifiée sur place)
         if temps_minutes:
             temps, _ = TblTemps.objects.get_or_create(minutes=temps_minutes)
-            TblServiceTemps.objects.update_or_create(service=service, defaults={'temps': temps})
+            upsert_link(TblServiceTemps, {'service': service}, 'temps', temps)
 
         # ✅ Gestion du prix (évite les doublons)
         if prix_montant:
             prix_obj, created = TblPrix.objects.get_or_create(prix=prix_montant)
-            TblServicePrix.objects.update_or_create(service=service, defaults={'prix': prix_obj})
+            upsert_link(TblServicePrix, {'service': service}, 'prix', prix_obj)
 
 
         return Response({"status": "success", "message": "Service mis à jour."}, status=200)
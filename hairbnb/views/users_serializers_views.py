@@ -4,24 +4,30 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from .views import logger
-from ..business.business_logic import MinimalCoiffeuseData
 from ..models import TblCoiffeuse, TblClient, TblUser
-from ..serializers.users_serializers import CoiffeuseSerializer, ClientSerializer, CurrentUserSerializer
+from ..permissions import IsFirebaseAuthenticated
+from ..serializers.users_serializers import CoiffeuseSerializer, ClientSerializer
+from ..services.coiffeuse_info_service import CoiffeuseInfoService
+from ..services.profile_fragment_cache import ProfileFragmentCache
+from ..services.user_resolver import UserResolver
 
 
 #*****************************************Afficher la coiffeuse****************************************
 @api_view(['GET'])
 def get_coiffeuse_by_uuid(request, uuid):
     try:
-        user = TblUser.objects.get(uuid=uuid, type='coiffeuse')
-        coiffeuse = TblCoiffeuse.objects.get(idTblUser=user)
-        serializer = CoiffeuseSerializer(coiffeuse)
+        resolved = UserResolver.resolve(uuid)
+        if resolved is None or resolved[1] != 'coiffeuse':
+            raise TblUser.DoesNotExist
+        # Profil déjà sérialisé en cache (aucune requête si la coiffeuse n'a pas changé depuis)
+        fragments = ProfileFragmentCache.coiffeuse_fragments([resolved[0]])
+        if not fragments:
+            raise TblCoiffeuse.DoesNotExist
 
-        return Response({"status": "success", "data": serializer.data}, status=200)
+        return ProfileFragmentCache.response({"status": "success"}, "data", fragments[0])
 
     except TblUser.DoesNotExist:
         return Response({"status": "error", "message": "Utilisateur introuvable ou non une coiffeuse."}, status=404)
@@ -38,8 +44,10 @@ def get_coiffeuse_by_uuid(request, uuid):
 @api_view(['GET'])
 def get_client_by_uuid(request, uuid):
     try:
-        user = TblUser.objects.get(uuid=uuid, type='client')
-        client = TblClient.objects.get(idTblUser=user)
+        resolved = UserResolver.resolve(uuid)
+        if resolved is None or resolved[1] != 'client':
+            raise TblUser.DoesNotExist
+        client = TblClient.objects.select_related('idTblUser__adresse__rue__localite').get(idTblUser_id=resolved[0])
         serializer = ClientSerializer(client)
 
         return Response({"status": "success", "data": serializer.data}, status=200)
@@ -59,7 +67,8 @@ def get_client_by_uuid(request, uuid):
 @api_view(['PUT'])
 def update_coiffeuse(request, uuid):
     try:
-        coiffeuse = TblCoiffeuse.objects.get(uuid=uuid)
+        # L'uuid est celui de l'utilisateur : profil chargé en une requête pour la réponse
+        coiffeuse = TblCoiffeuse.objects.select_related('idTblUser__adresse__rue__localite').get(idTblUser__uuid=uuid)
     except TblCoiffeuse.DoesNotExist:
         return Response({'error': 'Coiffeuse not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -74,7 +83,7 @@ def update_coiffeuse(request, uuid):
 @api_view(['PUT'])
 def update_client(request, uuid):
     try:
-        client = TblClient.objects.get(uuid=uuid)
+        client = TblClient.objects.select_related('idTblUser__adresse__rue__localite').get(idTblUser__uuid=uuid)
     except TblClient.DoesNotExist:
         return Response({'error': 'Client not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -86,18 +95,21 @@ def update_client(request, uuid):
 # **************************************************************************************************************************
 
 # **************************************************************************************************************************
-                       #get_current_user (Assure que l'utilisateur est connecté et renvoi le current user)
+                       #get_authenticated_user (Assure que l'utilisateur est connecté et renvoi le current user)
 # **************************************************************************************************************************
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])  # Assure que l'utilisateur est connecté
-def get_current_user(request):
+@permission_classes([IsFirebaseAuthenticated])  # ID token vérifié par FirebaseAuthenticationMiddleware
+def get_authenticated_user(request):
     """
-    API Endpoint pour récupérer les informations du current user.
+    API Endpoint pour récupérer les informations du current user à partir de son ID token Firebase
+    (en-tête Authorization: Bearer ...), sans uuid dans l'URL.
     """
     try:
-        user = TblUser.objects.get(uuid=request.tbluser.uuid)  # On récupère l'utilisateur via son UUID Firebase
-        serializer = CurrentUserSerializer(user)
-        return Response({"status": "success", "user": serializer.data}, status=200)
+        resolved = UserResolver.resolve(request.firebase_uid)  # uid Firebase -> idTblUser via le cache
+        fragment = ProfileFragmentCache.current_user_fragment(resolved[0]) if resolved else None
+        if fragment is None:
+            raise TblUser.DoesNotExist
+        return ProfileFragmentCache.response({"status": "success"}, "user", fragment)
     except TblUser.DoesNotExist:
         return Response({"status": "error", "message": "Utilisateur non trouvé"}, status=404)
 # **************************************************************************************************************************
@@ -111,9 +123,13 @@ def get_current_user(request, uuid):
     API Endpoint pour récupérer les informations d'un utilisateur via son UUID.
     """
     try:
-        user = TblUser.objects.get(uuid=uuid)  # Recherche de l'utilisateur par UUID
-        serializer = CurrentUserSerializer(user)
-        return Response({"status": "success", "user": serializer.data}, status=200)
+        resolved = UserResolver.resolve(uuid)  # uuid -> idTblUser via le cache
+        if resolved is None:
+            raise TblUser.DoesNotExist
+        fragment = ProfileFragmentCache.current_user_fragment(resolved[0])  # Profil déjà sérialisé en cache
+        if fragment is None:
+            raise TblUser.DoesNotExist
+        return ProfileFragmentCache.response({"status": "success"}, "user", fragment)
     except ObjectDoesNotExist:
         return Response({"status": "error", "message": "Utilisateur non trouvé"}, status=404)
 # **************************************************************************************************************************
@@ -126,22 +142,21 @@ def get_coiffeuses_info(request):
         data = json.loads(request.body)
         uuids = data.get("uuids", [])
 
-        logger.info(f"📩 UUIDs reçus : {uuids}")  # ✅ Log des UUIDs reçus
-
-        # ✅ Récupérer les coiffeuses qui correspondent aux UUIDs
-        coiffeuses = TblCoiffeuse.objects.filter(idTblUser__uuid__in=uuids)
+        if not isinstance(uuids, list) or not all(isinstance(uuid, str) for uuid in uuids):
+            return JsonResponse({"status": "error", "message": "uuids doit être une liste de chaînes"}, status=400)
+        if len(uuids) > CoiffeuseInfoService.MAX_UUIDS:
+            return JsonResponse({
+                "status": "error",
+                "message": f"Trop d'UUIDs (maximum {CoiffeuseInfoService.MAX_UUIDS})"
+            }, status=400)
 
-        # ✅ Transformer les objets en JSON minimaliste
-        coiffeuses_data = [MinimalCoiffeuseData(c).to_dict() for c in coiffeuses]
+        # ✅ Coiffeuses dans l'ordre des UUIDs reçus (cache par uuid, puis requêtes par paquets)
+        coiffeuses_data = CoiffeuseInfoService.get_many(uuids)
 
-        logger.info(f"🔍 Coiffeuses trouvées : {coiffeuses_data}")  # ✅ Log des données retournées
+        logger.info(f"🔍 {len(coiffeuses_data)} coiffeuses trouvées pour {len(uuids)} UUIDs reçus")
 
         return JsonResponse({"status": "success", "coiffeuses": coiffeuses_data})
 
     except Exception as e:
         logger.error(f"❌ Erreur interne : {str(e)}", exc_info=True)
         return JsonResponse({"status": "error", "message": "Erreur interne"}, status=500)
-
-
-
-
@@ -6,10 +6,15 @@ from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views import View
 import json
-from hairbnb.models import TblAdresse, TblRue, TblLocalite, TblCoiffeuse, TblClient, TblUser, TblServiceTemps, TblServicePrix, \
+from hairbnb.models import TblAdresse, TblRue, TblCoiffeuse, TblClient, TblUser, TblServiceTemps, TblServicePrix, \
     TblPrix, TblTemps, TblService, TblSalon, TblSalonService
+from hairbnb.services.address_resolver import AddressResolver
 from hairbnb.services.geolocation_service import GeolocationService
-from django.http import JsonResponse
+from hairbnb.services.profile_fragment_cache import ProfileFragmentCache
+from hairbnb.services.user_resolver import UserResolver
+from hairbnb.services.uuid_bloom import KnownUuids
+from hairbnb.utils import apply_changes, first_related, upsert_link
+from django.http import JsonResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 
@@ -71,12 +76,10 @@ def create_user_profile(request):
                 return JsonResponse({"status": "error", "message": "Utilisateur déjà existant"}, status=400)
 
             # Étape 2 : Gérer l'adresse
-            localite, _ = TblLocalite.objects.get_or_create(
-                commune=data['commune'], code_postal=data['code_postal']
-            )
-            rue_obj, _ = TblRue.objects.get_or_create(nom_rue=data['rue'], localite=localite)
+            # Localité et rue résolues via le cache (créées si besoin, sans doublon en cas d'inscriptions simultanées)
+            rue_id = AddressResolver.resolve(data['commune'], data['code_postal'], data['rue'])
             adresse = TblAdresse.objects.create(
-                numero=data['numero'], boite_postale=data.get('boite_postale', None), rue=rue_obj
+                numero=data['numero'], boite_postale=data.get('boite_postale', None), rue_id=rue_id
             )
 
             # Étape 3 : Calculer les coordonnées géographiques avec le service
@@ -128,8 +131,8 @@ def create_user_profile(request):
 @csrf_exempt
 def get_user_profile(request, userUuid):
     try:
-        # Récupérer l'utilisateur
-        user = get_object_or_404(TblUser, uuid=userUuid)
+        # Récupérer l'utilisateur avec son adresse et son rôle (1 à 2 requêtes)
+        user = get_object_or_404(TblUser.objects.with_profile(), uuid=userUuid)
 
         # Construire la réponse
         user_data = {
@@ -311,14 +314,17 @@ def get_user_profile(request, userUuid):
 @csrf_exempt
 def get_id_and_type_from_uuid(request, uuid):
     try:
-        # Rechercher l'utilisateur par UUID
-        user = get_object_or_404(TblUser, uuid=uuid)
+        # Rechercher l'utilisateur par UUID (via le cache, sans requête dans le cas courant)
+        resolved = UserResolver.resolve(uuid)
+        if resolved is None:
+            raise Http404("No TblUser matches the given query.")
+        id_user, user_type = resolved
 
         # Retourner l'id et le type de l'utilisateur
         return JsonResponse({
             'success': True,
-            'idTblUser': user.idTblUser,
-            'type': user.type,  # Ajout du type
+            'idTblUser': id_user,
+            'type': user_type,  # Ajout du type
         }, status=200)
     except Exception as e:
         return JsonResponse({
@@ -344,60 +350,56 @@ class UpdateUserProfileView(View):
 
             logger.info(f"Données reçues : {data}")
 
-            # Récupérer l'utilisateur par UUID
-            user = TblUser.objects.get(uuid=uuid)
+            # Récupérer l'utilisateur par UUID (avec adresse et rôle coiffeuse, modifiés plus bas)
+            user = TblUser.objects.select_related('adresse', 'coiffeuse').get(uuid=uuid)
 
             # Logs avant la mise à jour
             logger.info(f"Avant mise à jour : {user.nom}, {user.prenom}")
 
-            # Mise à jour des champs généraux
-            user.nom = data.get('nom', user.nom)
-            user.prenom = data.get('prenom', user.prenom)
-            user.numero_telephone = data.get('numero_telephone', user.numero_telephone)
-            user.type = data.get('type', user.type)
-
             if 'email' in data:
                 try:
                     validate_email(data['email'])
-                    user.email = data['email']
                 except ValidationError:
                     return JsonResponse({"success": False, "message": "Email non valide."}, status=400)
 
-            # Mise à jour de l'adresse
+            # Champs généraux de l'utilisateur
+            user_changes = {key: data[key] for key in ('nom', 'prenom', 'numero_telephone', 'type', 'email') if key in data}
+
+            # Mise à jour de l'adresse (seules les colonnes modifiées sont écrites)
             if 'adresse' in data:
                 adresse_data = data['adresse']
                 if isinstance(adresse_data, dict):
                     # Utiliser l'adresse existante ou créer une nouvelle
                     adresse = user.adresse or TblAdresse()
-
-                    # Mise à jour des champs de l'adresse
-                    adresse.numero = adresse_data.get('numero', adresse.numero)
-                    adresse.boite_postale = adresse_data.get('boite_postale', adresse.boite_postale)
-
-                    # Vérifier et mettre à jour la rue associée
-                    if 'rue_id' in adresse_data:
-                        try:
-                            rue = TblRue.objects.get(idTblRue=adresse_data['rue_id'])
-                            adresse.rue = rue
-                        except TblRue.DoesNotExist:
+                    adresse_changes = {
+                        key: adresse_data[key] for key in ('numero', 'boite_postale') if key in adresse_data
+                    }
+
+                    # Vérifier et mettre à jour la rue associée (par ID, ou par rue + commune + code postal)
+                    if all(adresse_data.get(field) for field in ('rue', 'commune', 'code_postal')):
+                        adresse_changes['rue_id'] = AddressResolver.resolve(
+                            adresse_data['commune'], adresse_data['code_postal'], adresse_data['rue']
+                        )
+                    elif 'rue_id' in adresse_data:
+                        if not TblRue.objects.filter(idTblRue=adresse_data['rue_id']).exists():
                             return JsonResponse(
                                 {"success": False, "message": f"Rue avec ID {adresse_data['rue_id']} introuvable."},
                                 status=400
                             )
+                        adresse_changes['rue_id'] = adresse_data['rue_id']
+
+                    apply_changes(adresse, adresse_changes, ['numero', 'boite_postale', 'rue_id'])
+                    if adresse.pk is None:
+                        adresse.save()
+                        user_changes['adresse'] = adresse.pk
 
-                    adresse.save()
-                    user.adresse = adresse
+            # Un seul UPDATE des colonnes modifiées de l'utilisateur, aucun si rien n'a changé
+            apply_changes(user, user_changes, ['nom', 'prenom', 'numero_telephone', 'type', 'email', 'adresse'])
 
             # Mise à jour des champs spécifiques pour les coiffeuses
             if user.type == 'coiffeuse' and hasattr(user, 'coiffeuse'):
-                coiffeuse = user.coiffeuse
-                coiffeuse.denomination_sociale = data.get('denomination_sociale', coiffeuse.denomination_sociale)
-                coiffeuse.tva = data.get('tva', coiffeuse.tva)
-                coiffeuse.position = data.get('position', coiffeuse.position)
-                coiffeuse.save()
-
-            # Sauvegarder les modifications de l'utilisateur
-            user.save()
+                apply_changes(user.coiffeuse, data, ['denomination_sociale', 'tva', 'position'])
+
             # Logs après la mise à jour
             logger.info(f"Après mise à jour : {user.nom}, {user.prenom}")
 
@@ -591,18 +593,16 @@ def add_or_update_service(request, service_id=None):
                     logging.warning(f"Service avec ID {service_id} introuvable.")
                     return JsonResponse({'status': 'error', 'message': 'Service introuvable.'}, status=404)
 
-                if name:
-                    service.intitule_service = name
-                if description:
-                    service.description = description
-                service.save()
+                # Seules les colonnes modifiées sont écrites ; les liaisons temps/prix sont modifiées sur place
+                changes = {'intitule_service': name, 'description': description}
+                apply_changes(service, {key: value for key, value in changes.items() if value}, list(changes))
 
                 if minutes is not None:
-                    TblServiceTemps.objects.filter(service=service).delete()
-                    TblServiceTemps.objects.create(service=service, temps=TblTemps.objects.get_or_create(minutes=minutes)[0])
+                    upsert_link(TblServiceTemps, {'service': service}, 'temps',
+                                TblTemps.objects.get_or_create(minutes=minutes)[0])
                 if price is not None:
-                    TblServicePrix.objects.filter(service=service).delete()
-                    TblServicePrix.objects.create(service=service, prix=TblPrix.objects.get_or_create(prix=price)[0])
+                    upsert_link(TblServicePrix, {'service': service}, 'prix',
+                                TblPrix.objects.get_or_create(prix=price)[0])
 
                 logging.info("Service mis à jour avec succès.")
                 return JsonResponse({'status': 'success', 'message': 'Service mis à jour avec succès.'}, status=200)
@@ -613,8 +613,9 @@ def add_or_update_service(request, service_id=None):
                     intitule_service=name,
                     description=description
                 )
-                TblServiceTemps.objects.create(service=service, temps=TblTemps.objects.create(minutes=minutes))
-                TblServicePrix.objects.create(service=service, prix=TblPrix.objects.create(prix=price))
+                # Temps et prix sont uniques : réutilise les lignes existantes
+                TblServiceTemps.objects.create(service=service, temps=TblTemps.objects.get_or_create(minutes=minutes)[0])
+                TblServicePrix.objects.create(service=service, prix=TblPrix.objects.get_or_create(prix=price)[0])
 
                 logging.info("Nouveau service ajouté avec succès.")
                 return JsonResponse({'status': 'success', 'message': 'Service ajouté avec succès.'}, status=201)
@@ -634,27 +635,11 @@ def list_coiffeuses(request):
     """
     if request.method == 'GET':
         try:
-            # Récupérer toutes les coiffeuses actives avec les informations liées
-            coiffeuses = TblCoiffeuse.objects.select_related('idTblUser').all()
-
-            # Préparer les données pour la réponse JSON
-            data = []
-            for coiffeuse in coiffeuses:
-                user = coiffeuse.idTblUser
-                data.append({
-                    'id': coiffeuse.id,  # ID de la coiffeuse
-                    'uuid': user.uuid,  # UUID de l'utilisateur
-                    'nom': user.nom,
-                    'prenom': user.prenom,
-                    'email': user.email,
-                    'numero_telephone': user.numero_telephone,
-                    'photo_profil': user.photo_profil.url if user.photo_profil else None,
-                    'denomination_sociale': coiffeuse.denomination_sociale,
-                    'tva': coiffeuse.tva,
-                    'position': coiffeuse.position,
-                })
-
-            return JsonResponse({'status': 'success', 'data': data}, status=200)
+            # Récupérer toutes les coiffeuses : seuls les IDs sont lus, les profils viennent du cache de fragments
+            user_ids = list(TblCoiffeuse.objects.order_by('id').values_list('idTblUser_id', flat=True))
+            fragments = ProfileFragmentCache.list_fragments(user_ids)
+
+            return ProfileFragmentCache.response({'status': 'success'}, 'data', ProfileFragmentCache.join(fragments))
 
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -672,42 +657,21 @@ def coiffeuse_services(request, coiffeuse_id):
         # Récupérez le salon lié à cette coiffeuse
         salon = TblSalon.objects.get(coiffeuse=coiffeuse)
 
-        # Traitez les services du salon ici...
-        services = TblService.objects.filter(salons=salon).distinct().values(
-            'idTblService',
-            'intitule_service',
-            'description',
-        )
-        # # Vérifier si le salon existe pour la coiffeuse
-        # salon = TblSalon.objects.get(coiffeuse_id=coiffeuse_id)
-        #
-        # # Récupérer tous les services du salon
-        # services = TblService.objects.filter(salons=salon).distinct().values(
-        #     'idTblService',
-        #     'intitule_service',
-        #     'description',
-        # )
-
-        #services = TblService.objects.filter(salons=salon).prefetch_related('service_temps', 'service_prix')
+        # Services du salon avec temps et prix préchargés (nombre de requêtes constant)
+        services = TblService.objects.filter(salons=salon).distinct().with_details()
 
         # Ajouter les relations avec temps et prix
         services_with_details = []
         for service in services:
-            service_id = service['idTblService']
-
-            # Récupérer la durée (temps)
-            service_temps = TblServiceTemps.objects.filter(service_id=service_id).first()
-            minutes = service_temps.temps.minutes if service_temps else None
-
-            # Récupérer le prix
-            service_prix = TblServicePrix.objects.filter(service_id=service_id).first()
-            price = service_prix.prix.prix if service_prix else None
-
-            # Ajouter les détails au service
-            service['temps_minutes'] = minutes
-            service['prix'] = price
-
-            services_with_details.append(service)
+            service_temps = first_related(service, 'service_temps')
+            service_prix = first_related(service, 'service_prix')
+            services_with_details.append({
+                'idTblService': service.idTblService,
+                'intitule_service': service.intitule_service,
+                'description': service.description,
+                'temps_minutes': service_temps.temps.minutes if service_temps else None,
+                'prix': service_prix.prix.prix if service_prix else None,
+            })
 
         return JsonResponse(services_with_details, safe=False, status=200)
     except TblSalon.DoesNotExist:
@@ -734,7 +698,8 @@ def check_user_profile(request):
             user_uuid = data.get('userUuid')
 
             # Vérifier si l'utilisateur existe avec cet UUID
-            user_exists = TblUser.objects.filter(uuid=user_uuid).exists()
+            # (filtre de Bloom : un uuid inconnu est écarté sans requête ; sinon resolver en cache)
+            user_exists = KnownUuids.exists(user_uuid)
 
             if user_exists:
                 return JsonResponse({"status": "exists"}, status=200)
@@ -14,13 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.conf.urls.static import static
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from hairbnb import views, urls
 
 from hairbnb.views import create_user_profile, home, check_user_profile, ServicesListView, add_or_update_service, \
     coiffeuse_services, list_coiffeuses, get_user_profile, UpdateUserProfileView, add_service_to_salon
+from hairbnb.views.media_views import serve_media
+from hairbnb.views.metrics_views import metrics
 from hairbnb.views.users_serializers_views import get_coiffeuse_by_uuid
 from hairbnb_backend import settings
 
@@ -41,8 +44,12 @@ urlpatterns = [
     path('api/get_id_and_type_from_uuid/<str:uuid>/', views.views.get_id_and_type_from_uuid, name='get_id_and_type_from_uuid'),
     path('api/add_service_to_salon/', add_service_to_salon, name='add_service_to_salon'),
     path('api/', include('hairbnb.urls.serializers_urls')),  # Inclure les routes de serializers_urls.py
+    path('metrics', metrics, name='metrics'),  # Scraping Prometheus : 404 sauf HAIRBNB_METRICS_ENABLED
 ]
 
-# Ajoutez ceci pour gérer les fichiers médias (Seulement en mode DEBUG)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Fichiers médias servis par Django (ETag, 304, Range, Cache-Control) : en DEBUG, ou sur les petits
+# déploiements sans serveur web devant Django avec HAIRBNB_SERVE_MEDIA = True
+if getattr(settings, 'HAIRBNB_SERVE_MEDIA', settings.DEBUG):
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', serve_media, name='serve_media'),
+    ]